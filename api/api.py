@@ -1,18 +1,30 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel, Field
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, AsyncIterator
 import uvicorn
 from exa_py import Exa
 import yaml
 import os
-from db import getUserInformationFromDB, getUserPlanFromDB, storeUserPlanInDB
+import json
+import asyncio
+from db import getUserInformationFromDBAsync, getUserPlanFromDBAsync, getUserMilestoneFromDBAsync, getPlanFreshnessFromDBAsync, storeUserPlanInDBAsync, pool as db_pool, plan_cache, plan_events
 from plan_manager import CascadingPlanManager
+from llm_client import RequestDeadlineMiddleware
+from milestone_registry import MILESTONE_TIMEFRAMES, MILESTONE_REGISTRY
+from jobs import create_job_queue_from_env
+from batch import BatchPlanRunner, resolve_usernames
+import tempfile
 from models.milestone import *
 from models.user import *
+from models.job import Job
+from models.batch import BatchPlanRequest
 from utils.timestamp_utils import parse_timestamp, is_timestamp_newer
+from utils.concurrency_utils import SingleFlight
+from utils.etag_utils import plan_etag, milestone_etag, etag_matches
 
 app = FastAPI(
     title="Cascading Career Milestone API",
@@ -55,6 +67,29 @@ except Exception as e:
 
 manager = CascadingPlanManager()
 
+# All LLM calls made while serving one request share a single overall deadline
+app.add_middleware(RequestDeadlineMiddleware, llm=manager.llm)
+
+# Concurrent plan generations for the same user, from generate-plan, its stream or a
+# generate job, share one generation and store
+plan_generation_flights = SingleFlight()
+
+# Plan and milestone responses are per user and unauthenticated, so by default only the
+# browser keeps them and revalidates with If-None-Match before each reuse
+PLAN_CACHE_CONTROL = os.getenv("PLAN_CACHE_CONTROL", "private, no-cache")
+
+# Long LLM operations can also run as background jobs that clients poll or watch
+job_queue = create_job_queue_from_env()
+
+@app.on_event("startup")
+async def start_job_queue():
+    # Resumes unfinished jobs when the store is persistent
+    await job_queue.start()
+
+@app.on_event("shutdown")
+async def close_db_pool():
+    await db_pool.aclose()
+
 # Note: timestamp utilities now imported from utils.timestamp_utils
 
 # API Endpoints
@@ -71,12 +106,22 @@ async def root():
         },
         "cascade_endpoints": {
             "update_with_cascade": "PUT /api/v3/milestone/{timeframe}/{username}/update-cascade",
+            "stream_update_with_cascade": "PUT /api/v3/milestone/{timeframe}/{username}/update-cascade/stream",
             "direct_update": "PUT /api/v3/milestone/{timeframe}/{username}/direct-update",
             "regenerate_subsequent": "POST /api/v3/plan/{username}/regenerate-subsequent",
+            "plan_events": "GET /api/v3/plan/{username}/events",
             "process_thoughts": "POST /api/v3/milestone/{timeframe}/{username}/process-thoughts"
         },
+        "job_endpoints": {
+            "generate_plan": "POST /api/v3/jobs/generate-plan/{username}",
+            "update_cascade": "POST /api/v3/jobs/milestone/{timeframe}/{username}/update-cascade",
+            "batch_generate_plans": "POST /api/v3/batch/generate-plans",
+            "status": "GET /api/v3/jobs/{job_id}",
+            "events": "GET /api/v3/jobs/{job_id}/events"
+        },
         "milestone_endpoints": {
             "generate_plan": "POST /api/v3/generate-plan/{username}",
+            "generate_plan_stream": "POST /api/v3/generate-plan/{username}/stream",
             "1_month": "/api/v3/milestone/1_month/{username}",
             "3_months": "/api/v3/milestone/3_months/{username}", 
             "1_year": "/api/v3/milestone/1_year/{username}",
@@ -97,31 +142,110 @@ async def root():
         }
     }
 
+def is_plan_current(plan_last_updated: Optional[str], user_last_updated: Optional[str]) -> bool:
+    """Check whether the stored plan is newer than the user's profile"""
+    if plan_last_updated and user_last_updated:
+        if is_timestamp_newer(plan_last_updated, user_last_updated):
+            print(f"Returning existing plan (plan: {plan_last_updated} > user: {user_last_updated})")
+            return True
+        print(f"Generating new plan (plan: {plan_last_updated} <= user: {user_last_updated})")
+    return False
+
+async def load_current_plan(username: str, freshness: Optional[Tuple[Optional[str], Optional[str]]] = None) -> Optional[CareerPlan]:
+    """
+    Return the stored plan if it is newer than the user's profile, else None.
+    Only the two timestamps are read to decide (or taken from `freshness`);
+    the plan is loaded only when it will be returned.
+    """
+    plan_last_updated, user_last_updated = freshness or await getPlanFreshnessFromDBAsync(username)
+    if not is_plan_current(plan_last_updated, user_last_updated):
+        return None
+    return await getUserPlanFromDBAsync(username) or None
+
+def conditional_response(response: Response, etag: str, if_none_match: Optional[str]) -> Optional[Response]:
+    """Set the caching headers, returning a 304 response if the client's copy is current"""
+    headers = {"ETag": etag, "Cache-Control": PLAN_CACHE_CONTROL}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+def sse_event(event: str, data: Any) -> str:
+    """Format a server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+def stored_plan_events(plan: CareerPlan):
+    """The generation events of a plan that is already complete"""
+    yield "overview", plan.overview
+    for spec in MILESTONE_REGISTRY.values():
+        milestone = getattr(plan, spec.field)
+        if milestone:
+            yield "milestone", milestone
+    yield "plan", plan
+
+async def plan_generation_events(username: str, freshness=None, streamed: bool = True) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Yield ("overview", dict), ("milestone", Milestone) and finally ("plan", CareerPlan) for
+    the user's current plan, or for a new plan generated and stored because there is none.
+    A streamed generation yields each part as soon as it is complete.
+    """
+    career_plan = await load_current_plan(username, freshness)
+    if career_plan:
+        for event in stored_plan_events(career_plan):
+            yield event
+        return
+
+    user_profile = await getUserInformationFromDBAsync(username)
+    if not user_profile:
+        raise HTTPException(status_code=404, detail=f"User {username} not found")
+
+    print(f"Generating plan for {username}")
+    if not streamed:
+        plan = await manager.generate_initial_plan_async(user_profile)
+        await storeUserPlanInDBAsync(plan)
+        for event in stored_plan_events(plan):
+            yield event
+        return
+
+    async for event, payload in manager.stream_initial_plan(user_profile):
+        if event == "plan":
+            await storeUserPlanInDBAsync(payload)
+        yield event, payload
+
+def shared_plan_generation(username: str, freshness=None, streamed: bool = True) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    plan_generation_events shared by every caller for the user: a caller arriving while a
+    generation is in flight follows it instead of starting another, whichever endpoint
+    started it. The generation runs on if a caller disconnects.
+    """
+    return plan_generation_flights.stream(username, lambda: plan_generation_events(username, freshness, streamed))
+
 @app.post("/api/v3/generate-plan/{username}", response_model=CareerPlan)
-async def generate_cascading_plan(username: str):
-    """Generate initial career plan with cascading milestone structure"""
-    try:
-        career_plan = getUserPlanFromDB(username)
-        print(f"User Plan {career_plan}")
-            
-        user_profile = getUserInformationFromDB(username)
-        print(f"Retrieved user profile: {user_profile}")
+async def generate_cascading_plan(username: str, response: Response, if_none_match: Optional[str] = Header(None)):
+    """
+    Generate initial career plan with cascading milestone structure.
+    A current plan matching If-None-Match is answered with 304 Not Modified.
+    """
+    freshness = None
+    if if_none_match:
+        # The plan's ETag comes from its last_updated, so a client holding the current
+        # plan is answered from the freshness check without loading the plan
+        freshness = await getPlanFreshnessFromDBAsync(username)
+        plan_last_updated, user_last_updated = freshness
+        if plan_last_updated and user_last_updated and is_timestamp_newer(plan_last_updated, user_last_updated):
+            not_modified = conditional_response(response, plan_etag(username, plan_last_updated), if_none_match)
+            if not_modified:
+                return not_modified
 
-        
-        # Check if we should return existing plan (only if both timestamps exist and plan is newer)
-        if career_plan and career_plan.last_updated and user_profile.last_updated:
-            if is_timestamp_newer(career_plan.last_updated, user_profile.last_updated):
-                print(f"Returning existing plan (plan: {career_plan.last_updated} > user: {user_profile.last_updated})")
-                return career_plan
-            else:
-                print(f"Generating new plan (plan: {career_plan.last_updated} <= user: {user_profile.last_updated})")
-            
-        if not user_profile:
-            raise HTTPException(status_code=404, detail=f"User {username} not found")
+    plan = await load_or_generate_plan(username, freshness)
+    return conditional_response(response, plan_etag(username, plan.last_updated), if_none_match) or plan
 
-        print(f"Generating plan for {username}")
-        plan = manager.generate_initial_plan(user_profile)
-        storeUserPlanInDB(plan)
+async def load_or_generate_plan(username: str, freshness=None) -> CareerPlan:
+    try:
+        plan = None
+        async for event, payload in shared_plan_generation(username, freshness, streamed=False):
+            if event == "plan":
+                plan = payload
         return plan
     except HTTPException:
         raise
@@ -130,6 +254,97 @@ async def generate_cascading_plan(username: str):
         raise HTTPException(status_code=500, detail=f"Failed to generate plan: {str(e)}")
 
 
+@app.post("/api/v3/generate-plan/{username}/stream")
+async def stream_cascading_plan(username: str):
+    """
+    Generate the career plan as server-sent events: an `overview` event, one `milestone`
+    event per timeframe as soon as it is complete, then a final `plan` event once stored
+    """
+    events = shared_plan_generation(username)
+    # The first event is awaited here so a missing user or failed lookup is still an HTTP error
+    try:
+        first = await events.__anext__()
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error generating plan: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate plan: {str(e)}")
+
+    async def event_stream():
+        try:
+            yield sse_event(*first)
+            async for event, payload in events:
+                yield sse_event(event, payload)
+        except Exception as e:
+            print(f"Error generating plan: {str(e)}")
+            yield sse_event("error", {"detail": f"Failed to generate plan: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/api/v3/plan/{username}", response_model=CareerPlan)
+async def get_plan(username: str, response: Response, if_none_match: Optional[str] = Header(None)):
+    """Get a user's stored career plan, or 304 Not Modified if it matches If-None-Match"""
+    try:
+        plan = await getUserPlanFromDBAsync(username)
+    except Exception as e:
+        print(f"Error retrieving plan: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve plan: {str(e)}")
+
+    if not plan:
+        raise HTTPException(status_code=404, detail=f"Plan not found for user {username}")
+    return conditional_response(response, plan_etag(username, plan.last_updated), if_none_match) or plan
+
+
+@app.get("/api/v3/plan/{username}/events")
+async def watch_plan(username: str):
+    """
+    Stream the user's plan changes as server-sent events: a `plan` event with the
+    changed fields each time the plan is stored, or `resync` if this client fell
+    behind and should refetch the plan. Idle streams get heartbeat comments.
+    """
+    async def event_stream():
+        async for event, payload in plan_events.subscribe(username):
+            if event == "heartbeat":
+                yield ": heartbeat\n\n"
+            else:
+                yield sse_event(event, payload)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/api/v3/milestone/{timeframe}/{username}")
+async def get_milestone(timeframe: str, username: str, response: Response, if_none_match: Optional[str] = Header(None)):
+    """
+    Get a single milestone; only that milestone's column is read from the
+    database and only its models are built. Answers 304 Not Modified if the
+    milestone matches If-None-Match.
+    """
+    if timeframe not in MILESTONE_TIMEFRAMES:
+        raise HTTPException(status_code=404, detail=f"Milestone not found: invalid timeframe {timeframe}")
+
+    try:
+        plan_exists, milestone, plan_last_updated = await getUserMilestoneFromDBAsync(username, timeframe)
+    except Exception as e:
+        print(f"Error retrieving milestone: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve milestone: {str(e)}")
+
+    if not plan_exists:
+        raise HTTPException(status_code=404, detail=f"Plan not found for user {username}")
+    if milestone is None:
+        number = MILESTONE_TIMEFRAMES.index(timeframe) + 1
+        raise HTTPException(status_code=404, detail=f"Milestone {number} not found for user {username}")
+    return conditional_response(response, milestone_etag(username, timeframe, plan_last_updated), if_none_match) or milestone
+
+
 # Cascade Update API Endpoints
 @app.put("/api/v3/milestone/{timeframe}/{username}/update-cascade")
 async def update_milestone_with_cascade(
@@ -142,30 +357,37 @@ async def update_milestone_with_cascade(
     """
     try:
         # Get existing plan
-        plan = getUserPlanFromDB(username)
+        plan = await getUserPlanFromDBAsync(username)
         if not plan:
             raise HTTPException(status_code=404, detail=f"No plan found for user {username}")
         
         # Validate timeframe
-        valid_timeframes = ["1_month", "3_months", "1_year", "5_years"]
+        valid_timeframes = MILESTONE_TIMEFRAMES
         if timeframe not in valid_timeframes:
             raise HTTPException(status_code=400, detail=f"Invalid timeframe. Must be one of: {valid_timeframes}")
         
-        # Process user thoughts into structured updates
-        milestone_updates = manager.process_user_thoughts_to_updates(
-            plan, timeframe, request.user_thoughts, request.context
-        )
-        
-        # Apply cascade updates
-        updated_plan = manager.update_milestone_with_cascade(
-            plan, timeframe, milestone_updates
-        )
+        if manager.cascade_update_mode == "combined":
+            # Updates and regenerated milestones come back from a single completion
+            updated_plan, milestone_updates, cascade_affected = await manager.update_milestone_naturally_async(
+                plan, timeframe, request.user_thoughts, request.context
+            )
+        else:
+            # Process user thoughts into structured updates
+            milestone_updates = await manager.process_user_thoughts_to_updates_async(
+                plan, timeframe, request.user_thoughts, request.context
+            )
+            
+            # Apply cascade updates
+            cascade_affected = manager.affected_milestones(plan, timeframe, milestone_updates)
+            updated_plan = await manager.update_milestone_with_cascade_async(
+                plan, timeframe, milestone_updates
+            )
         
         return {
             "message": f"Successfully updated {timeframe} milestone with cascade effects",
             "updated_plan": updated_plan,
             "processed_updates": milestone_updates,
-            "cascade_affected": manager.milestone_order[manager.milestone_order.index(timeframe) + 1:] if timeframe != "5_years" else []
+            "cascade_affected": cascade_affected
         }
         
     except HTTPException:
@@ -174,6 +396,46 @@ async def update_milestone_with_cascade(
         print(f"Error in cascade update: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to update milestone: {str(e)}")
 
+@app.put("/api/v3/milestone/{timeframe}/{username}/update-cascade/stream")
+async def stream_milestone_update_with_cascade(
+    timeframe: str,
+    username: str,
+    request: MilestoneUpdateRequest
+):
+    """
+    Update a milestone from natural language thoughts as server-sent events: an `updates`
+    event with the structured changes, one `milestone` event per regenerated later
+    milestone, then a final `plan` event once stored
+    """
+    try:
+        plan = await getUserPlanFromDBAsync(username)
+    except Exception as e:
+        print(f"Error in cascade update: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to update milestone: {str(e)}")
+
+    if not plan:
+        raise HTTPException(status_code=404, detail=f"No plan found for user {username}")
+
+    valid_timeframes = MILESTONE_TIMEFRAMES
+    if timeframe not in valid_timeframes:
+        raise HTTPException(status_code=400, detail=f"Invalid timeframe. Must be one of: {valid_timeframes}")
+
+    async def event_stream():
+        try:
+            async for event, payload in manager.stream_update_with_cascade(plan, timeframe, request.user_thoughts, request.context):
+                if event == "plan":
+                    await storeUserPlanInDBAsync(payload)
+                yield sse_event(event, payload)
+        except Exception as e:
+            print(f"Error in cascade update: {str(e)}")
+            yield sse_event("error", {"detail": f"Failed to update milestone: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.put("/api/v3/milestone/{timeframe}/{username}/direct-update")
 async def direct_milestone_update(
     timeframe: str,
@@ -185,17 +447,18 @@ async def direct_milestone_update(
     """
     try:
         # Get existing plan
-        plan = getUserPlanFromDB(username)
+        plan = await getUserPlanFromDBAsync(username)
         if not plan:
             raise HTTPException(status_code=404, detail=f"No plan found for user {username}")
         
         # Validate timeframe
-        valid_timeframes = ["1_month", "3_months", "1_year", "5_years"]
+        valid_timeframes = MILESTONE_TIMEFRAMES
         if timeframe not in valid_timeframes:
             raise HTTPException(status_code=400, detail=f"Invalid timeframe. Must be one of: {valid_timeframes}")
         
         # Apply cascade updates
-        updated_plan = manager.update_milestone_with_cascade(
+        cascade_affected = manager.affected_milestones(plan, timeframe, updates)
+        updated_plan = await manager.update_milestone_with_cascade_async(
             plan, timeframe, updates
         )
         
@@ -203,7 +466,7 @@ async def direct_milestone_update(
             "message": f"Successfully updated {timeframe} milestone with direct updates",
             "updated_plan": updated_plan,
             "applied_updates": updates,
-            "cascade_affected": manager.milestone_order[manager.milestone_order.index(timeframe) + 1:] if timeframe != "5_years" else []
+            "cascade_affected": cascade_affected
         }
         
     except HTTPException:
@@ -223,12 +486,12 @@ async def regenerate_subsequent_milestones_endpoint(
     """
     try:
         # Get existing plan
-        plan = getUserPlanFromDB(username)
+        plan = await getUserPlanFromDBAsync(username)
         if not plan:
             raise HTTPException(status_code=404, detail=f"No plan found for user {username}")
         
         # Validate milestones
-        valid_timeframes = ["1_month", "3_months", "1_year", "5_years"]
+        valid_timeframes = MILESTONE_TIMEFRAMES
         if updated_milestone not in valid_timeframes:
             raise HTTPException(status_code=400, detail=f"Invalid updated_milestone. Must be one of: {valid_timeframes}")
         
@@ -237,12 +500,12 @@ async def regenerate_subsequent_milestones_endpoint(
                 raise HTTPException(status_code=400, detail=f"Invalid milestone in subsequent_milestones: {milestone}")
         
         # Regenerate subsequent milestones
-        updated_plan = manager.regenerate_subsequent_milestones(
+        updated_plan = await manager.regenerate_subsequent_milestones_async(
             plan, updated_milestone, subsequent_milestones
         )
         
         # Store updated plan
-        storeUserPlanInDB(updated_plan)
+        await storeUserPlanInDBAsync(updated_plan)
         
         return {
             "message": f"Successfully regenerated milestones: {subsequent_milestones}",
@@ -268,17 +531,17 @@ async def process_user_thoughts_endpoint(
     """
     try:
         # Get existing plan
-        plan = getUserPlanFromDB(username)
+        plan = await getUserPlanFromDBAsync(username)
         if not plan:
             raise HTTPException(status_code=404, detail=f"No plan found for user {username}")
         
         # Validate timeframe
-        valid_timeframes = ["1_month", "3_months", "1_year", "5_years"]
+        valid_timeframes = MILESTONE_TIMEFRAMES
         if timeframe not in valid_timeframes:
             raise HTTPException(status_code=400, detail=f"Invalid timeframe. Must be one of: {valid_timeframes}")
         
         # Process user thoughts into structured updates
-        milestone_updates = manager.process_user_thoughts_to_updates(
+        milestone_updates = await manager.process_user_thoughts_to_updates_async(
             plan, timeframe, request.user_thoughts, request.context
         )
         
@@ -297,6 +560,176 @@ async def process_user_thoughts_endpoint(
         print(f"Error processing thoughts: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to process thoughts: {str(e)}")
 
+# Background job endpoints
+async def run_generate_plan_job(job: Job, report_partial) -> CareerPlan:
+    """Generate and store a plan, reporting the overview and each milestone as they complete"""
+    plan = None
+    with manager.llm.deadline_scope():
+        try:
+            async for event, payload in shared_plan_generation(job.username):
+                if event == "overview":
+                    await report_partial("overview", payload)
+                elif event == "milestone":
+                    await report_partial(payload.timeframe, payload)
+                elif event == "plan":
+                    plan = payload
+        except HTTPException as e:
+            raise ValueError(e.detail)
+    return plan
+
+async def run_update_cascade_job(job: Job, report_partial) -> Dict[str, Any]:
+    """Process the user's thoughts into updates and cascade them through the plan"""
+    with manager.llm.deadline_scope():
+        return await update_cascade(job, report_partial)
+
+async def update_cascade(job: Job, report_partial) -> Dict[str, Any]:
+    timeframe = job.params["timeframe"]
+    plan = await getUserPlanFromDBAsync(job.username)
+    if not plan:
+        raise ValueError(f"No plan found for user {job.username}")
+
+    if manager.cascade_update_mode == "combined":
+        milestone_updates = None
+        cascade_affected = []
+        async for event, payload in manager.stream_update_with_cascade(
+            plan, timeframe, job.params["user_thoughts"], job.params.get("context", "")
+        ):
+            if event == "updates":
+                milestone_updates = payload
+                await report_partial("processed_updates", payload)
+            elif event == "milestone":
+                cascade_affected.append(payload.timeframe)
+                await report_partial(payload.timeframe, payload)
+            elif event == "plan":
+                plan = payload
+
+        if milestone_updates is None:
+            raise ValueError(f"Cascade update for {timeframe} produced no milestone updates")
+
+        await storeUserPlanInDBAsync(plan)
+        return {
+            "updated_plan": plan,
+            "processed_updates": milestone_updates,
+            "cascade_affected": [t for t in manager.milestone_order if t in cascade_affected]
+        }
+
+    milestone_updates = await manager.process_user_thoughts_to_updates_async(
+        plan, timeframe, job.params["user_thoughts"], job.params.get("context", "")
+    )
+    await report_partial("processed_updates", milestone_updates)
+
+    cascade_affected = manager.affected_milestones(plan, timeframe, milestone_updates)
+    updated_plan = await manager.update_milestone_with_cascade_async(
+        plan, timeframe, milestone_updates
+    )
+
+    return {
+        "updated_plan": updated_plan,
+        "processed_updates": milestone_updates,
+        "cascade_affected": cascade_affected
+    }
+
+async def run_batch_generate_plans_job(job: Job, report_partial) -> Dict[str, Any]:
+    """Generate plans for many users under the job's rate budgets, reporting progress per batch"""
+    request = BatchPlanRequest(**job.params)
+    usernames = await resolve_usernames(request.usernames, request.created_after, request.limit)
+
+    async def report_progress(report):
+        await report_partial("progress", report)
+
+    runner = BatchPlanRunner(
+        manager,
+        requests_per_minute=request.requests_per_minute,
+        tokens_per_minute=request.tokens_per_minute,
+        concurrency=request.concurrency,
+        batch_size=request.batch_size,
+        # Keyed on the job so a resumed job skips users it already finished
+        checkpoint_path=os.path.join(tempfile.gettempdir(), f"clarity_batch_{job.job_id}.json"),
+        progress=report_progress
+    )
+    report = await runner.run(usernames)
+    return report
+
+job_queue.register("generate_plan", run_generate_plan_job)
+job_queue.register("update_cascade", run_update_cascade_job)
+job_queue.register("batch_generate_plans", run_batch_generate_plans_job)
+
+def job_accepted(job: Job) -> Dict[str, Any]:
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "status_url": f"/api/v3/jobs/{job.job_id}",
+        "events_url": f"/api/v3/jobs/{job.job_id}/events"
+    }
+
+@app.post("/api/v3/jobs/generate-plan/{username}", status_code=202)
+async def enqueue_generate_plan(username: str):
+    """Queue plan generation and return a job ID immediately"""
+    job = await job_queue.enqueue("generate_plan", username)
+    return job_accepted(job)
+
+@app.post("/api/v3/jobs/milestone/{timeframe}/{username}/update-cascade", status_code=202)
+async def enqueue_update_cascade(timeframe: str, username: str, request: MilestoneUpdateRequest):
+    """Queue a natural language cascade update and return a job ID immediately"""
+    valid_timeframes = MILESTONE_TIMEFRAMES
+    if timeframe not in valid_timeframes:
+        raise HTTPException(status_code=400, detail=f"Invalid timeframe. Must be one of: {valid_timeframes}")
+
+    job = await job_queue.enqueue("update_cascade", username, {
+        "timeframe": timeframe,
+        "user_thoughts": request.user_thoughts,
+        "context": request.context
+    })
+    return job_accepted(job)
+
+@app.post("/api/v3/batch/generate-plans", status_code=202)
+async def enqueue_batch_generate_plans(request: BatchPlanRequest):
+    """Queue plan generation for a list of users (or users selected from the database)"""
+    job = await job_queue.enqueue("batch_generate_plans", "batch", request.model_dump())
+    return job_accepted(job)
+
+@app.get("/api/v3/jobs/{job_id}", response_model=Job)
+async def get_job(job_id: str):
+    """Poll a job for its status, partial results and final result"""
+    job = await job_queue.get_async(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.get("/api/v3/jobs/{job_id}/events")
+async def watch_job(job_id: str):
+    """Stream job snapshots as server-sent events until the job finishes"""
+    if not await job_queue.get_async(job_id):
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+    async def event_stream():
+        async for job in job_queue.watch(job_id):
+            yield sse_event(job.status, job)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/v3/metrics")
+async def get_metrics():
+    """Runtime counters for tuning the LLM and database layers"""
+    return {
+        # Counting the disk tier is a SQLite query, so it runs off the event loop
+        "llm_cache": await asyncio.to_thread(manager.cache.stats) if manager.cache else None,
+        "llm_tokens": manager.token_usage.stats(),
+        "llm_client": manager.llm.stats(),
+        "single_flight": {
+            "generate_plan": plan_generation_flights.stats(),
+            "cascade": manager.flights.stats()
+        },
+        "jobs": job_queue.stats(),
+        "db": db_pool.stats(),
+        "plan_cache": plan_cache.stats() if plan_cache else None,
+        "plan_events": plan_events.stats()
+    }
+
 # TODO: Legacy endpoints to be reimplemented:
 # - PUT /api/v3/milestone/{timeframe}/{username}/update-naturally (replaced by update-cascade)
 # - PUT /api/v3/milestone/{timeframe}/{username} (replaced by direct-update)  
@@ -0,0 +1,166 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from typing import Dict, List, Any, Optional, Awaitable, Callable
+from db import listUsernamesFromDBAsync, getUserInformationForUsersFromDBAsync, storeUserPlansInDBAsync
+from models.batch import BatchReport
+from models.user import UserProfile, CareerPlan
+from utils.concurrency_utils import TokenBucket
+
+
+class BatchCheckpoint:
+    """Records completed and failed usernames in a JSON file so an interrupted run can resume"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.completed = set()
+        self.failures: Dict[str, str] = {}
+
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                data = json.load(f)
+            self.completed = set(data.get('completed', []))
+            self.failures = data.get('failures', {})
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"completed": sorted(self.completed), "failures": self.failures}, f)
+        os.replace(tmp_path, self.path)
+
+
+class BatchPlanRunner:
+    """
+    Generates plans for many users under requests-per-minute and tokens-per-minute budgets.
+
+    Users are processed in batches: profiles are fetched in one query per batch,
+    plans are generated concurrently as the rate budgets allow, and the batch's
+    plans are written with one storeUserPlansInDB call. Progress is checkpointed
+    after every batch, and users already completed in the checkpoint are skipped.
+    """
+
+    def __init__(self, manager, requests_per_minute: int = 60, tokens_per_minute: int = 80000,
+                 concurrency: int = 8, batch_size: int = 25, checkpoint_path: Optional[str] = None,
+                 progress: Optional[Callable[[BatchReport], Awaitable[None]]] = None):
+        self.manager = manager
+        self.request_budget = TokenBucket.per_minute(requests_per_minute)
+        self.token_budget = TokenBucket.per_minute(tokens_per_minute)
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.checkpoint = BatchCheckpoint(checkpoint_path)
+        self.progress = progress
+
+    async def run(self, usernames: List[str]) -> BatchReport:
+        started_at = time.monotonic()
+        usernames = list(dict.fromkeys(usernames))
+        pending = [username for username in usernames if username not in self.checkpoint.completed]
+
+        report = BatchReport(total=len(usernames), skipped=len(usernames) - len(pending))
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        for i in range(0, len(pending), self.batch_size):
+            batch = pending[i:i + self.batch_size]
+            profiles = await getUserInformationForUsersFromDBAsync(batch)
+
+            results = await asyncio.gather(
+                *(self._generate(username, profiles.get(username), semaphore, report) for username in batch),
+                return_exceptions=True
+            )
+
+            plans = []
+            for username, result in zip(batch, results):
+                if isinstance(result, Exception):
+                    self.checkpoint.failures[username] = str(result)
+                else:
+                    plans.append(result)
+
+            if plans:
+                try:
+                    await storeUserPlansInDBAsync(plans)
+                    for plan in plans:
+                        self.checkpoint.completed.add(plan.user_id)
+                        self.checkpoint.failures.pop(plan.user_id, None)
+                except Exception as e:
+                    for plan in plans:
+                        self.checkpoint.failures[plan.user_id] = f"Failed to store plan: {e}"
+
+            self.checkpoint.save()
+            self._update_report(report, pending, started_at)
+            if self.progress:
+                await self.progress(report)
+
+        self._update_report(report, pending, started_at)
+        return report
+
+    async def _generate(self, username: str, user_profile: Optional[UserProfile], semaphore: asyncio.Semaphore, report: BatchReport) -> CareerPlan:
+        if user_profile is None:
+            raise ValueError(f"User {username} not found")
+
+        requests, tokens = self.manager.plan_generation_budget(user_profile)
+        async with semaphore:
+            await self.request_budget.acquire(requests)
+            await self.token_budget.acquire(tokens)
+            report.estimated_tokens += tokens
+            # Each user's generation gets its own overall LLM deadline
+            with self.manager.llm.deadline_scope():
+                return await self.manager.generate_initial_plan_async(user_profile)
+
+    def _update_report(self, report: BatchReport, pending: List[str], started_at: float):
+        report.succeeded = sum(1 for username in pending if username in self.checkpoint.completed)
+        report.failures = {username: self.checkpoint.failures[username] for username in pending if username in self.checkpoint.failures}
+        report.failed = len(report.failures)
+        report.elapsed_seconds = round(time.monotonic() - started_at, 3)
+        report.plans_per_minute = round(report.succeeded / report.elapsed_seconds * 60, 2) if report.elapsed_seconds else 0.0
+
+
+async def resolve_usernames(usernames: Optional[List[str]] = None, created_after: Optional[str] = None, limit: Optional[int] = None) -> List[str]:
+    """Use the given usernames, or select them from User Information"""
+    if usernames:
+        return usernames[:limit] if limit else usernames
+    return await listUsernamesFromDBAsync(created_after, limit)
+
+
+async def main(argv: List[str]) -> BatchReport:
+    parser = argparse.ArgumentParser(description="Generate career plans for many users at once")
+    parser.add_argument("usernames", nargs="*", help="Usernames to generate plans for")
+    parser.add_argument("--file", help="File with one username per line")
+    parser.add_argument("--created-after", help="Select users whose profile was created after this timestamp")
+    parser.add_argument("--limit", type=int, help="Maximum number of users")
+    parser.add_argument("--rpm", type=int, default=60, help="LLM requests per minute")
+    parser.add_argument("--tpm", type=int, default=80000, help="LLM tokens per minute")
+    parser.add_argument("--concurrency", type=int, default=8, help="Plans generated at once")
+    parser.add_argument("--batch-size", type=int, default=25, help="Plans written per database batch")
+    parser.add_argument("--checkpoint", default="batch_checkpoint.json", help="Checkpoint file used to resume an interrupted run")
+    args = parser.parse_args(argv)
+
+    usernames = list(args.usernames)
+    if args.file:
+        with open(args.file, 'r') as f:
+            usernames += [line.strip() for line in f if line.strip()]
+
+    from plan_manager import CascadingPlanManager
+
+    async def print_progress(report: BatchReport) -> None:
+        print(f"Batch progress: {report.succeeded} succeeded, {report.failed} failed, {report.skipped} skipped of {report.total}")
+
+    runner = BatchPlanRunner(
+        CascadingPlanManager(),
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        checkpoint_path=args.checkpoint,
+        progress=print_progress
+    )
+    report = await runner.run(await resolve_usernames(usernames, args.created_after, args.limit))
+    print(json.dumps(report.model_dump(), indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
@@ -0,0 +1,3 @@
+"""
+Performance benchmarks for the v3 API, run against the local provider stand-ins in fakes/.
+"""
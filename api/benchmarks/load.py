@@ -0,0 +1,246 @@
+"""
+End-to-end load and latency benchmark for the v3 API.
+
+Starts the provider stand-ins (python -m fakes) in a subprocess, serves the app
+in-process through an ASGI transport, and drives each scenario at the configured
+concurrency. For every scenario it reports throughput, p50/p95/p99 latency,
+event-loop lag and memory per request, and compares them with a stored baseline.
+
+Run from api/:
+    python -m benchmarks.load                      # compare with benchmarks/baseline.json
+    python -m benchmarks.load --update-baseline    # record a new baseline
+    python -m benchmarks.load --scenarios generate-plan --requests 200 --concurrency 50
+
+Exits with status 1 when any metric regresses beyond the tolerance.
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import contextlib
+import subprocess
+import tracemalloc
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+SCENARIOS = ["generate-plan", "update-cascade", "direct-update", "regenerate-subsequent", "process-thoughts"]
+
+# Metrics where a larger value is a regression, with an absolute slack so tiny values aren't flagged on noise
+LOWER_IS_BETTER = {"p50_seconds": 0.005, "p95_seconds": 0.01, "p99_seconds": 0.02, "loop_lag_p99_seconds": 0.005, "error_rate": 0.01}
+HIGHER_IS_BETTER = {"throughput_rps": 0.0}
+
+RequestSpec = Tuple[str, str, Dict[str, Any]]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for no values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def scenario_request(name: str, i: int, users: int) -> RequestSpec:
+    """The (method, path, httpx kwargs) of the i-th request of a scenario"""
+    username = f"user{i % users}"
+    if name == "generate-plan":
+        return "POST", f"/api/v3/generate-plan/{username}", {}
+    if name == "update-cascade":
+        return "PUT", f"/api/v3/milestone/1_month/{username}/update-cascade", {"json": {"user_thoughts": f"I need more time for projects ({i})"}}
+    if name == "direct-update":
+        return "PUT", f"/api/v3/milestone/3_months/{username}/direct-update", {"json": {"timeline_weeks": 12 + i % 4, "user_notes": f"note {i}"}}
+    if name == "regenerate-subsequent":
+        return "POST", f"/api/v3/plan/{username}/regenerate-subsequent", {"params": {"updated_milestone": "1_month"}, "json": ["3_months", "1_year", "5_years"]}
+    if name == "process-thoughts":
+        return "POST", f"/api/v3/milestone/1_year/{username}/process-thoughts", {"json": {"user_thoughts": f"I want to focus on leadership ({i})"}}
+    raise ValueError(f"Unknown scenario: {name}")
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a task that sleeps in short fixed intervals"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            started_at = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - started_at - self.interval))
+
+    def start(self):
+        self.samples = []
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+
+
+async def run_scenario(client, name: str, requests: int, concurrency: int, users: int) -> Dict[str, Any]:
+    """Drive one scenario and summarise its latency, throughput, loop lag and memory"""
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    monitor = LoopLagMonitor()
+
+    async def one(i: int):
+        nonlocal errors
+        method, path, kwargs = scenario_request(name, i, users)
+        async with semaphore:
+            started_at = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            latencies.append(time.perf_counter() - started_at)
+        if response.status_code >= 400:
+            errors += 1
+
+    memory_before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    monitor.start()
+    started_at = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started_at
+    await monitor.stop()
+    memory_after, memory_peak = tracemalloc.get_traced_memory()
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "error_rate": round(errors / requests, 4),
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_seconds": round(percentile(latencies, 50), 4),
+        "p95_seconds": round(percentile(latencies, 95), 4),
+        "p99_seconds": round(percentile(latencies, 99), 4),
+        "loop_lag_p99_seconds": round(percentile(monitor.samples, 99), 4),
+        "loop_lag_max_seconds": round(max(monitor.samples, default=0.0), 4),
+        "peak_kb_per_inflight_request": round((memory_peak - memory_before) / 1024 / min(concurrency, requests), 1),
+        "retained_kb_per_request": round((memory_after - memory_before) / 1024 / requests, 2)
+    }
+
+
+def compare_to_baseline(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """Describe every metric that is worse than its baseline by more than the tolerance"""
+    regressions = []
+    for scenario, metrics in results.items():
+        expected = baseline.get(scenario)
+        if not expected:
+            continue
+        for metric, slack in LOWER_IS_BETTER.items():
+            if metric in expected and metrics[metric] > expected[metric] * (1 + tolerance) + slack:
+                regressions.append(f"{scenario}: {metric} {metrics[metric]} > baseline {expected[metric]}")
+        for metric in HIGHER_IS_BETTER:
+            if metric in expected and metrics[metric] < expected[metric] * (1 - tolerance):
+                regressions.append(f"{scenario}: {metric} {metrics[metric]} < baseline {expected[metric]}")
+    return regressions
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def fake_providers(users: int, latency: str, rate_limit_probability: float):
+    """Run the provider stand-ins in a subprocess and point this process at them"""
+    port = free_port()
+    env = dict(
+        os.environ,
+        FAKE_PROVIDERS_PORT=str(port),
+        FAKE_SUPABASE_SEED_USERS=str(users),
+        FAKE_LLM_LATENCY=latency,
+        FAKE_LLM_RATE_LIMIT_PROBABILITY=str(rate_limit_probability),
+        FAKE_LLM_SEED="1"
+    )
+    process = subprocess.Popen([sys.executable, "-m", "fakes"], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            with contextlib.suppress(OSError), socket.create_connection(("127.0.0.1", port), timeout=0.1):
+                break
+            time.sleep(0.1)
+        else:
+            raise RuntimeError("Fake providers did not start")
+        yield url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+async def run_benchmark(scenarios: List[str], requests: int, concurrency: int, verbose: bool) -> Dict[str, Dict[str, Any]]:
+    import httpx
+    # Imported here so the app picks up the FAKE_PROVIDERS_URL set by the caller
+    from api import app
+
+    results = {}
+    output = sys.stdout if verbose else io.StringIO()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=300) as client:
+        # Every mutation scenario needs a stored plan per user
+        if "generate-plan" not in scenarios:
+            with contextlib.redirect_stdout(output):
+                await run_scenario(client, "generate-plan", requests, concurrency, requests)
+
+        for name in scenarios:
+            with contextlib.redirect_stdout(output):
+                results[name] = await run_scenario(client, name, requests, concurrency, requests)
+            print(f"{name}: {json.dumps(results[name])}")
+            if not verbose:
+                output.seek(0)
+                output.truncate()
+    return results
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Load and latency benchmark for the v3 API")
+    parser.add_argument("--scenarios", nargs="+", default=SCENARIOS, choices=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=100, help="Requests per scenario (also the number of seeded users)")
+    parser.add_argument("--concurrency", type=int, default=20, help="Requests in flight at once")
+    parser.add_argument("--llm-latency", default="lognormal:0.2,0.4", help="Fake LLM latency distribution (see fakes.openai_stub.parse_latency)")
+    parser.add_argument("--rate-limit-probability", type=float, default=0.0, help="Share of fake LLM calls answered with a 429")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression before the run fails")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--verbose", action="store_true", help="Show the app's own output")
+    args = parser.parse_args(argv)
+
+    # Measure the uncached path with limits well above the offered load
+    os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+    os.environ.setdefault("LLM_REQUESTS_PER_MINUTE", "1000000")
+    os.environ.setdefault("LLM_TOKENS_PER_MINUTE", "1000000000")
+
+    with fake_providers(args.requests, args.llm_latency, args.rate_limit_probability) as url:
+        os.environ["FAKE_PROVIDERS_URL"] = url
+        tracemalloc.start()
+        results = asyncio.run(run_benchmark(args.scenarios, args.requests, args.concurrency, args.verbose))
+        tracemalloc.stop()
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one")
+        return 0
+
+    with open(args.baseline, "r") as f:
+        regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    print("Benchmark passed" if not regressions else f"{len(regressions)} regressions")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
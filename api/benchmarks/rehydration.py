@@ -0,0 +1,86 @@
+"""
+Microbenchmark for rebuilding a CareerPlan from its stored row.
+
+Compares validating the row with serving the plan from the plan cache, which
+is how hot reads avoid the validation cost.
+Rows are built from a realistically filled plan and round-tripped through JSON
+the way they come back from the database.
+
+Run from api/:
+    python -m benchmarks.rehydration
+    python -m benchmarks.rehydration --iterations 20000
+"""
+
+import sys
+import json
+import timeit
+import argparse
+from typing import Dict, List, Any
+
+import db
+from plan_cache import PlanCache
+from milestone_registry import MILESTONE_REGISTRY, milestone_fields
+from models.user import CareerPlan
+
+
+def sample_row(items: int = 5) -> Dict[str, Any]:
+    """A stored plan row whose milestones have every detail field filled"""
+    milestones = {}
+    for timeframe, spec in MILESTONE_REGISTRY.items():
+        details = {}
+        for field, default in spec.detail_defaults.items():
+            if field in ("resources", "immediate_tools"):
+                details[field] = [{"name": f"{field} {i}", "url": f"https://example.com/{i}"} for i in range(items)]
+            elif isinstance(default, list):
+                details[field] = [f"{field} item {i} with a few descriptive words" for i in range(items)]
+            elif isinstance(default, dict):
+                details[field] = {f"key{i}": f"value {i}" for i in range(items)}
+            elif isinstance(default, str):
+                details[field] = f"{field} text " * items
+        milestones[timeframe] = spec.build({"title": f"{timeframe} milestone", "overview": "Milestone overview " * 10, "details": details})
+
+    plan = CareerPlan(
+        plan_id="plan_benchmark",
+        user_id="benchmark",
+        overview={"summary": "Plan summary " * 20, "key_focus_areas": ["a", "b", "c"]},
+        created_date="2024-01-01T00:00:00+00:00",
+        last_updated="2024-01-01T00:00:00+00:00",
+        **milestone_fields(milestones)
+    )
+    return json.loads(json.dumps(db.planToDBRow(plan)))
+
+
+def per_call_us(fn, iterations: int) -> float:
+    return min(timeit.repeat(fn, number=iterations, repeat=3)) / iterations * 1e6
+
+
+def run_benchmark(iterations: int = 5000) -> Dict[str, float]:
+    """Microseconds per plan for each way of getting a plan from its row"""
+    row = sample_row()
+
+    cache = PlanCache()
+    cache.set("benchmark", db.careerPlanFromDBRow(row), len(json.dumps(row)))
+
+    results = {
+        "validated_us": per_call_us(lambda: db.careerPlanFromDBRow(row), iterations),
+        "cache_hit_us": per_call_us(lambda: cache.get("benchmark"), iterations),
+        "row_bytes": len(json.dumps(row))
+    }
+    results["cache_speedup"] = results["validated_us"] / results["cache_hit_us"]
+    return results
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Plan rehydration microbenchmark")
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.iterations)
+    print(f"Row size: {results['row_bytes']} bytes")
+    print(f"{'full validation':>16}: {results['validated_us']:8.1f} us/plan")
+    print(f"{'plan cache hit':>16}: {results['cache_hit_us']:8.1f} us/plan ({results['cache_speedup']:.0f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,12 +1,21 @@
 import os
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 
 # Load environment variables from .env file
 load_dotenv('../.env')
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Set to the URL of the local stand-ins (python -m fakes) to run without the real providers
+FAKE_PROVIDERS_URL = os.getenv("FAKE_PROVIDERS_URL")
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY") or ("fake" if FAKE_PROVIDERS_URL else None)
 if not OPENAI_API_KEY:
     raise Exception("OPENAI_API_KEY not found in environment variables")
 
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
\ No newline at end of file
+OPENAI_BASE_URL = f"{FAKE_PROVIDERS_URL}/v1" if FAKE_PROVIDERS_URL else None
+
+# Retries are handled by llm_client.ResilientLLMClient, which shares backoff and limits across calls
+openai_client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, max_retries=0)
+
+# Async client used by the API endpoints so LLM calls don't block the event loop
+async_openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, max_retries=0)
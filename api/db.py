@@ -1,120 +1,164 @@
 import os
+import json
+import asyncio
 from supabase import create_client, Client
+from postgrest.types import ReturnMethod
 from dotenv import load_dotenv
 from models.milestone import *
 from models.user import *
 from utils.timestamp_utils import get_current_timestamp
+from db_pool import create_supabase_pool_from_env
+from plan_cache import create_plan_cache_from_env
+from milestone_registry import MILESTONE_REGISTRY
+from plan_events import create_plan_event_hub_from_env
 
 load_dotenv('../.env')
 
 url: str = os.getenv("REACT_APP_SUPABASE_URL")
 key: str = os.getenv("REACT_APP_SUPABASE_ANON_KEY")
+
+# Point at the local stand-ins (python -m fakes) to run without the real database
+if os.getenv("FAKE_PROVIDERS_URL"):
+    from fakes import FAKE_SUPABASE_KEY
+    url, key = os.getenv("FAKE_PROVIDERS_URL"), FAKE_SUPABASE_KEY
+
 supabase: Client = create_client(url, key)
 
+# Pooled async connections used by the *Async queries
+pool = create_supabase_pool_from_env(url, key)
+
+# Read-through/write-through cache of plans by username (None when disabled)
+plan_cache = create_plan_cache_from_env()
+
+# Pushes stored plan changes to subscribed clients
+plan_events = create_plan_event_hub_from_env()
+
 CAREER_PLANS = 'Career Plans'
 USER_INFORMATION = 'User Information'
 
 def getUserPlanFromDB(username: str):
     user_data = {}
     try:
+        if plan_cache:
+            cached, expired = plan_cache.get(username)
+            if cached is not None and expired:
+                response = supabase.table(CAREER_PLANS).select("last_updated").eq("username", username).execute()
+                cached = plan_cache.revalidate(username, response.data[0]['last_updated'] if response.data else None)
+            if cached is not None:
+                return cached
+
         # Look up by username field (Career Plans table uses username, not user_id)
         response = supabase.table(CAREER_PLANS).select("*").eq("username", username).execute()
         if response.data:
-            # Reconstruct milestone objects from stored data
-            milestone_1 = None
-            milestone_2 = None
-            milestone_3 = None
-            milestone_4 = None
-            
-            if response.data[0]['milestone_1']:
-                m1_data = response.data[0]['milestone_1']
-                details_data = m1_data.get('details', {})
-                milestone_1 = Milestone1(
-                    milestone_id=m1_data.get('milestone_id', ''),
-                    title=m1_data.get('title', ''),
-                    overview=m1_data.get('overview', ''),
-                    completion_status=m1_data.get('completion_status', 0.0),
-                    status=m1_data.get('status', 'pending'),
-                    details=Milestone1Detail(**details_data)
-                )
-            
-            if response.data[0]['milestone_2']:
-                m2_data = response.data[0]['milestone_2']
-                details_data = m2_data.get('details', {})
-                milestone_2 = Milestone2(
-                    milestone_id=m2_data.get('milestone_id', ''),
-                    title=m2_data.get('title', ''),
-                    overview=m2_data.get('overview', ''),
-                    completion_status=m2_data.get('completion_status', 0.0),
-                    status=m2_data.get('status', 'pending'),
-                    details=Milestone2Detail(**details_data)
-                )
-            
-            if response.data[0]['milestone_3']:
-                m3_data = response.data[0]['milestone_3']
-                details_data = m3_data.get('details', {})
-                milestone_3 = Milestone3(
-                    milestone_id=m3_data.get('milestone_id', ''),
-                    title=m3_data.get('title', ''),
-                    overview=m3_data.get('overview', ''),
-                    completion_status=m3_data.get('completion_status', 0.0),
-                    status=m3_data.get('status', 'pending'),
-                    details=Milestone3Detail(**details_data)
-                )
-            
-            if response.data[0]['milestone_4']:
-                m4_data = response.data[0]['milestone_4']
-                details_data = m4_data.get('details', {})
-                milestone_4 = Milestone4(
-                    milestone_id=m4_data.get('milestone_id', ''),
-                    title=m4_data.get('title', ''),
-                    overview=m4_data.get('overview', ''),
-                    completion_status=m4_data.get('completion_status', 0.0),
-                    status=m4_data.get('status', 'pending'),
-                    details=Milestone4Detail(**details_data)
-                )
-            
-            user_data = CareerPlan(
-                plan_id=response.data[0]['plan_id'],
-                user_id=response.data[0]['username'],
-                overview=response.data[0]['overview'],
-                milestone_1=milestone_1,
-                milestone_2=milestone_2,
-                milestone_3=milestone_3,
-                milestone_4=milestone_4,
-                created_date=response.data[0]['created_date'],
-                last_updated=response.data[0]['last_updated']
-            )
+            user_data = careerPlanFromDBRow(response.data[0])
+            cachePlan(user_data, response.data[0])
     except Exception as e:
         print(f"No career plan found for {username}: {e}")
     
     return user_data
 
 
+def milestoneFromDBData(timeframe: str, m_data: dict) -> Milestone:
+    # Reconstruct one milestone object from its stored column
+    return MILESTONE_REGISTRY[timeframe].from_stored(m_data)
 
 
-def storeUserPlanInDB(plan: CareerPlan):
+def careerPlanFromDBRow(row: dict) -> CareerPlan:
+    milestones = {
+        spec.field: spec.from_stored(row[spec.field]) if row[spec.field] else None
+        for spec in MILESTONE_REGISTRY.values()
+    }
+    
+    return CareerPlan(
+        plan_id=row['plan_id'],
+        user_id=row['username'],
+        overview=row['overview'],
+        created_date=row['created_date'],
+        last_updated=row['last_updated'],
+        **milestones
+    )
+
 
+def getUserMilestoneFromDB(username: str, timeframe: str):
+    # Returns (plan exists, milestone or None, plan last_updated), reading only the one milestone column
+    column = MILESTONE_REGISTRY[timeframe].field
     try:
-        plan_db = {
-            "plan_id": plan.plan_id,
-            "username": plan.user_id,  # Career Plans table uses username field
-            "created_date": plan.created_date,
-            "last_updated": get_current_timestamp(),
-            "overview": plan.overview,
-            "milestone_1": plan.milestone_1.model_dump() if plan.milestone_1 else None,
-            "milestone_2": plan.milestone_2.model_dump() if plan.milestone_2 else None,
-            "milestone_3": plan.milestone_3.model_dump() if plan.milestone_3 else None,
-            "milestone_4": plan.milestone_4.model_dump() if plan.milestone_4 else None
+        cached, expired = plan_cache.get(username) if plan_cache else (None, False)
+        if cached is not None and not expired:
+            return True, getattr(cached, column), cached.last_updated
+
+        response = supabase.table(CAREER_PLANS).select(f"{column},last_updated").eq("username", username).execute()
+        return milestoneFromProjectedRow(username, timeframe, response.data[0] if response.data else None, cached)
+    except Exception as e:
+        print(f"No career plan found for {username}: {e}")
+        return False, None, None
+
+
+def milestoneFromProjectedRow(username: str, timeframe: str, row: dict, cached: CareerPlan = None):
+    column = MILESTONE_REGISTRY[timeframe].field
+    if row is None:
+        if cached is not None:
+            plan_cache.invalidate(username)
+        return False, None, None
+
+    # An expired cached plan that is still current serves the milestone without validating it again
+    if cached is not None:
+        revalidated = plan_cache.revalidate(username, row['last_updated'])
+        if revalidated is not None:
+            return True, getattr(revalidated, column), revalidated.last_updated
+
+    return True, milestoneFromDBData(timeframe, row[column]) if row[column] else None, row['last_updated']
+
+
+def planToDBRow(plan: CareerPlan):
+    return {
+        "plan_id": plan.plan_id,
+        "username": plan.user_id,  # Career Plans table uses username field
+        "created_date": plan.created_date,
+        "last_updated": get_current_timestamp(),
+        "overview": plan.overview,
+        **{
+            spec.field: milestone.model_dump() if milestone else None
+            for spec in MILESTONE_REGISTRY.values()
+            for milestone in [getattr(plan, spec.field)]
         }
+    }
+
+
+def cachePlan(plan: CareerPlan, row: dict, written: bool = False):
+    # The plan takes the stored row's last_updated, so it can be revalidated against the table
+    # and its ETag matches the one later reads of the row produce
+    plan.last_updated = row['last_updated']
+    if plan_cache:
+        plan_cache.set(plan.user_id, plan, len(json.dumps(row, default=str)), written=written)
+
 
-        # Try to update first, if no entry is updated, then insert
-        data = supabase.table(CAREER_PLANS).update(plan_db).eq("username", plan.user_id).execute()
-        if not data.data or (isinstance(data.data, list) and len(data.data) == 0):
-            # No rows updated, so insert instead
-            data = supabase.table(CAREER_PLANS).insert(plan_db).execute()
+def planStored(plan: CareerPlan, row: dict):
+    # After a successful write: replace the cached plan and push its changes to subscribers
+    cachePlan(plan, row, written=True)
+    plan_events.publish(plan)
+
+
+def invalidateCachedPlans(usernames: list):
+    if plan_cache:
+        for username in usernames:
+            plan_cache.invalidate(username)
+
+
+def storeUserPlanInDB(plan: CareerPlan):
+
+    try:
+        plan_db = planToDBRow(plan)
+
+        # One atomic upsert keyed on username inserts a first plan or replaces the existing one
+        supabase.table(CAREER_PLANS).upsert(plan_db, on_conflict="username", returning=ReturnMethod.minimal).execute()
+        planStored(plan, plan_db)
+        return 1
     except Exception as e:
         print(f"Unable to store Career Plan to db {e}")
+        # The stored row is now unknown, so the next read goes to the database
+        invalidateCachedPlans([plan.user_id])
+        return 0
 
 
 def getUserInformationFromDB(username: str):
@@ -122,15 +166,195 @@ def getUserInformationFromDB(username: str):
     response = supabase.table(USER_INFORMATION).select("*").eq("username", username).execute()
     
     if response.data:
-        user_profile = UserProfile(
-            username=response.data[0]['username'],
-            interests_values=response.data[0]['Interests + Values'],
-            work_experience=response.data[0]['Work Experience'],
-            circumstances=response.data[0]['Circumstances'],
-            skills=response.data[0]['Skills'],
-            goals=response.data[0]['Goals'],
-            created_at=response.data[0].get('created_at'),
-            last_updated=response.data[0].get('last_updated')
+        return userProfileFromDBRow(response.data[0])
+
+
+def userProfileFromDBRow(row: dict) -> UserProfile:
+    return UserProfile(
+        username=row['username'],
+        interests_values=row['Interests + Values'],
+        work_experience=row['Work Experience'],
+        circumstances=row['Circumstances'],
+        skills=row['Skills'],
+        goals=row['Goals'],
+        created_at=row.get('created_at'),
+        last_updated=row.get('last_updated')
+    )
+
+
+# Batch queries for bulk plan generation
+
+def listUsernamesFromDB(created_after: str = None, limit: int = None):
+    # Usernames from User Information, optionally only profiles created after a timestamp
+    query = supabase.table(USER_INFORMATION).select("username")
+    if created_after:
+        query = query.gt("created_at", created_after)
+    query = query.order("created_at")
+    if limit:
+        query = query.limit(limit)
+    response = query.execute()
+    return [row['username'] for row in response.data or []]
+
+
+def getUserInformationForUsersFromDB(usernames: list):
+    # One round trip for a whole batch of profiles, keyed by username
+    if not usernames:
+        return {}
+    response = supabase.table(USER_INFORMATION).select("*").in_("username", usernames).execute()
+    return {row['username']: userProfileFromDBRow(row) for row in response.data or []}
+
+
+def latestPlansByUsername(plans: list) -> list:
+    # An upsert can't write the same key twice in one statement, so only each user's last plan is kept
+    return list({plan.user_id: plan for plan in plans}.values())
+
+
+def storeUserPlansInDB(plans: list):
+    # Upsert every plan in one request; users that already have a plan row are updated in place
+    plans = latestPlansByUsername(plans)
+    if not plans:
+        return 0
+
+    rows = [planToDBRow(plan) for plan in plans]
+    # Dropped first so a failed batch can't leave cached plans the table no longer matches
+    invalidateCachedPlans([row["username"] for row in rows])
+    supabase.table(CAREER_PLANS).upsert(rows, on_conflict="username", returning=ReturnMethod.minimal).execute()
+
+    for plan, row in zip(plans, rows):
+        planStored(plan, row)
+
+    return len(rows)
+
+
+# Async versions of the queries above. These share a pool of keep-alive connections
+# (see db_pool.py), so concurrent requests don't queue behind one another or pay for
+# a new TLS handshake per query.
+
+async def getUserPlanFromDBAsync(username: str):
+    user_data = {}
+    try:
+        if plan_cache:
+            cached, expired = plan_cache.get(username)
+            if cached is not None and expired:
+                response = await pool.execute("revalidate_plan", pool.table(CAREER_PLANS).select("last_updated").eq("username", username))
+                cached = plan_cache.revalidate(username, response.data[0]['last_updated'] if response.data else None)
+            if cached is not None:
+                return cached
+
+        response = await pool.execute("get_plan", pool.table(CAREER_PLANS).select("*").eq("username", username))
+        if response.data:
+            user_data = careerPlanFromDBRow(response.data[0])
+            cachePlan(user_data, response.data[0])
+    except Exception as e:
+        print(f"No career plan found for {username}: {e}")
+
+    return user_data
+
+
+async def getPlanFreshnessFromDBAsync(username: str):
+    # Returns (plan last_updated, profile last_updated), None where a row is missing,
+    # fetching only those columns, concurrently
+    async def plan_stamp():
+        try:
+            cached, expired = plan_cache.get(username) if plan_cache else (None, False)
+            if cached is not None and not expired:
+                return cached.last_updated
+            response = await pool.execute("plan_timestamp", pool.table(CAREER_PLANS).select("last_updated").eq("username", username))
+            if not response.data:
+                if cached is not None:
+                    plan_cache.invalidate(username)
+                return None
+            row = response.data[0]
+            if cached is not None:
+                # Revalidated here, loading the plan afterwards needs no further query
+                plan_cache.revalidate(username, row['last_updated'])
+            return row['last_updated']
+        except Exception as e:
+            print(f"No career plan found for {username}: {e}")
+            return None
+
+    async def user_last_updated():
+        try:
+            response = await pool.execute("user_timestamp", pool.table(USER_INFORMATION).select("last_updated").eq("username", username))
+            return response.data[0]['last_updated'] if response.data else None
+        except Exception as e:
+            print(f"Unable to read profile timestamp for {username}: {e}")
+            return None
+
+    plan_last_updated, profile_last_updated = await asyncio.gather(plan_stamp(), user_last_updated())
+    return plan_last_updated, profile_last_updated
+
+
+async def getUserMilestoneFromDBAsync(username: str, timeframe: str):
+    column = MILESTONE_REGISTRY[timeframe].field
+    try:
+        cached, expired = plan_cache.get(username) if plan_cache else (None, False)
+        if cached is not None and not expired:
+            return True, getattr(cached, column), cached.last_updated
+
+        response = await pool.execute("get_milestone", pool.table(CAREER_PLANS).select(f"{column},last_updated").eq("username", username))
+        return milestoneFromProjectedRow(username, timeframe, response.data[0] if response.data else None, cached)
+    except Exception as e:
+        print(f"No career plan found for {username}: {e}")
+        return False, None, None
+
+
+async def storeUserPlanInDBAsync(plan: CareerPlan):
+    try:
+        plan_db = planToDBRow(plan)
+
+        await pool.execute(
+            "upsert_plan",
+            pool.table(CAREER_PLANS).upsert(plan_db, on_conflict="username", returning=ReturnMethod.minimal),
+            rows=1
         )
+        planStored(plan, plan_db)
+        return 1
+    except Exception as e:
+        print(f"Unable to store Career Plan to db {e}")
+        invalidateCachedPlans([plan.user_id])
+        return 0
+
+
+async def getUserInformationFromDBAsync(username: str):
+    response = await pool.execute("get_user", pool.table(USER_INFORMATION).select("*").eq("username", username))
+
+    if response.data:
+        return userProfileFromDBRow(response.data[0])
+
+
+async def listUsernamesFromDBAsync(created_after: str = None, limit: int = None):
+    query = pool.table(USER_INFORMATION).select("username")
+    if created_after:
+        query = query.gt("created_at", created_after)
+    query = query.order("created_at")
+    if limit:
+        query = query.limit(limit)
+    response = await pool.execute("list_usernames", query)
+    return [row['username'] for row in response.data or []]
+
+
+async def getUserInformationForUsersFromDBAsync(usernames: list):
+    if not usernames:
+        return {}
+    response = await pool.execute("get_users", pool.table(USER_INFORMATION).select("*").in_("username", usernames))
+    return {row['username']: userProfileFromDBRow(row) for row in response.data or []}
+
+
+async def storeUserPlansInDBAsync(plans: list):
+    plans = latestPlansByUsername(plans)
+    if not plans:
+        return 0
+
+    rows = [planToDBRow(plan) for plan in plans]
+    invalidateCachedPlans([row["username"] for row in rows])
+    await pool.execute(
+        "upsert_plans",
+        pool.table(CAREER_PLANS).upsert(rows, on_conflict="username", returning=ReturnMethod.minimal),
+        rows=len(rows)
+    )
+
+    for plan, row in zip(plans, rows):
+        planStored(plan, row)
 
-        return user_profile
\ No newline at end of file
+    return len(rows)
@@ -0,0 +1,110 @@
+import os
+import time
+import asyncio
+from typing import Dict, Any, Optional
+import httpx
+from postgrest import AsyncPostgrestClient
+from utils.latency_utils import LatencyTracker
+
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """Async PostgREST client whose HTTP session keeps a bounded pool of keep-alive connections"""
+
+    def __init__(self, base_url: str, headers: Dict[str, str], timeout: httpx.Timeout, limits: httpx.Limits,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._limits = limits
+        self._transport = transport
+        super().__init__(base_url, headers=headers, timeout=timeout)
+
+    def create_session(self, base_url: str, headers: Dict[str, str], timeout: httpx.Timeout) -> httpx.AsyncClient:
+        return httpx.AsyncClient(base_url=base_url, headers=headers, timeout=timeout, limits=self._limits, transport=self._transport)
+
+
+class SupabasePool:
+    """
+    Shared async access to the Supabase REST API over pooled keep-alive connections.
+
+    Concurrent queries each take their own connection from the pool instead of
+    queueing behind one another, and connections (and their TLS sessions) are
+    reused across requests. Every query is timed per operation name.
+    """
+
+    def __init__(self, url: str, key: str, max_connections: int = 20, max_keepalive_connections: int = 10,
+                 keepalive_expiry: float = 30.0, connect_timeout: float = 5.0, timeout: float = 10.0,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = f"{url.rstrip('/')}/rest/v1"
+        self.headers = {"apiKey": key, "Authorization": f"Bearer {key}"}
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.transport = transport
+        self._client: Optional[PooledPostgrestClient] = None
+        self._loop = None
+        self._latencies: Dict[str, LatencyTracker] = {}
+        self._errors: Dict[str, int] = {}
+        self._rows_written: Dict[str, int] = {}
+
+    def client(self) -> PooledPostgrestClient:
+        # Connections belong to the event loop that opened them, so a new loop gets its own pool
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._client = PooledPostgrestClient(self.base_url, self.headers, self.timeout, self.limits, self.transport)
+        return self._client
+
+    def table(self, name: str):
+        return self.client().table(name)
+
+    async def execute(self, operation: str, query, rows: int = 0) -> Any:
+        """
+        Run a query built from table(), recording its latency under the operation name.
+
+        Writes pass the number of rows they write, which is reported per operation.
+        """
+        started_at = time.monotonic()
+        try:
+            response = await query.execute()
+        except Exception:
+            self._errors[operation] = self._errors.get(operation, 0) + 1
+            raise
+        self._latencies.setdefault(operation, LatencyTracker()).record(time.monotonic() - started_at)
+        self._rows_written[operation] = self._rows_written.get(operation, 0) + rows
+        return response
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "queries": {
+                operation: {
+                    **self._latencies.get(operation, LatencyTracker()).stats(),
+                    "errors": self._errors.get(operation, 0),
+                    "rows_written": self._rows_written.get(operation, 0)
+                }
+                for operation in sorted(set(self._latencies) | set(self._errors))
+            },
+            "errors": sum(self._errors.values()),
+            "rows_written": sum(self._rows_written.values())
+        }
+
+
+def create_supabase_pool_from_env(url: str, key: str) -> SupabasePool:
+    """Pool sized and timed by the SUPABASE_POOL_* environment variables"""
+    return SupabasePool(
+        url,
+        key,
+        max_connections=int(os.getenv("SUPABASE_POOL_MAX_CONNECTIONS", "20")),
+        max_keepalive_connections=int(os.getenv("SUPABASE_POOL_MAX_KEEPALIVE", "10")),
+        keepalive_expiry=float(os.getenv("SUPABASE_POOL_KEEPALIVE_SECONDS", "30")),
+        connect_timeout=float(os.getenv("SUPABASE_CONNECT_TIMEOUT_SECONDS", "5")),
+        timeout=float(os.getenv("SUPABASE_TIMEOUT_SECONDS", "10"))
+    )
@@ -0,0 +1,22 @@
+"""
+Local stand-ins for the OpenAI and Supabase APIs, for offline load and latency testing.
+
+Start them from api/ with `python -m fakes` (port FAKE_PROVIDERS_PORT, default 8010)
+and point the app at them with FAKE_PROVIDERS_URL=http://127.0.0.1:8010. The LLM
+stand-in is configured with FAKE_LLM_* variables (latency distribution, tokens per
+second, injected 429 rate) and User Information is seeded with
+FAKE_SUPABASE_SEED_USERS synthetic profiles named user0, user1, ...
+"""
+
+from .server import create_fake_app, create_fake_app_from_env, FAKE_SUPABASE_KEY
+from .openai_stub import FakeLLMConfig
+from .supabase_stub import InMemoryTables, seed_users
+
+__all__ = [
+    'create_fake_app',
+    'create_fake_app_from_env',
+    'FAKE_SUPABASE_KEY',
+    'FakeLLMConfig',
+    'InMemoryTables',
+    'seed_users'
+]
@@ -0,0 +1,7 @@
+import os
+import uvicorn
+from fakes.server import create_fake_app_from_env
+
+# Run from api/: python -m fakes
+if __name__ == "__main__":
+    uvicorn.run(create_fake_app_from_env(), host="127.0.0.1", port=int(os.getenv("FAKE_PROVIDERS_PORT", "8010")))
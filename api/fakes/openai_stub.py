@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+from typing import Dict, List, Any, Optional, Callable
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from prompts import OVERVIEW_SCHEMA, MILESTONE_PROMPT_SKELETONS, milestone_schema
+from utils.token_utils import estimate_tokens, estimate_prompt_tokens
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Build a latency sampler from a spec such as `fixed:0.5`, `uniform:0.2,1.5`,
+    `exponential:0.8` (mean) or `lognormal:1.0,0.6` (median, sigma), in seconds.
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(value) for value in args.split(",") if value.strip()]
+
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "exponential":
+        return lambda rng: rng.expovariate(1.0 / values[0])
+    if kind == "lognormal":
+        import math
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class FakeLLMConfig:
+    """Behaviour of the fake chat completions endpoint, read from FAKE_LLM_* environment variables"""
+
+    def __init__(self, latency: str = "fixed:0", tokens_per_second: float = 0.0, rate_limit_probability: float = 0.0,
+                 retry_after_seconds: float = 1.0, stream_chunk_chars: int = 40, seed: Optional[int] = None):
+        self.latency_spec = latency
+        self.sample_latency = parse_latency(latency)
+        self.tokens_per_second = tokens_per_second
+        self.rate_limit_probability = rate_limit_probability
+        self.retry_after_seconds = retry_after_seconds
+        self.stream_chunk_chars = stream_chunk_chars
+        self.rng = random.Random(seed)
+
+        self.requests = 0
+        self.rate_limited = 0
+
+    @classmethod
+    def from_env(cls) -> "FakeLLMConfig":
+        seed = os.getenv("FAKE_LLM_SEED")
+        return cls(
+            latency=os.getenv("FAKE_LLM_LATENCY", "lognormal:0.5,0.5"),
+            tokens_per_second=float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "0")),
+            rate_limit_probability=float(os.getenv("FAKE_LLM_RATE_LIMIT_PROBABILITY", "0")),
+            retry_after_seconds=float(os.getenv("FAKE_LLM_RETRY_AFTER_SECONDS", "1")),
+            stream_chunk_chars=int(os.getenv("FAKE_LLM_STREAM_CHUNK_CHARS", "40")),
+            seed=int(seed) if seed else None
+        )
+
+    def generation_seconds(self, content: str) -> float:
+        if not self.tokens_per_second:
+            return 0.0
+        return estimate_tokens(content) / self.tokens_per_second
+
+
+def fake_milestone(timeframe: str) -> Dict[str, Any]:
+    milestone = milestone_schema(timeframe)
+    milestone["title"] = f"{MILESTONE_PROMPT_SKELETONS[timeframe]['title']}: {timeframe.replace('_', ' ')}"
+    return milestone
+
+
+def fake_completion_content(prompt: str) -> str:
+    """Schema-valid response content for each prompt the plan manager sends"""
+    if "LATER MILESTONES" in prompt:
+        line = next(line for line in prompt.splitlines() if "LATER MILESTONES" in line)
+        later = prompt.split(line, 1)[1].split("USER'S THOUGHTS", 1)[0]
+        return json.dumps({
+            "reasoning": "The user wants more time for hands-on practice.",
+            "updates": {"objectives": ["Build a portfolio project"], "timeline_weeks": 8, "priority_level": "high"},
+            "milestones": {timeframe: fake_milestone(timeframe) for timeframe in MILESTONE_PROMPT_SKELETONS if f'"{timeframe}"' in later}
+        })
+
+    # Cascade prompts carry the plan overview too, so they are told apart first
+    if "MILESTONES TO UPDATE" in prompt:
+        line = next(line for line in prompt.splitlines() if "MILESTONES TO UPDATE" in line)
+        timeframes = [t for t in MILESTONE_PROMPT_SKELETONS if t in line]
+        return json.dumps({timeframe: fake_milestone(timeframe) for timeframe in timeframes})
+
+    if "PLAN OVERVIEW" in prompt:
+        timeframe = next((t for t in MILESTONE_PROMPT_SKELETONS if f"Create the {t} milestone" in prompt or f"The {t} milestone in the previous response" in prompt), "1_month")
+        return json.dumps(fake_milestone(timeframe))
+
+    if "USER'S THOUGHTS" in prompt:
+        return json.dumps({
+            "reasoning": "The user wants more time for hands-on practice.",
+            "updates": {
+                "objectives": ["Build a portfolio project", "Practise interview questions"],
+                "timeline_weeks": 8,
+                "focus_areas": ["projects"],
+                "user_notes": "Extended to leave room for practice",
+                "priority_level": "high"
+            }
+        })
+
+    if '"milestones"' in prompt:
+        return json.dumps({
+            "overview": OVERVIEW_SCHEMA,
+            "milestones": {timeframe: fake_milestone(timeframe) for timeframe in MILESTONE_PROMPT_SKELETONS}
+        })
+
+    if "overview" in prompt.lower():
+        return json.dumps(OVERVIEW_SCHEMA)
+
+    return "{}"
+
+
+def create_openai_router(config: FakeLLMConfig) -> APIRouter:
+    """OpenAI-compatible POST /v1/chat/completions, streaming and non-streaming"""
+    router = APIRouter()
+
+    @router.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        config.requests += 1
+
+        if config.rng.random() < config.rate_limit_probability:
+            config.rate_limited += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached (injected)", "type": "requests", "code": "rate_limit_exceeded"}},
+                status_code=429,
+                headers={"retry-after": f"{config.retry_after_seconds:g}"}
+            )
+
+        prompt = "\n".join(message.get("content", "") for message in body.get("messages", []))
+        content = fake_completion_content(prompt)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model", "gpt-4")
+
+        # Time to first token, then generation time spread over the content
+        await asyncio.sleep(config.sample_latency(config.rng))
+
+        if body.get("stream"):
+            chunks = [content[i:i + config.stream_chunk_chars] for i in range(0, len(content), config.stream_chunk_chars)]
+            chunk_delay = config.generation_seconds(content) / max(1, len(chunks))
+
+            async def events():
+                for chunk in chunks:
+                    if chunk_delay:
+                        await asyncio.sleep(chunk_delay)
+                    payload = {
+                        "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]
+                    }
+                    yield f"data: {json.dumps(payload)}\n\n"
+                payload = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+                }
+                yield f"data: {json.dumps(payload)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await asyncio.sleep(config.generation_seconds(content))
+        prompt_tokens = estimate_prompt_tokens(body)
+        completion_tokens = estimate_tokens(content)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+        }
+
+    return router
@@ -0,0 +1,266 @@
+import copy
+import json
+import random
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import JSONResponse
+from utils.timestamp_utils import get_current_timestamp
+
+# PostgREST operators supported in filters, e.g. ?username=eq.alice
+FILTER_OPERATORS = {
+    "eq": lambda value, arg: value is not None and str(value) == arg,
+    "neq": lambda value, arg: value is None or str(value) != arg,
+    "gt": lambda value, arg: value is not None and str(value) > arg,
+    "gte": lambda value, arg: value is not None and str(value) >= arg,
+    "lt": lambda value, arg: value is not None and str(value) < arg,
+    "lte": lambda value, arg: value is not None and str(value) <= arg,
+    "is": lambda value, arg: (value is None) if arg == "null" else str(value).lower() == arg,
+}
+
+# Query parameters that are not column filters
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+# Columns of the deployed tables. Like PostgREST, the stub rejects reads and writes that
+# name any other column, so code that drifts from the real schema fails in tests too
+TABLE_COLUMNS = {
+    "Career Plans": {
+        "id", "created_at", "plan_id", "username", "created_date", "last_updated", "overview",
+        "milestone_1", "milestone_2", "milestone_3", "milestone_4"
+    },
+    "User Information": {
+        "id", "user_id", "created_at", "username", "last_updated",
+        "Interests + Values", "Work Experience", "Circumstances", "Skills", "Goals"
+    },
+}
+
+
+def split_list(text: str) -> List[str]:
+    """Split a PostgREST list such as `a,"b.c",d`, honouring double quotes"""
+    items, current, quoted = [], "", False
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif char == "," and not quoted:
+            items.append(current)
+            current = ""
+        else:
+            current += char
+    items.append(current)
+    return [item.strip() for item in items if item.strip()]
+
+
+class InMemoryTables:
+    """Thread-safe in-memory rows per table, queried with PostgREST filter semantics"""
+
+    def __init__(self):
+        self._tables: Dict[str, List[Dict[str, Any]]] = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def rows(self, table: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return copy.deepcopy(self._tables.get(table, []))
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+
+    def select(self, table: str, filters: List[Tuple[str, str]], order: Optional[str] = None,
+               limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = [row for row in self._tables.get(table, []) if self._matches(row, filters)]
+            for clause in reversed(split_list(order or "")):
+                column, _, direction = clause.partition(".")
+                descending = direction.startswith("desc")
+                rows = sorted(rows, key=lambda row: (row.get(column) is None, str(row.get(column))), reverse=descending)
+            rows = rows[offset:offset + limit if limit is not None else None]
+            return copy.deepcopy(rows)
+
+    def insert(self, table: str, rows: List[Dict[str, Any]], on_conflict: Optional[str] = None, merge: bool = False) -> List[Dict[str, Any]]:
+        written = []
+        with self._lock:
+            existing = self._tables.setdefault(table, [])
+            for row in rows:
+                row = copy.deepcopy(row)
+                match = None
+                if on_conflict:
+                    match = next((r for r in existing if all(r.get(c) == row.get(c) for c in split_list(on_conflict))), None)
+                if match is not None:
+                    if merge:
+                        match.update(row)
+                    written.append(copy.deepcopy(match))
+                    continue
+                row.setdefault("id", self._next_id)
+                row.setdefault("created_at", get_current_timestamp())
+                self._next_id += 1
+                existing.append(row)
+                written.append(copy.deepcopy(row))
+        return written
+
+    def update(self, table: str, filters: List[Tuple[str, str]], values: Dict[str, Any]) -> List[Dict[str, Any]]:
+        with self._lock:
+            updated = []
+            for row in self._tables.get(table, []):
+                if self._matches(row, filters):
+                    row.update(copy.deepcopy(values))
+                    updated.append(copy.deepcopy(row))
+            return updated
+
+    def delete(self, table: str, filters: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._tables.get(table, [])
+            deleted = [row for row in rows if self._matches(row, filters)]
+            self._tables[table] = [row for row in rows if not self._matches(row, filters)]
+            return deleted
+
+    def _matches(self, row: Dict[str, Any], filters: List[Tuple[str, str]]) -> bool:
+        for column, expression in filters:
+            operator, _, arg = expression.partition(".")
+            negate = operator == "not"
+            if negate:
+                operator, _, arg = arg.partition(".")
+            if operator == "in":
+                result = str(row.get(column)) in split_list(arg.strip("()"))
+            elif operator in FILTER_OPERATORS:
+                result = FILTER_OPERATORS[operator](row.get(column), arg.strip('"'))
+            else:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+            if result == negate:
+                return False
+        return True
+
+
+def unknown_columns(table: str, columns) -> List[str]:
+    """Columns not in the table's declared schema; tables without one accept any column"""
+    known = TABLE_COLUMNS.get(table)
+    if known is None:
+        return []
+    return sorted({column for column in columns if column not in known})
+
+
+def selected_columns(select: Optional[str]) -> List[str]:
+    """Source columns named by a PostgREST select list"""
+    columns = []
+    for item in split_list(select or "*"):
+        if item != "*":
+            columns.append(item.rpartition(":")[2].replace("->>", "->").split("->")[0])
+    return columns
+
+
+def project(row: Dict[str, Any], select: Optional[str]) -> Dict[str, Any]:
+    """Apply a PostgREST select list: `*`, plain columns, `alias:column` and `column->key` paths"""
+    if not select or select == "*":
+        return row
+
+    projected = {}
+    for item in split_list(select):
+        if item == "*":
+            projected.update(row)
+            continue
+        alias, _, path = item.rpartition(":")
+        parts = path.replace("->>", "->").split("->")
+        value = row.get(parts[0])
+        for key in parts[1:]:
+            value = value.get(key) if isinstance(value, dict) else None
+        projected[alias or parts[-1]] = value
+    return projected
+
+
+def seed_users(tables: InMemoryTables, count: int, seed: int = 0):
+    """Fill User Information with synthetic profiles user0..user{count-1}"""
+    rng = random.Random(seed)
+    # Keyed by the User Information column names
+    fields = {
+        "Interests + Values": ["Technology and innovation", "Helping people", "Design and craft", "Data and research"],
+        "Work Experience": ["Software engineer, 5 years", "Teacher, 8 years", "Retail manager, 3 years", "Recent graduate"],
+        "Circumstances": ["Single, flexible schedule", "Two kids, evenings free", "Relocating next year", "Working full time"],
+        "Skills": ["Python, SQL", "Public speaking, planning", "Figma, illustration", "Excel, statistics"],
+        "Goals": ["Become a senior engineer", "Move into UX design", "Start a data career", "Lead a team"]
+    }
+    tables.insert("User Information", [
+        {"username": f"user{i}", **{field: rng.choice(options) for field, options in fields.items()}, "last_updated": "2024-01-01T00:00:00+00:00"}
+        for i in range(count)
+    ])
+
+
+def create_supabase_router(tables: InMemoryTables) -> APIRouter:
+    """PostgREST-compatible /rest/v1/{table} endpoints backed by in-memory tables"""
+    router = APIRouter()
+
+    def parse_query(request: Request):
+        filters = [(key, value) for key, value in request.query_params.multi_items() if key not in RESERVED_PARAMS]
+        limit = request.query_params.get("limit")
+        return filters, int(limit) if limit else None, int(request.query_params.get("offset", "0"))
+
+    def schema_error(table: str, request: Request, written=()) -> Optional[Response]:
+        # PostgREST answers 400 for a column the table does not have
+        filters, _, _ = parse_query(request)
+        columns = selected_columns(request.query_params.get("select")) + [column for column, _ in filters] + list(written)
+        missing = unknown_columns(table, columns)
+        if missing:
+            return JSONResponse(
+                {"code": "PGRST204", "message": f"Could not find the '{missing[0]}' column of '{table}' in the schema cache"},
+                status_code=400
+            )
+        return None
+
+    def respond(rows: List[Dict[str, Any]], request: Request, status_code: int = 200, total: Optional[int] = None):
+        prefer = request.headers.get("prefer", "")
+        headers = {}
+        if "count=" in prefer:
+            count = total if total is not None else len(rows)
+            headers["Content-Range"] = f"0-{max(0, len(rows) - 1)}/{count}"
+        if "return=minimal" in prefer:
+            return Response(status_code=204 if status_code == 200 else status_code, headers=headers)
+        select = request.query_params.get("select")
+        return JSONResponse([project(row, select) for row in rows], status_code=status_code, headers=headers)
+
+    @router.get("/rest/v1/{table}")
+    async def select_rows(table: str, request: Request):
+        error = schema_error(table, request)
+        if error:
+            return error
+        filters, limit, offset = parse_query(request)
+        try:
+            rows = tables.select(table, filters, request.query_params.get("order"), limit, offset)
+            total = len(tables.select(table, filters)) if "count=" in request.headers.get("prefer", "") else None
+        except ValueError as e:
+            return JSONResponse({"message": str(e)}, status_code=400)
+        return respond(rows, request, total=total)
+
+    @router.head("/rest/v1/{table}")
+    async def count_rows(table: str, request: Request):
+        filters, _, _ = parse_query(request)
+        total = len(tables.select(table, filters))
+        return Response(headers={"Content-Range": f"*/{total}"})
+
+    @router.post("/rest/v1/{table}")
+    async def insert_rows(table: str, request: Request):
+        body = json.loads(await request.body() or b"[]")
+        rows = body if isinstance(body, list) else [body]
+        error = schema_error(table, request, [column for row in rows for column in row])
+        if error:
+            return error
+        prefer = request.headers.get("prefer", "")
+        on_conflict = request.query_params.get("on_conflict")
+        if "resolution=" in prefer and not on_conflict:
+            on_conflict = "id"
+        written = tables.insert(table, rows, on_conflict, merge="resolution=merge-duplicates" in prefer)
+        return respond(written, request, status_code=201)
+
+    @router.patch("/rest/v1/{table}")
+    async def update_rows(table: str, request: Request):
+        filters, _, _ = parse_query(request)
+        values = json.loads(await request.body() or b"{}")
+        error = schema_error(table, request, values)
+        if error:
+            return error
+        return respond(tables.update(table, filters, values), request)
+
+    @router.delete("/rest/v1/{table}")
+    async def delete_rows(table: str, request: Request):
+        filters, _, _ = parse_query(request)
+        return respond(tables.delete(table, filters), request)
+
+    return router
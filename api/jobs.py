@@ -0,0 +1,296 @@
+import os
+import uuid
+import asyncio
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional, AsyncIterator, Awaitable, Callable
+from fastapi.encoders import jsonable_encoder
+from models.job import Job
+from utils.timestamp_utils import get_current_timestamp
+
+# Handlers receive the job and a callback for reporting partial results
+ReportPartial = Callable[[str, Any], Awaitable[None]]
+JobHandler = Callable[[Job, ReportPartial], Awaitable[Any]]
+
+
+def finished_before(ttl_seconds: float) -> str:
+    """Timestamp before which finished jobs have outlived the TTL, comparable with Job.updated_at"""
+    return (datetime.now(timezone.utc) - timedelta(seconds=ttl_seconds)).isoformat()
+
+
+class InMemoryJobStore:
+    """
+    Keeps jobs in process memory; jobs are lost on restart.
+
+    Finished jobs are dropped once they are older than finished_ttl_seconds,
+    oldest first once more than max_finished are kept.
+    """
+
+    def __init__(self, finished_ttl_seconds: float = 86400, max_finished: int = 10000):
+        self.finished_ttl_seconds = finished_ttl_seconds
+        self.max_finished = max_finished
+        self._jobs: Dict[str, Job] = {}
+        # Finished job IDs in the order they finished, with when they finished
+        self._finished: "OrderedDict[str, str]" = OrderedDict()
+
+    def save(self, job: Job):
+        self._jobs[job.job_id] = job
+        if job.finished:
+            self._finished[job.job_id] = job.updated_at
+            self._finished.move_to_end(job.job_id)
+            self.prune()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list_unfinished(self) -> List[Job]:
+        return [job for job in self._jobs.values() if not job.finished]
+
+    def prune(self):
+        """Drop finished jobs past the TTL or beyond the cap"""
+        cutoff = finished_before(self.finished_ttl_seconds)
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            if len(self._finished) <= self.max_finished and finished_at >= cutoff:
+                break
+            del self._finished[job_id]
+            self._jobs.pop(job_id, None)
+
+    # Memory lookups never block, so the async variants run inline
+    async def save_async(self, job: Job):
+        self.save(job)
+
+    async def get_async(self, job_id: str) -> Optional[Job]:
+        return self.get(job_id)
+
+    async def list_unfinished_async(self) -> List[Job]:
+        return self.list_unfinished()
+
+
+class SQLiteJobStore:
+    """
+    Persists jobs to a local SQLite file so queued and running jobs survive a restart.
+
+    Finished jobs are deleted once they are older than finished_ttl_seconds,
+    oldest first once more than max_finished are kept. The async variants run
+    the queries on a worker thread so the event loop never waits on the disk.
+    """
+
+    def __init__(self, db_path: str, finished_ttl_seconds: float = 86400, max_finished: int = 10000):
+        self.finished_ttl_seconds = finished_ttl_seconds
+        self.max_finished = max_finished
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, status TEXT NOT NULL, created_at TEXT NOT NULL, data TEXT NOT NULL, updated_at TEXT)"
+        )
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(jobs)")]
+        if "updated_at" not in columns:
+            # Job files written before pruning lack the column; their jobs count as finishing on creation
+            self._db.execute("ALTER TABLE jobs ADD COLUMN updated_at TEXT")
+            self._db.execute("UPDATE jobs SET updated_at = created_at")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status_updated ON jobs (status, updated_at)")
+        self._db.commit()
+
+    def save(self, job: Job):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, status, created_at, data, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job.job_id, job.status, job.created_at, job.model_dump_json(), job.updated_at)
+            )
+            if job.finished:
+                self._prune()
+            self._db.commit()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._db.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return Job.model_validate_json(row[0]) if row else None
+
+    def list_unfinished(self) -> List[Job]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT data FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [Job.model_validate_json(row[0]) for row in rows]
+
+    def prune(self):
+        """Delete finished jobs past the TTL or beyond the cap"""
+        with self._lock:
+            self._prune()
+            self._db.commit()
+
+    async def save_async(self, job: Job):
+        await asyncio.to_thread(self.save, job)
+
+    async def get_async(self, job_id: str) -> Optional[Job]:
+        return await asyncio.to_thread(self.get, job_id)
+
+    async def list_unfinished_async(self) -> List[Job]:
+        return await asyncio.to_thread(self.list_unfinished)
+
+    def _prune(self):
+        self._db.execute(
+            "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND updated_at < ?",
+            (finished_before(self.finished_ttl_seconds),)
+        )
+        self._db.execute(
+            "DELETE FROM jobs WHERE job_id IN ("
+            "SELECT job_id FROM jobs WHERE status IN ('succeeded', 'failed') ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_finished,)
+        )
+
+
+class JobQueue:
+    """
+    Runs long LLM operations outside the HTTP request with a bounded number of workers.
+
+    Jobs are enqueued by type and processed by the handler registered for that
+    type. Callers get a job ID back immediately and can poll the job or watch it
+    for status changes and partial results. On start, unfinished jobs from the
+    store are queued again, so a persistent store resumes work after a restart.
+    """
+
+    def __init__(self, store=None, workers: int = 4):
+        self.store = store or InMemoryJobStore()
+        self.workers = workers
+        self.handlers: Dict[str, JobHandler] = {}
+        self._loop = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._watchers: Dict[str, List[asyncio.Queue]] = {}
+
+    def register(self, job_type: str, handler: JobHandler):
+        self.handlers[job_type] = handler
+
+    async def start(self):
+        """Start the workers on the running event loop and requeue unfinished jobs"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+        for job in await self.store.list_unfinished_async():
+            if job.status == "running":
+                await self._update(job, status="queued")
+            self._queue.put_nowait(job.job_id)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+
+    async def enqueue(self, job_type: str, username: str, params: Optional[Dict[str, Any]] = None) -> Job:
+        """Create a job and queue it for the workers"""
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+
+        await self.start()
+
+        now = get_current_timestamp()
+        job = Job(
+            job_id=uuid.uuid4().hex,
+            job_type=job_type,
+            username=username,
+            params=jsonable_encoder(params or {}),
+            created_at=now,
+            updated_at=now
+        )
+        await self.store.save_async(job)
+        self._queue.put_nowait(job.job_id)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.store.get(job_id)
+
+    async def get_async(self, job_id: str) -> Optional[Job]:
+        """Look a job up without blocking the event loop on a persistent store"""
+        return await self.store.get_async(job_id)
+
+    async def watch(self, job_id: str) -> AsyncIterator[Job]:
+        """Yield the job now and again on every change until it finishes"""
+        job = await self.store.get_async(job_id)
+        if job is None:
+            return
+
+        updates: asyncio.Queue = asyncio.Queue()
+        self._watchers.setdefault(job_id, []).append(updates)
+        try:
+            yield job
+            while not job.finished:
+                job = await updates.get()
+                yield job
+        finally:
+            self._watchers[job_id].remove(updates)
+            if not self._watchers[job_id]:
+                del self._watchers[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "watchers": sum(len(watchers) for watchers in self._watchers.values())
+        }
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = await self.store.get_async(job_id)
+                if job is not None and job.status == "queued":
+                    await self._run(job)
+            except Exception as e:
+                print(f"Job worker error for {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job):
+        handler = self.handlers.get(job.job_type)
+        if handler is None:
+            await self._update(job, status="failed", error=f"Unknown job type: {job.job_type}")
+            return
+
+        job = await self._update(job, status="running")
+
+        async def report_partial(key: str, value: Any):
+            nonlocal job
+            partial_results = dict(job.partial_results)
+            partial_results[key] = jsonable_encoder(value)
+            job = await self._update(job, partial_results=partial_results)
+
+        try:
+            result = await handler(job, report_partial)
+        except Exception as e:
+            print(f"Job {job.job_id} ({job.job_type}) failed: {e}")
+            await self._update(job, status="failed", error=str(e))
+        else:
+            await self._update(job, status="succeeded", result=jsonable_encoder(result))
+
+    async def _update(self, job: Job, **changes) -> Job:
+        job = job.model_copy(update={**changes, "updated_at": get_current_timestamp()})
+        await self.store.save_async(job)
+        for updates in self._watchers.get(job.job_id, []):
+            updates.put_nowait(job)
+        return job
+
+
+def create_job_queue_from_env() -> JobQueue:
+    """Build the job queue from JOB_* environment variables"""
+    workers = int(os.getenv("JOB_WORKERS", "4"))
+    # Finished jobs stay pollable for a day by default, and at most this many are kept
+    finished_ttl_seconds = float(os.getenv("JOB_FINISHED_TTL_SECONDS", "86400"))
+    max_finished = int(os.getenv("JOB_MAX_FINISHED", "10000"))
+    if os.getenv("JOB_BACKEND", "memory") == "sqlite":
+        db_path = os.getenv("JOB_DB_PATH", os.path.join(tempfile.gettempdir(), "clarity_jobs.sqlite3"))
+        return JobQueue(SQLiteJobStore(db_path, finished_ttl_seconds, max_finished), workers=workers)
+    return JobQueue(InMemoryJobStore(finished_ttl_seconds, max_finished), workers=workers)
@@ -0,0 +1,239 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+# Only these request fields affect the completion, so only they go into the key
+CACHE_KEY_FIELDS = ("model", "messages", "temperature", "max_tokens")
+
+
+class LLMResponseCache:
+    """
+    Content-addressed cache for chat completion responses.
+
+    Entries live in an in-memory LRU tier backed by an optional SQLite tier on
+    local disk, so identical prompts are answered without calling the provider
+    again, including across restarts. Both tiers expire entries after a TTL and
+    evict the least recently used entries once they exceed their size limit.
+    Async code uses the *_async methods, which keep SQLite I/O off the event loop.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 86400, db_path: Optional[str] = None, max_db_entries: int = 10000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_db_entries = max_db_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = None
+
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.evictions = 0
+
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    "key TEXT PRIMARY KEY, content TEXT NOT NULL, "
+                    "expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_access ON llm_cache (last_access)")
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"LLM cache disk tier disabled ({db_path}): {e}")
+                self._db = None
+
+    @staticmethod
+    def make_key(request: Dict[str, Any]) -> str:
+        """Hash the fields of a chat completion request that determine its output"""
+        payload = json.dumps(
+            {field: request.get(field) for field in CACHE_KEY_FIELDS},
+            sort_keys=True,
+            separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, request: Dict[str, Any]) -> Optional[str]:
+        """Return the cached response content for a request, or None on a miss"""
+        key = self.make_key(request)
+        content = self._get_memory(key)
+        if content is None and self._db is not None:
+            content = self._get_disk(key)
+        return self._counted(content)
+
+    async def get_async(self, request: Dict[str, Any]) -> Optional[str]:
+        """get() for the event loop: memory hits are answered inline, disk lookups run in a worker thread"""
+        key = self.make_key(request)
+        content = self._get_memory(key)
+        if content is None and self._db is not None:
+            content = await asyncio.to_thread(self._get_disk, key)
+        return self._counted(content)
+
+    def set(self, request: Dict[str, Any], content: str):
+        """Store the response content for a request in both tiers"""
+        if content is None:
+            return
+        key, expires_at = self._set_memory(request, content)
+        if self._db is not None:
+            self._set_disk(key, content, expires_at)
+
+    async def set_async(self, request: Dict[str, Any], content: str):
+        """set() for the event loop, writing the disk tier in a worker thread"""
+        if content is None:
+            return
+        key, expires_at = self._set_memory(request, content)
+        if self._db is not None:
+            await asyncio.to_thread(self._set_disk, key, content, expires_at)
+
+    def delete(self, request: Dict[str, Any]):
+        """Drop the cached response for a request from both tiers"""
+        key = self._delete_memory(request)
+        if self._db is not None:
+            self._delete_disk(key)
+
+    async def delete_async(self, request: Dict[str, Any]):
+        """delete() for the event loop, deleting from the disk tier in a worker thread"""
+        key = self._delete_memory(request)
+        if self._db is not None:
+            await asyncio.to_thread(self._delete_disk, key)
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and tier sizes"""
+        disk_entries = None
+        if self._db is not None:
+            with self._db_lock:
+                disk_entries = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries
+            }
+
+    # The memory tier is guarded by _lock and never waits on disk I/O; the SQLite
+    # tier by _db_lock, and its methods are the ones the async variants run in a thread
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, content = entry
+            if expires_at > time.time():
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return content
+            del self._memory[key]
+            return None
+
+    def _get_disk(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT content, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            content, expires_at = row
+            if expires_at <= now:
+                self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        with self._lock:
+            self._remember(key, expires_at, content)
+            self.disk_hits += 1
+        return content
+
+    def _counted(self, content: Optional[str]) -> Optional[str]:
+        with self._lock:
+            if content is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return content
+
+    def _set_memory(self, request: Dict[str, Any], content: str):
+        key = self.make_key(request)
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, content)
+        return key, expires_at
+
+    def _set_disk(self, key: str, content: str, expires_at: float):
+        now = time.time()
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, content, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, content, expires_at, now)
+            )
+            self._evict_disk(now)
+            self._db.commit()
+
+    def _delete_memory(self, request: Dict[str, Any]) -> str:
+        key = self.make_key(request)
+        with self._lock:
+            self._memory.pop(key, None)
+        return key
+
+    def _delete_disk(self, key: str):
+        with self._db_lock:
+            self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._db.commit()
+
+    def _remember(self, key: str, expires_at: float, content: str):
+        self._memory[key] = (expires_at, content)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _evict_disk(self, now: float):
+        self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        overflow = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_db_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_access LIMIT ?)",
+                (overflow,)
+            )
+            with self._lock:
+                self.evictions += overflow
+
+
+def create_llm_cache_from_env() -> Optional[LLMResponseCache]:
+    """Build the shared response cache from LLM_CACHE_* environment variables"""
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+
+    return LLMResponseCache(
+        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "256")),
+        ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400")),
+        db_path=os.getenv("LLM_CACHE_DB_PATH", os.path.join(tempfile.gettempdir(), "clarity_llm_cache.sqlite3")) or None,
+        max_db_entries=int(os.getenv("LLM_CACHE_MAX_DB_ENTRIES", "10000"))
+    )
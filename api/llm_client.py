@@ -0,0 +1,449 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Iterator
+from openai import RateLimitError, APITimeoutError, APIConnectionError, InternalServerError
+from clients import openai_client, async_openai_client
+from utils.concurrency_utils import TokenBucket, AdaptiveConcurrencyLimiter
+from utils.token_utils import estimate_request_tokens
+from utils.latency_utils import LatencyTracker
+
+# Failures worth retrying; anything else (bad request, auth) fails immediately
+RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+# Monotonic time by which every LLM call made for the current request must finish
+_request_deadline_at: ContextVar[Optional[float]] = ContextVar("llm_request_deadline_at", default=None)
+
+
+class LLMDeadlineExceeded(Exception):
+    """Raised when a call cannot complete within its deadline, including retries"""
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read the provider's Retry-After hint from a rate limit error, in seconds"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        # HTTP-date values are rare for this provider; fall back to backoff
+        return None
+    return None
+
+
+class LimitedStream:
+    """
+    A provider stream that keeps its concurrency slot and deadline until it is
+    exhausted or closed, so slow readers count against the limiter too.
+    """
+
+    def __init__(self, stream, client: "ResilientLLMClient", deadline_at: float):
+        self.stream = stream
+        self.client = client
+        self.deadline_at = deadline_at
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.closed:
+            raise StopAsyncIteration
+        try:
+            return await self.client._within(self.stream.__anext__(), self.deadline_at)
+        except StopAsyncIteration:
+            await self.aclose()
+            raise
+        except LLMDeadlineExceeded:
+            self.client._count("deadline_exceeded")
+            self.client._count("failures")
+            await self.aclose()
+            raise
+        except BaseException:
+            await self.aclose()
+            raise
+
+    async def aclose(self):
+        """Close the provider stream and give back the concurrency slot"""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            close = getattr(self.stream, "close", None) or getattr(self.stream, "aclose", None)
+            if close is not None:
+                await close()
+        finally:
+            await self.client.limiter.release()
+
+
+class ResilientLLMClient:
+    """
+    Wraps the OpenAI clients with shared rate limiting, adaptive concurrency and retries.
+
+    Calls wait for the requests-per-minute and tokens-per-minute budgets, then for
+    a slot from an AIMD concurrency limiter that shrinks on 429s and grows back on
+    success. A Retry-After hint pauses every caller, not just the one that got it.
+    Retryable failures are retried with jittered exponential backoff, and every
+    call, retries included, must finish within its deadline. Inside a deadline_scope
+    all calls also share one overall budget, so each gets only the time left in it.
+
+    With hedging enabled, a call still running at the configured percentile of
+    recent latency for requests of its size gets a duplicate; the first to
+    finish wins and the other is cancelled.
+    """
+
+    def __init__(self, async_client, sync_client=None, requests_per_minute: float = 500, tokens_per_minute: float = 150000,
+                 initial_concurrency: int = 8, max_concurrency: int = 32, max_retries: int = 4,
+                 base_delay: float = 0.5, max_delay: float = 30.0, deadline_seconds: float = 120.0,
+                 deadline_base_seconds: float = 15.0, min_tokens_per_second: float = 20.0,
+                 request_deadline_seconds: float = 180.0,
+                 hedge_percentile: Optional[float] = None, hedge_min_samples: int = 20):
+        self.async_client = async_client
+        self.sync_client = sync_client
+        self.request_budget = TokenBucket.per_minute(requests_per_minute)
+        self.token_budget = TokenBucket.per_minute(tokens_per_minute)
+        self.limiter = AdaptiveConcurrencyLimiter(initial=initial_concurrency, maximum=max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline_seconds = deadline_seconds
+        self.deadline_base_seconds = deadline_base_seconds
+        self.min_tokens_per_second = min_tokens_per_second
+        self.request_deadline_seconds = request_deadline_seconds
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self._latencies: Dict[Any, LatencyTracker] = {}
+        self._cooldown_until = 0.0
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.timeouts = 0
+        self.deadline_exceeded = 0
+        self.total_latency = 0.0
+        self.hedged_calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def deadline_for(self, request: Dict[str, Any]) -> float:
+        """
+        Deadline for a request in seconds: a fixed allowance plus the time to
+        generate its max_tokens at the slowest acceptable rate, capped at deadline_seconds
+        and at the time left in the enclosing deadline_scope.
+        """
+        budget = self.deadline_base_seconds + request.get("max_tokens", 0) / self.min_tokens_per_second
+        return max(0.0, min(self.deadline_seconds, budget, self.remaining_request_time()))
+
+    @contextmanager
+    def deadline_scope(self, seconds: Optional[float] = None) -> Iterator[float]:
+        """
+        Give every LLM call made inside the block one shared budget.
+
+        A nested scope can only tighten an enclosing one. Tasks started inside
+        the block inherit the budget, as they copy the current context.
+
+        Args:
+            seconds: The overall budget (defaults to request_deadline_seconds)
+
+        Yields:
+            The monotonic time by which the calls must finish
+        """
+        deadline_at = time.monotonic() + (seconds if seconds is not None else self.request_deadline_seconds)
+        outer = _request_deadline_at.get()
+        if outer is not None:
+            deadline_at = min(deadline_at, outer)
+        token = _request_deadline_at.set(deadline_at)
+        try:
+            yield deadline_at
+        finally:
+            _request_deadline_at.reset(token)
+
+    def remaining_request_time(self) -> float:
+        """Seconds left in the enclosing deadline_scope, or infinity outside one"""
+        deadline_at = _request_deadline_at.get()
+        return float("inf") if deadline_at is None else deadline_at - time.monotonic()
+
+    async def create_hedged(self, request: Dict[str, Any], deadline: Optional[float] = None) -> Any:
+        """
+        Run create, firing a duplicate if it is slower than the hedge percentile of recent calls.
+
+        Args:
+            request: Chat completion arguments (non-streaming)
+            deadline: Seconds the call may take, shared by both copies
+
+        Returns:
+            The response of whichever copy finished first
+        """
+        deadline = deadline if deadline is not None else self.deadline_for(request)
+        tracker = self._latencies.get(self._latency_key(request))
+        if not self.hedge_percentile or tracker is None or tracker.count < self.hedge_min_samples:
+            return await self.create(request, deadline)
+
+        started_at = time.monotonic()
+        hedge_after = tracker.percentile(self.hedge_percentile)
+        self._count("hedged_calls")
+        primary = asyncio.ensure_future(self.create(request, deadline))
+        hedge = None
+
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+            remaining = deadline - (time.monotonic() - started_at)
+            if done or remaining <= 0:
+                return await primary
+
+            self._count("hedges")
+            hedge = asyncio.ensure_future(self.create(request, remaining))
+            pending = {primary, hedge}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Cancel the loser (or both, if the caller was cancelled)
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    async def create(self, request: Dict[str, Any], deadline: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run chat.completions.create on the async client under the shared limits.
+
+        Args:
+            request: Chat completion arguments
+            deadline: Seconds the call may take including retries (defaults to deadline_for(request));
+                never more than is left in the enclosing deadline_scope
+            **kwargs: Extra arguments for the provider call, e.g. stream=True
+
+        Returns:
+            The provider response, or for stream=True a LimitedStream that holds
+            its concurrency slot and deadline until exhausted or closed
+        """
+        called_at = time.monotonic()
+        deadline_at = self._deadline_at(request, deadline, called_at)
+        tokens = estimate_request_tokens(request)
+        self._count("calls")
+        attempt = 0
+
+        while True:
+            started_at = time.monotonic()
+            try:
+                await self._sleep_until(self._cooldown_until, deadline_at)
+                await self._within(self.request_budget.acquire(1), deadline_at)
+                await self._within(self.token_budget.acquire(tokens), deadline_at)
+                # Waiting for a concurrency slot counts against the deadline too
+                await self._within(self.limiter.acquire(), deadline_at)
+                try:
+                    response = await self._within(
+                        self.async_client.chat.completions.create(**request, **kwargs), deadline_at
+                    )
+                    self.limiter.on_success()
+                except BaseException:
+                    await self.limiter.release()
+                    raise
+                if kwargs.get("stream"):
+                    # The slot and deadline stay with the stream until it is read or closed
+                    response = LimitedStream(response, self, deadline_at)
+                else:
+                    await self.limiter.release()
+            except LLMDeadlineExceeded:
+                self._count("deadline_exceeded")
+                self._count("failures")
+                raise
+            except RETRYABLE_ERRORS as e:
+                attempt += 1
+                delay = self._on_retryable_error(e, attempt)
+                if attempt > self.max_retries:
+                    self._count("failures")
+                    raise
+                if time.monotonic() + delay >= deadline_at:
+                    self._count("deadline_exceeded")
+                    self._count("failures")
+                    raise LLMDeadlineExceeded(f"LLM call out of time after {attempt} attempts: {e}") from e
+                print(f"LLM call failed ({type(e).__name__}), retry {attempt}/{self.max_retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+            except Exception:
+                self._count("failures")
+                raise
+            else:
+                self._record_success(request, started_at, called_at)
+                return response
+
+    def create_sync(self, request: Dict[str, Any], deadline: Optional[float] = None, **kwargs) -> Any:
+        """
+        Blocking counterpart of create for the synchronous manager methods.
+
+        Honours the shared Retry-After cooldown, retries and deadline; the async
+        rate budgets and concurrency limiter only apply to async callers.
+        """
+        called_at = time.monotonic()
+        deadline_at = self._deadline_at(request, deadline, called_at)
+        self._count("calls")
+        attempt = 0
+
+        while True:
+            started_at = time.monotonic()
+            remaining = deadline_at - max(started_at, self._cooldown_until)
+            if remaining <= 0:
+                self._count("deadline_exceeded")
+                self._count("failures")
+                raise LLMDeadlineExceeded("LLM call out of time before it could be sent")
+            time.sleep(max(0.0, self._cooldown_until - started_at))
+
+            try:
+                response = self.sync_client.chat.completions.create(**request, timeout=remaining, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                attempt += 1
+                delay = self._on_retryable_error(e, attempt)
+                if attempt > self.max_retries:
+                    self._count("failures")
+                    raise
+                if time.monotonic() + delay >= deadline_at:
+                    self._count("deadline_exceeded")
+                    self._count("failures")
+                    raise LLMDeadlineExceeded(f"LLM call out of time after {attempt} attempts: {e}") from e
+                print(f"LLM call failed ({type(e).__name__}), retry {attempt}/{self.max_retries} in {delay:.2f}s")
+                time.sleep(delay)
+            except Exception:
+                self._count("failures")
+                raise
+            else:
+                self._record_success(request, started_at, called_at)
+                return response
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "successes": self.successes,
+                "failures": self.failures,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "timeouts": self.timeouts,
+                "deadline_exceeded": self.deadline_exceeded,
+                "avg_latency_seconds": round(self.total_latency / self.successes, 3) if self.successes else 0.0,
+                "cooldown_seconds": round(max(0.0, self._cooldown_until - time.monotonic()), 3),
+                "requests_available": round(self.request_budget.available(), 1),
+                "tokens_available": round(self.token_budget.available(), 1),
+                "concurrency": self.limiter.stats(),
+                "hedging": {
+                    "percentile": self.hedge_percentile,
+                    "hedged_calls": self.hedged_calls,
+                    "hedges": self.hedges,
+                    "hedge_wins": self.hedge_wins,
+                    "hedge_rate": round(self.hedges / self.hedged_calls, 3) if self.hedged_calls else 0.0
+                },
+                "latency_by_max_tokens": {str(key): tracker.stats() for key, tracker in self._latencies.items()}
+            }
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    def _on_retryable_error(self, error: Exception, attempt: int) -> float:
+        """Update the limits for a retryable failure and return how long to wait before retrying"""
+        self._count("retries")
+        if isinstance(error, RateLimitError):
+            self._count("rate_limited")
+            self.limiter.on_overload()
+            retry_after = retry_after_seconds(error)
+            if retry_after is not None:
+                # Every caller waits out the provider's hint, not just this one
+                with self._lock:
+                    self._cooldown_until = max(self._cooldown_until, time.monotonic() + retry_after)
+                return retry_after
+        elif isinstance(error, APITimeoutError):
+            self._count("timeouts")
+        return self.backoff_delay(attempt)
+
+    def _deadline_at(self, request: Dict[str, Any], deadline: Optional[float], now: float) -> float:
+        deadline_at = now + (deadline if deadline is not None else self.deadline_for(request))
+        request_deadline_at = _request_deadline_at.get()
+        return deadline_at if request_deadline_at is None else min(deadline_at, request_deadline_at)
+
+    async def _within(self, awaitable, deadline_at: float):
+        remaining = deadline_at - time.monotonic()
+        try:
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            return await asyncio.wait_for(awaitable, remaining)
+        except asyncio.TimeoutError:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise LLMDeadlineExceeded("LLM call exceeded its deadline")
+
+    async def _sleep_until(self, until: float, deadline_at: float):
+        delay = until - time.monotonic()
+        if delay <= 0:
+            return
+        if until >= deadline_at:
+            raise LLMDeadlineExceeded("LLM call would exceed its deadline waiting for the rate limit to clear")
+        await asyncio.sleep(delay)
+
+    def _latency_key(self, request: Dict[str, Any]) -> Any:
+        # Latency scales with the completion budget, so calls are compared with others of the same size
+        return request.get("max_tokens")
+
+    def _record_success(self, request: Dict[str, Any], started_at: float, called_at: float):
+        now = time.monotonic()
+        with self._lock:
+            self.successes += 1
+            self.total_latency += now - started_at
+            self._latencies.setdefault(self._latency_key(request), LatencyTracker()).record(now - called_at)
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+class RequestDeadlineMiddleware:
+    """ASGI middleware giving each HTTP request, streamed body included, one LLM deadline_scope"""
+
+    def __init__(self, app, llm: ResilientLLMClient):
+        self.app = app
+        self.llm = llm
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with self.llm.deadline_scope():
+            await self.app(scope, receive, send)
+
+
+def create_llm_client_from_env() -> ResilientLLMClient:
+    """Build the rate-limited LLM client from LLM_* environment variables"""
+    return ResilientLLMClient(
+        async_openai_client,
+        openai_client,
+        requests_per_minute=float(os.getenv("LLM_REQUESTS_PER_MINUTE", "500")),
+        tokens_per_minute=float(os.getenv("LLM_TOKENS_PER_MINUTE", "150000")),
+        initial_concurrency=int(os.getenv("LLM_INITIAL_CONCURRENCY", "8")),
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "32")),
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", "4")),
+        deadline_seconds=float(os.getenv("LLM_DEADLINE_SECONDS", "120")),
+        deadline_base_seconds=float(os.getenv("LLM_DEADLINE_BASE_SECONDS", "15")),
+        min_tokens_per_second=float(os.getenv("LLM_MIN_TOKENS_PER_SECOND", "20")),
+        request_deadline_seconds=float(os.getenv("LLM_REQUEST_DEADLINE_SECONDS", "180")),
+        # Hedging is off unless a percentile such as 95 is configured
+        hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "0")) or None,
+        hedge_min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    )
@@ -0,0 +1,111 @@
+from typing import Dict, List, Optional, Set
+from models.milestone import Milestone, MilestoneUpdate
+from models.user import CareerPlan
+from milestone_registry import MILESTONE_TIMEFRAMES, get_milestone
+
+# How far a change to each field reaches into later milestones:
+#   "transitive" - everything that builds on this milestone, directly or indirectly
+#   "direct"     - only milestones that depend on this one directly
+#   None         - cosmetic, nothing cascades
+FIELD_REACH = {
+    "objectives": "transitive",
+    "focus_areas": "transitive",
+    "timeline_weeks": "direct",
+    "priority_level": "direct",
+    "budget": "direct",
+    "user_notes": None
+}
+
+# A timeline change of at least this fraction shifts every later milestone, not just the next one
+MAJOR_TIMELINE_CHANGE = 0.5
+
+# Budget changes smaller than this fraction don't affect later milestones
+MINOR_BUDGET_CHANGE = 0.25
+
+
+def relative_change(old: Optional[float], new: float) -> float:
+    if not old:
+        return 1.0
+    return abs(new - old) / abs(old)
+
+
+def changed_fields(milestone: Milestone, updates: MilestoneUpdate) -> Dict[str, Optional[str]]:
+    """
+    Work out which fields the update would actually change, mapped to how far each change reaches.
+
+    Values equal to the current ones, and focus areas the objectives already cover, are not changes.
+    """
+    details = milestone.details
+    changes = {}
+
+    if updates.objectives and updates.objectives != details.key_objectives:
+        changes["objectives"] = FIELD_REACH["objectives"]
+
+    if updates.focus_areas:
+        objectives = updates.objectives or details.key_objectives
+        if any(area not in objectives and f"Focus on {area}" not in objectives for area in updates.focus_areas):
+            changes["focus_areas"] = FIELD_REACH["focus_areas"]
+
+    if updates.timeline_weeks and updates.timeline_weeks != details.timeline_weeks:
+        major = relative_change(details.timeline_weeks, updates.timeline_weeks) >= MAJOR_TIMELINE_CHANGE
+        changes["timeline_weeks"] = "transitive" if major else FIELD_REACH["timeline_weeks"]
+
+    if updates.budget and updates.budget != details.budget_estimate:
+        if relative_change(details.budget_estimate, updates.budget) >= MINOR_BUDGET_CHANGE:
+            changes["budget"] = FIELD_REACH["budget"]
+
+    # Mirrors apply_milestone_updates, which sets any given priority_level, the "medium" default included
+    if updates.priority_level and updates.priority_level != details.priority_level:
+        changes["priority_level"] = FIELD_REACH["priority_level"]
+
+    if updates.user_notes and updates.user_notes != details.user_notes:
+        changes["user_notes"] = FIELD_REACH["user_notes"]
+
+    return changes
+
+
+def milestone_parents(plan: CareerPlan, timeframe: str) -> Set[str]:
+    """
+    Earlier milestones a milestone builds on: those its dependencies mention,
+    or the closest earlier one in the plan when it declares none.
+    """
+    earlier = [t for t in MILESTONE_TIMEFRAMES[:MILESTONE_TIMEFRAMES.index(timeframe)] if get_milestone(plan, t) is not None]
+    if not earlier:
+        return set()
+
+    milestone = get_milestone(plan, timeframe)
+    dependencies = " ".join(milestone.details.dependencies) if milestone else ""
+    parents = {candidate for candidate in earlier if candidate in dependencies}
+    return parents or {earlier[-1]}
+
+
+def milestone_dependents(plan: CareerPlan, timeframe: str, transitive: bool = True) -> List[str]:
+    """Later milestones in the plan that build on the given one, in milestone order"""
+    affected = {timeframe}
+    dependents = []
+    for candidate in MILESTONE_TIMEFRAMES[MILESTONE_TIMEFRAMES.index(timeframe) + 1:]:
+        if get_milestone(plan, candidate) is None:
+            continue
+        parents = milestone_parents(plan, candidate)
+        if timeframe in parents or (transitive and parents & affected):
+            affected.add(candidate)
+            dependents.append(candidate)
+    return dependents
+
+
+def affected_milestones(plan: CareerPlan, timeframe: str, updates: MilestoneUpdate) -> List[str]:
+    """
+    Later milestones that must be regenerated when the update is applied to the given milestone.
+
+    Call before applying the update, since the comparison is against the current values.
+    """
+    milestone = get_milestone(plan, timeframe)
+    if milestone is None:
+        return []
+
+    reaches = set(changed_fields(milestone, updates).values())
+    if "transitive" in reaches:
+        return milestone_dependents(plan, timeframe, transitive=True)
+    if "direct" in reaches:
+        return milestone_dependents(plan, timeframe, transitive=False)
+    return []
@@ -0,0 +1,107 @@
+from typing import Dict, List, Any, Optional, Type
+from pydantic import TypeAdapter
+from models.milestone import *
+from models.user import CareerPlan
+from utils.timestamp_utils import get_current_timestamp
+
+# Detail fields every milestone reads from the LLM's JSON; the rest of BaseMilestoneDetail
+# is set by the server (title, description, last_updated) or left to the user
+SHARED_DETAIL_DEFAULTS = {
+    "key_objectives": [],
+    "success_metrics": [],
+    "recommended_actions": [],
+    "resources": [],
+    "potential_challenges": [],
+    "dependencies": [],
+    "budget_estimate": 0.0,
+    "exa_research_topics": []
+}
+
+
+class MilestoneSpec:
+    """Everything that differs between milestone timeframes"""
+
+    def __init__(self, timeframe: str, field: str, milestone_class: Type[BaseMilestone],
+                 detail_class: Type[BaseMilestoneDetail], default_weeks: int):
+        self.timeframe = timeframe
+        self.field = field
+        self.milestone_class = milestone_class
+        self.detail_class = detail_class
+        self.default_weeks = default_weeks
+        # Detail fields taken from the LLM's JSON as given: the shared ones and those only this timeframe has.
+        # Their defaults are passed explicitly, which validates faster than pydantic copying field defaults
+        specific_defaults = {
+            name: field.default for name, field in detail_class.model_fields.items()
+            if name not in BaseMilestoneDetail.model_fields
+        }
+        self.detail_defaults = {**SHARED_DETAIL_DEFAULTS, "timeline_weeks": default_weeks, **specific_defaults}
+        self.llm_detail_fields = frozenset(self.detail_defaults)
+        # Built once; validates the milestone and its details in a single pass
+        self.adapter = TypeAdapter(milestone_class)
+
+    def build(self, m_data: Dict[str, Any]) -> BaseMilestone:
+        """Build the typed milestone from its LLM JSON"""
+        details_data = m_data.get('details', {})
+        title = m_data.get('title', f'{self.timeframe} milestone')
+        now = get_current_timestamp()
+
+        details = {
+            **self.detail_defaults,
+            **{field: value for field, value in details_data.items() if field in self.llm_detail_fields},
+            "title": title,
+            "description": m_data.get('overview', ''),
+            "last_updated": now
+        }
+        return self.adapter.validate_python({
+            "milestone_id": f"{self.timeframe}_{now.split('T')[0].replace('-', '')}",
+            "title": title,
+            "overview": m_data.get('overview', ''),
+            "details": details
+        })
+
+    def from_stored(self, m_data: Dict[str, Any]) -> BaseMilestone:
+        """Rebuild the milestone from its stored JSON"""
+        return self.adapter.validate_python({
+            "milestone_id": m_data.get('milestone_id', ''),
+            "title": m_data.get('title', ''),
+            "overview": m_data.get('overview', ''),
+            "completion_status": m_data.get('completion_status', 0.0),
+            "status": m_data.get('status', 'pending'),
+            "details": m_data.get('details', {})
+        })
+
+
+# Milestone timeframes in plan order
+MILESTONE_REGISTRY: Dict[str, MilestoneSpec] = {}
+MILESTONE_TIMEFRAMES: List[str] = []
+
+
+def register_milestone(timeframe: str, field: str, milestone_class: Type[BaseMilestone],
+                       detail_class: Type[BaseMilestoneDetail], default_weeks: int) -> MilestoneSpec:
+    """Add a timeframe after the registered ones; its field must exist on CareerPlan"""
+    spec = MilestoneSpec(timeframe, field, milestone_class, detail_class, default_weeks)
+    MILESTONE_REGISTRY[timeframe] = spec
+    MILESTONE_TIMEFRAMES.append(timeframe)
+    return spec
+
+
+register_milestone("1_month", "milestone_1", Milestone1, Milestone1Detail, 4)
+register_milestone("3_months", "milestone_2", Milestone2, Milestone2Detail, 12)
+register_milestone("1_year", "milestone_3", Milestone3, Milestone3Detail, 52)
+register_milestone("5_years", "milestone_4", Milestone4, Milestone4Detail, 260)
+
+
+def get_milestone(plan: CareerPlan, timeframe: str) -> Optional[Milestone]:
+    return getattr(plan, MILESTONE_REGISTRY[timeframe].field)
+
+
+def set_milestone(plan: CareerPlan, timeframe: str, milestone: Optional[Milestone]):
+    setattr(plan, MILESTONE_REGISTRY[timeframe].field, milestone)
+
+
+def milestone_fields(milestones: Dict[str, Milestone], plan: Optional[CareerPlan] = None) -> Dict[str, Optional[Milestone]]:
+    """CareerPlan keyword arguments for milestones keyed by timeframe, falling back to the plan's own"""
+    return {
+        spec.field: milestones.get(timeframe, getattr(plan, spec.field) if plan else None)
+        for timeframe, spec in MILESTONE_REGISTRY.items()
+    }
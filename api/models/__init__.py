@@ -0,0 +1,8 @@
+"""
+Pydantic models for the API.
+"""
+
+from .milestone import *
+from .user import *
+from .job import *
+from .batch import *
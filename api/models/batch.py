@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List, Any, Optional
+
+
+class BatchPlanRequest(BaseModel):
+    usernames: Optional[List[str]] = Field(default=None, description="Users to generate plans for; omit to select from the database")
+    created_after: Optional[str] = Field(default=None, description="When selecting from the database, only profiles created after this timestamp")
+    limit: Optional[int] = Field(default=None, description="Maximum number of users to select from the database")
+    requests_per_minute: int = Field(default=60, description="LLM request budget per minute")
+    tokens_per_minute: int = Field(default=80000, description="LLM token budget per minute")
+    concurrency: int = Field(default=8, description="Maximum plans generated at once")
+    batch_size: int = Field(default=25, description="Plans written per database batch")
+
+
+class BatchReport(BaseModel):
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = Field(default=0, description="Users already completed by an earlier run of the same checkpoint")
+    elapsed_seconds: float = 0.0
+    plans_per_minute: float = 0.0
+    estimated_tokens: int = 0
+    failures: Dict[str, str] = Field(default={}, description="Error per failed username")
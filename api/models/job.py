@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List, Any, Optional
+
+
+class Job(BaseModel):
+    job_id: str
+    job_type: str = Field(..., description="Registered job type, e.g. generate_plan or update_cascade")
+    username: str
+    status: str = Field(default="queued", description="queued, running, succeeded, failed")
+    params: Dict[str, Any] = Field(default={}, description="Arguments the job was enqueued with")
+    partial_results: Dict[str, Any] = Field(default={}, description="Results reported while the job is running")
+    result: Optional[Any] = Field(default=None, description="Final result once the job has succeeded")
+    error: Optional[str] = Field(default=None, description="Error message if the job failed")
+    created_at: str
+    updated_at: str
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
@@ -0,0 +1,143 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from models.user import CareerPlan
+from utils.timestamp_utils import compare_timestamps
+
+
+class PlanCache:
+    """
+    In-process cache of career plans keyed by username.
+
+    Reads fill the cache and writes go through it, so a hot user's plan is
+    served without a database query or rebuilding the milestone models. A
+    successful write always replaces the entry; a plan filled from a read
+    never replaces one with a newer last_updated, and entries older than the TTL are revalidated
+    against the database's last_updated before being served again, so writes
+    from other processes are picked up. Memory is bounded by the approximate
+    size of the stored rows, evicting the least recently used plans first.
+
+    Cached plans are shared between readers and must not be modified in place;
+    code that changes a plan works on a copy (see CascadingPlanManager).
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, ttl_seconds: float = 300):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.stale = 0
+        self.evictions = 0
+        self.writes = 0
+
+    def get(self, username: str) -> Tuple[Optional[CareerPlan], bool]:
+        """
+        Look up a plan.
+
+        Returns:
+            (plan, expired): a fresh plan with expired False is a hit; an expired
+            plan must go through revalidate() before it is served
+        """
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                self.misses += 1
+                return None, False
+            self._entries.move_to_end(username)
+            if entry[0] <= time.monotonic():
+                return entry[1], True
+            self.hits += 1
+            return entry[1], False
+
+    def revalidate(self, username: str, db_last_updated: Optional[str]) -> Optional[CareerPlan]:
+        """Serve an expired entry for another TTL if the database still has the same version of it"""
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None or db_last_updated is None or db_last_updated != entry[1].last_updated:
+                self.stale += 1
+                self.misses += 1
+                self._remove(username)
+                return None
+            self._entries[username] = (time.monotonic() + self.ttl_seconds, entry[1], entry[2])
+            self.revalidations += 1
+            self.hits += 1
+            return entry[1]
+
+    def set(self, username: str, plan: CareerPlan, size_bytes: int, written: bool = False):
+        """
+        Cache a plan.
+
+        A plan just written to the database (written=True) replaces the entry; a plan
+        read from it is dropped if the cached one was updated later.
+        """
+        with self._lock:
+            current = self._entries.get(username)
+            if not written and current is not None and self._is_newer(current[1], plan):
+                return
+            if size_bytes > self.max_bytes:
+                # Too large to keep, but an older cached version must not outlive the write
+                if written:
+                    self._remove(username)
+                return
+            if current is not None:
+                self._remove(username)
+
+            self._entries[username] = (time.monotonic() + self.ttl_seconds, plan, size_bytes)
+            self._bytes += size_bytes
+            self.writes += 1
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, username: str):
+        with self._lock:
+            self._remove(username)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "revalidations": self.revalidations,
+                "stale": self.stale,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes
+            }
+
+    def _is_newer(self, cached: CareerPlan, incoming: CareerPlan) -> bool:
+        # last_updated is set on every store; versions restart at 1 for a newly generated plan
+        return compare_timestamps(cached.last_updated, incoming.last_updated) == 1
+
+    def _remove(self, username: str):
+        entry = self._entries.pop(username, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+
+def create_plan_cache_from_env() -> Optional[PlanCache]:
+    """Build the shared plan cache from PLAN_CACHE_* environment variables"""
+    if os.getenv("PLAN_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+
+    return PlanCache(
+        max_bytes=int(os.getenv("PLAN_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+        ttl_seconds=float(os.getenv("PLAN_CACHE_TTL_SECONDS", "300"))
+    )
@@ -0,0 +1,140 @@
+import os
+import asyncio
+import threading
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
+from models.user import CareerPlan
+from utils.etag_utils import plan_etag
+from milestone_registry import MILESTONE_REGISTRY
+
+_UNSET = object()
+
+
+class _Subscriber:
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.loop = asyncio.get_running_loop()
+
+
+class PlanEventHub:
+    """
+    Pushes plan changes to every open subscription for the plan's user.
+
+    Each stored plan is published as a `plan` event carrying the new version,
+    last_updated and ETag, and only the plan fields that changed since the
+    previous event (keyed like the CareerPlan JSON). `previous_etag` names the
+    plan the changes apply to; a client holding a different plan refetches it.
+
+    Every subscriber has a bounded queue, so a slow client never holds up a
+    store or grows memory: when its queue is full the pending events are
+    dropped and replaced by one `resync` event telling it to refetch the plan.
+    Idle subscriptions get a heartbeat so proxies keep them open and closed
+    connections are noticed.
+
+    Only stores made by this process are published.
+    """
+
+    def __init__(self, queue_size: int = 16, heartbeat_seconds: float = 15.0):
+        self.queue_size = queue_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self._subscribers: Dict[str, List[_Subscriber]] = {}
+        # Last published fields and ETag per subscribed user, the base for the next delta
+        self._snapshots: Dict[str, Tuple[Dict[str, Any], str]] = {}
+        self._lock = threading.Lock()
+
+        self.published = 0
+        self.delivered = 0
+        self.resyncs = 0
+        self.dropped = 0
+        self.heartbeats = 0
+
+    async def subscribe(self, username: str) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield (event, payload) for the user's plan changes until the caller stops iterating"""
+        subscriber = _Subscriber(self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(username, []).append(subscriber)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    self.heartbeats += 1
+                    yield "heartbeat", None
+                    continue
+                yield event
+        finally:
+            with self._lock:
+                self._subscribers[username].remove(subscriber)
+                if not self._subscribers[username]:
+                    del self._subscribers[username]
+                    self._snapshots.pop(username, None)
+
+    def publish(self, plan: CareerPlan):
+        """Send a stored plan's changes to the user's subscribers; a no-op when there are none"""
+        username = plan.user_id
+        with self._lock:
+            subscribers = list(self._subscribers.get(username, ()))
+            if not subscribers:
+                return
+
+            fields = {
+                "overview": plan.overview,
+                **{
+                    spec.field: milestone.model_dump(mode="json") if milestone else None
+                    for spec in MILESTONE_REGISTRY.values()
+                    for milestone in [getattr(plan, spec.field)]
+                }
+            }
+            etag = plan_etag(username, plan.last_updated)
+            previous_fields, previous_etag = self._snapshots.get(username, ({}, None))
+            self._snapshots[username] = (fields, etag)
+
+        event = ("plan", {
+            "username": username,
+            "version": plan.version,
+            "last_updated": plan.last_updated,
+            "etag": etag,
+            "previous_etag": previous_etag,
+            "changes": {field: value for field, value in fields.items() if previous_fields.get(field, _UNSET) != value}
+        })
+        self.published += 1
+
+        try:
+            current_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            current_loop = None
+        for subscriber in subscribers:
+            # Stores made outside a subscriber's event loop hand the event over thread-safely
+            if subscriber.loop is current_loop:
+                self._offer(subscriber, event)
+            elif not subscriber.loop.is_closed():
+                subscriber.loop.call_soon_threadsafe(self._offer, subscriber, event)
+
+    def _offer(self, subscriber: _Subscriber, event: Tuple[str, Any]):
+        if subscriber.queue.full():
+            while not subscriber.queue.empty():
+                subscriber.queue.get_nowait()
+                self.dropped += 1
+            self.resyncs += 1
+            event = ("resync", {"username": event[1]["username"], "etag": event[1]["etag"]})
+        subscriber.queue.put_nowait(event)
+        self.delivered += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "users": len(self._subscribers),
+                "subscribers": sum(len(subscribers) for subscribers in self._subscribers.values()),
+                "published": self.published,
+                "delivered": self.delivered,
+                "resyncs": self.resyncs,
+                "dropped": self.dropped,
+                "heartbeats": self.heartbeats
+            }
+
+
+def create_plan_event_hub_from_env() -> PlanEventHub:
+    """Build the plan change hub from PLAN_EVENTS_* environment variables"""
+    return PlanEventHub(
+        queue_size=int(os.getenv("PLAN_EVENTS_QUEUE_SIZE", "16")),
+        heartbeat_seconds=float(os.getenv("PLAN_EVENTS_HEARTBEAT_SECONDS", "15"))
+    )
@@ -1,59 +1,296 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, AsyncIterator, Callable, Tuple
 import json
+import os
+import asyncio
 from datetime import datetime, timedelta
 from exa_py import Exa
-from db import getUserInformationFromDB, storeUserPlanInDB
+from db import getUserInformationFromDB, storeUserPlanInDB, storeUserPlanInDBAsync
 from models.milestone import *
 from models.user import *
-from clients import openai_client
-from prompts import create_career_plan_prompt
+from llm_client import ResilientLLMClient, create_llm_client_from_env
+from prompts import create_career_plan_prompt, create_plan_overview_prompt, create_milestone_prompt, compact_prompt, render_compact, milestone_schema
 from utils.timestamp_utils import get_current_timestamp
+from utils.json_stream_utils import IncrementalJSONScanner, extract_json_object
+from utils.concurrency_utils import SingleFlight
+from utils.token_utils import estimate_tokens, estimate_prompt_tokens, estimate_request_tokens, TokenUsageMeter
+from llm_cache import LLMResponseCache, create_llm_cache_from_env
+from milestone_dependencies import affected_milestones
+from milestone_registry import MILESTONE_TIMEFRAMES, get_milestone, set_milestone, milestone_fields
+from plan_parser import StreamingPlanParser, PlanParseResult, parse_plan_response, parse_milestones_response, build_milestone
 
 
 # Note: Plan storage now handled by database functions in db.py
 
+PLAN_STRATEGIST_PROMPT = "You are an expert career strategist. Generate comprehensive career transition plans with cascading milestone dependencies."
+
+# Completion budgets for the parallel generation mode
+OVERVIEW_MAX_TOKENS = 800
+MILESTONE_MAX_TOKENS = 1000
+
+
 class CascadingPlanManager:
-    def __init__(self):
-        self.milestone_order = ["1_month", "3_months", "1_year", "5_years"]
-    
-    def generate_initial_plan(self, user_profile: UserProfile) -> CareerPlan:
+    def __init__(self, generation_mode: Optional[str] = None, milestone_concurrency: Optional[int] = None, cache: Optional[LLMResponseCache] = None, llm: Optional[ResilientLLMClient] = None, cascade_update_mode: Optional[str] = None):
+        self.milestone_order = list(MILESTONE_TIMEFRAMES)
+        # "single" asks for the whole plan in one completion, "parallel" generates the
+        # overview first and then every milestone concurrently
+        self.generation_mode = generation_mode or os.getenv("PLAN_GENERATION_MODE", "single")
+        self.milestone_concurrency = milestone_concurrency or int(os.getenv("PLAN_MILESTONE_CONCURRENCY", "4"))
+        # Byte-identical requests are answered from the response cache (None disables it)
+        self.cache = cache if cache is not None else create_llm_cache_from_env()
+        # Rate limits, adaptive concurrency, retries and deadlines for every LLM call
+        self.llm = llm if llm is not None else create_llm_client_from_env()
+        # "two_step" turns thoughts into updates and then regenerates later milestones in a
+        # second completion, "combined" does both in a single streamed completion
+        self.cascade_update_mode = cascade_update_mode or os.getenv("CASCADE_UPDATE_MODE", "two_step")
+        # Rounds of targeted re-requests for milestones that came back missing or invalid
+        self.repair_attempts = int(os.getenv("MILESTONE_REPAIR_ATTEMPTS", "2"))
+        # Concurrent identical cascades share one LLM call and one DB write
+        self.flights = SingleFlight()
+        # Input tokens of every prompt sent, by operation, plus provider-reported usage
+        self.token_usage = TokenUsageMeter()
+
+    def _completion_request(self, system_prompt: str, user_prompt: str, max_tokens: int, operation: str = "completion") -> Dict[str, Any]:
+        """Build the chat completion arguments shared by the sync and async paths"""
+        return {
+            "model": "gpt-4",
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": compact_prompt(user_prompt)}
+            ],
+            "temperature": 0.7,
+            "max_tokens": max_tokens,
+            # Label for token accounting; stripped before the request is sent
+            "operation": operation
+        }
+
+    def _provider_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Record the request's input tokens and return the arguments for the provider"""
+        self.token_usage.record_prompt(request.get("operation", "completion"), estimate_prompt_tokens(request))
+        return {key: value for key, value in request.items() if key != "operation"}
+
+    def _record_usage(self, request: Dict[str, Any], response: Any, content: Optional[str]):
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self.token_usage.record_usage(usage.prompt_tokens, usage.completion_tokens)
+        else:
+            self.token_usage.record_usage(estimate_prompt_tokens(request), estimate_tokens(content or ""))
+
+    def _cached_response(self, request: Dict[str, Any], use_cache: bool) -> Optional[str]:
+        if use_cache and self.cache:
+            return self.cache.get(request)
+        return None
+
+    def _cache_response(self, request: Dict[str, Any], content: str, use_cache: bool):
+        if use_cache and self.cache:
+            self.cache.set(request, content)
+
+    def _discard_response(self, request: Dict[str, Any], use_cache: bool):
+        # A response that didn't parse completely must not be replayed from the cache
+        if use_cache and self.cache:
+            self.cache.delete(request)
+
+    # Variants for the async paths, which keep the cache's disk tier off the event loop
+
+    async def _cached_response_async(self, request: Dict[str, Any], use_cache: bool) -> Optional[str]:
+        if use_cache and self.cache:
+            return await self.cache.get_async(request)
+        return None
+
+    async def _cache_response_async(self, request: Dict[str, Any], content: str, use_cache: bool):
+        if use_cache and self.cache:
+            await self.cache.set_async(request, content)
+
+    async def _discard_response_async(self, request: Dict[str, Any], use_cache: bool):
+        if use_cache and self.cache:
+            await self.cache.delete_async(request)
+
+    def _complete(self, request: Dict[str, Any], use_cache: bool = True) -> str:
+        """Run a chat completion on the blocking client and return the message content"""
+        cached = self._cached_response(request, use_cache)
+        if cached is not None:
+            return cached
+        response = self.llm.create_sync(self._provider_request(request))
+        content = response.choices[0].message.content
+        self._record_usage(request, response, content)
+        self._cache_response(request, content, use_cache)
+        return content
+
+    async def _complete_async(self, request: Dict[str, Any], use_cache: bool = True) -> str:
+        """Run a chat completion on the async client and return the message content"""
+        cached = await self._cached_response_async(request, use_cache)
+        if cached is not None:
+            return cached
+        response = await self.llm.create_hedged(self._provider_request(request))
+        content = response.choices[0].message.content
+        self._record_usage(request, response, content)
+        await self._cache_response_async(request, content, use_cache)
+        return content
+
+    async def _stream_complete_async(self, request: Dict[str, Any], use_cache: bool = True) -> AsyncIterator[str]:
+        """Run a streaming chat completion on the async client and yield content deltas"""
+        cached = await self._cached_response_async(request, use_cache)
+        if cached is not None:
+            yield cached
+            return
+        stream = await self.llm.create(self._provider_request(request), stream=True)
+        chunks = []
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    chunks.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        finally:
+            # Frees the concurrency slot promptly if the reader stops early
+            await stream.aclose()
+        # Streamed responses carry no usage block, so the completion is estimated
+        self._record_usage(request, None, "".join(chunks))
+        await self._cache_response_async(request, "".join(chunks), use_cache)
+
+    def _initial_plan_request(self, user_profile: UserProfile) -> Dict[str, Any]:
+        prompt = create_career_plan_prompt(user_profile)
+        return self._completion_request(
+            PLAN_STRATEGIST_PROMPT,
+            prompt,
+            max_tokens=3500,
+            operation="generate_plan"
+        )
+
+    def plan_generation_budget(self, user_profile: UserProfile) -> Tuple[int, int]:
+        """Estimate the (requests, tokens) generating a plan for this profile will consume"""
+        if self.generation_mode == "parallel":
+            requests = [self._completion_request(PLAN_STRATEGIST_PROMPT, create_plan_overview_prompt(user_profile), max_tokens=OVERVIEW_MAX_TOKENS, operation="generate_overview")]
+            requests += [
+                self._completion_request(PLAN_STRATEGIST_PROMPT, create_milestone_prompt(user_profile, {}, timeframe), max_tokens=MILESTONE_MAX_TOKENS, operation="generate_milestone")
+                for timeframe in self.milestone_order
+            ]
+        else:
+            requests = [self._initial_plan_request(user_profile)]
+        return len(requests), sum(estimate_request_tokens(request) for request in requests)
+
+    def generate_initial_plan(self, user_profile: UserProfile, use_cache: bool = True) -> CareerPlan:
         """Generate initial career plan with all milestones"""
         
         # Generate comprehensive plan using LLM
-        prompt = create_career_plan_prompt(user_profile)
+        request = self._initial_plan_request(user_profile)
         
         try:
-            response = openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert career strategist. Generate comprehensive career transition plans with cascading milestone dependencies."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=3500
-            )
-            
-            llm_response = response.choices[0].message.content
-            return self.parse_comprehensive_plan(llm_response, user_profile)
+            llm_response = self._complete(request, use_cache)
+            result = parse_plan_response(llm_response, self.milestone_order)
+            if not result.complete:
+                self._discard_response(request, use_cache)
+            self._repair_plan(result, user_profile)
+            return self.plan_from_parse_result(result, user_profile)
             
         except Exception as e:
             raise Exception(f"LLM generation failed: {e}")
-    
-    def process_user_thoughts_to_updates(self, plan: CareerPlan, milestone_timeframe: str, user_thoughts: str, context: str = "") -> MilestoneUpdate:
-        """Process user's natural language thoughts into structured milestone updates"""
-        
-        # Map timeframe to the correct milestone field
-        milestone_field_map = {
-            "1_month": plan.milestone_1,
-            "3_months": plan.milestone_2,
-            "1_year": plan.milestone_3,
-            "5_years": plan.milestone_4
-        }
-        
-        if milestone_timeframe not in milestone_field_map or milestone_field_map[milestone_timeframe] is None:
+
+    async def generate_initial_plan_async(self, user_profile: UserProfile, use_cache: bool = True) -> CareerPlan:
+        """Generate initial career plan with all milestones without blocking the event loop"""
+
+        if self.generation_mode == "parallel":
+            return await self.generate_initial_plan_parallel(user_profile, use_cache)
+
+        request = self._initial_plan_request(user_profile)
+
+        try:
+            llm_response = await self._complete_async(request, use_cache)
+            result = parse_plan_response(llm_response, self.milestone_order)
+            if not result.complete:
+                await self._discard_response_async(request, use_cache)
+            await self._repair_plan_async(result, user_profile)
+            return self.plan_from_parse_result(result, user_profile)
+
+        except Exception as e:
+            raise Exception(f"LLM generation failed: {e}")
+
+    async def generate_initial_plan_parallel(self, user_profile: UserProfile, use_cache: bool = True) -> CareerPlan:
+        """Generate the plan overview, then all milestones concurrently from the shared overview"""
+
+        try:
+            overview_request = self._completion_request(
+                PLAN_STRATEGIST_PROMPT,
+                create_plan_overview_prompt(user_profile),
+                max_tokens=OVERVIEW_MAX_TOKENS,
+                operation="generate_overview"
+            )
+            overview = extract_json_object(await self._complete_async(overview_request, use_cache))
+            if overview is None:
+                await self._discard_response_async(overview_request, use_cache)
+                raise ValueError("No JSON found in overview response")
+
+            semaphore = asyncio.Semaphore(self.milestone_concurrency)
+
+            async def generate_milestone(timeframe: str) -> Optional[Milestone]:
+                request = self._completion_request(
+                    PLAN_STRATEGIST_PROMPT,
+                    create_milestone_prompt(user_profile, overview, timeframe),
+                    max_tokens=MILESTONE_MAX_TOKENS,
+                    operation="generate_milestone"
+                )
+                async with semaphore:
+                    llm_response = await self._complete_async(request, use_cache)
+                try:
+                    m_data = extract_json_object(llm_response)
+                    if m_data is None:
+                        raise ValueError(f"No JSON found in {timeframe} response")
+                    return build_milestone(timeframe, m_data)
+                except Exception:
+                    await self._discard_response_async(request, use_cache)
+                    raise
+
+            milestones = await asyncio.gather(
+                *(generate_milestone(timeframe) for timeframe in self.milestone_order),
+                return_exceptions=True
+            )
+
+            result = PlanParseResult(self.milestone_order)
+            result.overview = overview
+            for timeframe, milestone in zip(self.milestone_order, milestones):
+                if isinstance(milestone, Exception):
+                    result.errors[timeframe] = str(milestone)
+                elif milestone:
+                    result.milestones[timeframe] = milestone
+
+            await self._repair_plan_async(result, user_profile)
+            return self.plan_from_parse_result(result, user_profile)
+
+        except Exception as e:
+            raise Exception(f"LLM generation failed: {e}")
+
+    async def stream_initial_plan(self, user_profile: UserProfile, use_cache: bool = True) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Generate initial career plan, yielding ("overview", dict) and ("milestone", Milestone)
+        as soon as each JSON subtree is complete, followed by ("plan", CareerPlan)
+        """
+
+        request = self._initial_plan_request(user_profile)
+        parser = StreamingPlanParser(self.milestone_order)
+
+        try:
+            async for text in self._stream_complete_async(request, use_cache):
+                for event in parser.feed(text):
+                    yield event
+
+            result = parser.finish()
+            missing = result.missing
+            if not result.complete:
+                await self._discard_response_async(request, use_cache)
+            await self._repair_plan_async(result, user_profile)
+            for timeframe in missing:
+                if timeframe in result.milestones:
+                    yield "milestone", result.milestones[timeframe]
+
+            plan = self.plan_from_parse_result(result, user_profile)
+
+        except Exception as e:
+            raise Exception(f"LLM generation failed: {e}")
+
+        yield "plan", plan
+
+    def _user_thoughts_request(self, plan: CareerPlan, milestone_timeframe: str, user_thoughts: str, context: str = "") -> Dict[str, Any]:
+        current_milestone = get_milestone(plan, milestone_timeframe) if milestone_timeframe in self.milestone_order else None
+        if current_milestone is None:
             raise ValueError(f"Invalid milestone timeframe: {milestone_timeframe}")
-            
-        current_milestone = milestone_field_map[milestone_timeframe]
         
         # Create prompt for LLM to reason about user thoughts and generate updates
         reasoning_prompt = f"""
@@ -63,7 +300,7 @@ class CascadingPlanManager:
         Title: {current_milestone.title}
         Current Objectives: {', '.join(current_milestone.details.key_objectives)}
         Current Timeline: {current_milestone.details.timeline_weeks} weeks
-        Current Notes: {current_milestone.details.user_notes}
+        Current Notes: {current_milestone.details.user_notes or "None"}
         
         USER'S THOUGHTS: "{user_thoughts}"
         
@@ -85,127 +322,326 @@ class CascadingPlanManager:
         }}
         """
         
+        return self._completion_request(
+            "You are an expert career coach who interprets user concerns and translates them into actionable milestone updates.",
+            reasoning_prompt,
+            max_tokens=1500,
+            operation="user_thoughts"
+        )
+
+    def _parse_user_thoughts_response(self, llm_response: str, user_thoughts: str) -> MilestoneUpdate:
+        # Parse the response, keeping the updates object even if trailing text is cut off
+        scanner = IncrementalJSONScanner(watch_paths=[("updates",)])
+        completed = dict(scanner.feed(llm_response))
+        
+        if () in completed:
+            parsed_data = completed[()]
+        elif ("updates",) in completed:
+            parsed_data = {"updates": completed[("updates",)]}
+        else:
+            raise ValueError("No JSON found in LLM response")
+        
+        print(f"LLM Reasoning: {parsed_data.get('reasoning', 'No reasoning provided')}")
+        
+        return self._milestone_update_from_data(parsed_data.get('updates', {}), user_thoughts)
+
+    def _milestone_update_from_data(self, updates_data: Dict[str, Any], user_thoughts: str) -> MilestoneUpdate:
+        return MilestoneUpdate(
+            objectives=updates_data.get('objectives'),
+            timeline_weeks=updates_data.get('timeline_weeks'),
+            focus_areas=updates_data.get('focus_areas'),
+            user_notes=updates_data.get('user_notes', user_thoughts),
+            priority_level=updates_data.get('priority_level', 'medium')
+        )
+
+    def _fallback_user_thoughts_update(self, user_thoughts: str, context: str = "") -> MilestoneUpdate:
+        # Fallback: create basic update with user thoughts as notes
+        return MilestoneUpdate(
+            user_notes=f"User feedback: {user_thoughts}. Context: {context}",
+            priority_level='medium'
+        )
+    
+    def process_user_thoughts_to_updates(self, plan: CareerPlan, milestone_timeframe: str, user_thoughts: str, context: str = "", use_cache: bool = True) -> MilestoneUpdate:
+        """Process user's natural language thoughts into structured milestone updates"""
+        
+        request = self._user_thoughts_request(plan, milestone_timeframe, user_thoughts, context)
+        
         try:
-            response = openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert career coach who interprets user concerns and translates them into actionable milestone updates."},
-                    {"role": "user", "content": reasoning_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=1500
-            )
-            
-            llm_response = response.choices[0].message.content
-            
-            # Parse the response
-            start_idx = llm_response.find('{')
-            end_idx = llm_response.rfind('}') + 1
-            
-            if start_idx == -1 or end_idx == 0:
-                raise ValueError("No JSON found in LLM response")
-            
-            json_str = llm_response[start_idx:end_idx]
-            parsed_data = json.loads(json_str)
-            
-            updates_data = parsed_data.get('updates', {})
-            
-            # Create MilestoneUpdate object
-            milestone_update = MilestoneUpdate(
-                objectives=updates_data.get('objectives'),
-                timeline_weeks=updates_data.get('timeline_weeks'),
-                focus_areas=updates_data.get('focus_areas'),
-                user_notes=updates_data.get('user_notes', user_thoughts),
-                priority_level=updates_data.get('priority_level', 'medium')
-            )
-            
-            print(f"LLM Reasoning: {parsed_data.get('reasoning', 'No reasoning provided')}")
-            
-            return milestone_update
+            llm_response = self._complete(request, use_cache)
+            return self._parse_user_thoughts_response(llm_response, user_thoughts)
             
         except Exception as e:
             print(f"Failed to process user thoughts: {e}")
-            # Fallback: create basic update with user thoughts as notes
-            return MilestoneUpdate(
-                user_notes=f"User feedback: {user_thoughts}. Context: {context}",
-                priority_level='medium'
-            )
-    
-    def update_milestone_with_cascade(self, plan: CareerPlan, milestone_timeframe: str, updates: MilestoneUpdate) -> CareerPlan:
-        """Update a specific milestone and cascade changes to subsequent milestones"""
-        
+            self._discard_response(request, use_cache)
+            return self._fallback_user_thoughts_update(user_thoughts, context)
+
+    async def process_user_thoughts_to_updates_async(self, plan: CareerPlan, milestone_timeframe: str, user_thoughts: str, context: str = "", use_cache: bool = True) -> MilestoneUpdate:
+        """Process user's natural language thoughts into structured milestone updates without blocking the event loop"""
+
+        request = self._user_thoughts_request(plan, milestone_timeframe, user_thoughts, context)
+
+        try:
+            llm_response = await self._complete_async(request, use_cache)
+            return self._parse_user_thoughts_response(llm_response, user_thoughts)
+
+        except Exception as e:
+            print(f"Failed to process user thoughts: {e}")
+            await self._discard_response_async(request, use_cache)
+            return self._fallback_user_thoughts_update(user_thoughts, context)
+
+    def affected_milestones(self, plan: CareerPlan, milestone_timeframe: str, updates: MilestoneUpdate) -> List[str]:
+        """Later milestones the update would regenerate; cosmetic changes affect none"""
         if milestone_timeframe not in self.milestone_order:
             raise ValueError(f"Invalid milestone timeframe: {milestone_timeframe}")
+        return affected_milestones(plan, milestone_timeframe, updates)
+
+    def _apply_target_update(self, plan: CareerPlan, milestone_timeframe: str, updates: MilestoneUpdate) -> List[str]:
+        """Apply updates to the target milestone and return the timeframes that need to cascade"""
         
-        # Map timeframe to the correct milestone field
-        milestone_field_map = {
-            "1_month": plan.milestone_1,
-            "3_months": plan.milestone_2,
-            "1_year": plan.milestone_3,
-            "5_years": plan.milestone_4
-        }
+        if milestone_timeframe not in self.milestone_order:
+            raise ValueError(f"Invalid milestone timeframe: {milestone_timeframe}")
         
-        if milestone_timeframe not in milestone_field_map or milestone_field_map[milestone_timeframe] is None:
+        target = get_milestone(plan, milestone_timeframe)
+        if target is None:
             raise ValueError(f"Milestone {milestone_timeframe} not found in plan")
         
-        milestone_index = self.milestone_order.index(milestone_timeframe)
+        # Work out what the update affects before it overwrites the current values
+        affected = affected_milestones(plan, milestone_timeframe, updates)
         
         # Update the target milestone
-        self.apply_milestone_updates(milestone_field_map[milestone_timeframe], updates)
+        self.apply_milestone_updates(target, updates)
         
-        # Cascade updates to subsequent milestones
-        subsequent_milestones = self.milestone_order[milestone_index + 1:]
+        # Cascade updates only to the milestones that depend on what changed
+        return affected
+
+    def _stores_update(self, milestone_timeframe: str) -> bool:
+        # Updates are stored for every milestone that has later ones, whether or not they cascade
+        return milestone_timeframe != self.milestone_order[-1]
+
+    def _merge_cascaded_milestones(self, plan: CareerPlan, updated_plan: CareerPlan, subsequent_milestones: List[str]):
+        # Update the plan with new milestone fields
+        for timeframe in subsequent_milestones:
+            if timeframe in self.milestone_order:
+                set_milestone(plan, timeframe, get_milestone(updated_plan, timeframe))
+            
+        plan.last_updated = get_current_timestamp()
+    
+    def update_milestone_with_cascade(self, plan: CareerPlan, milestone_timeframe: str, updates: MilestoneUpdate) -> CareerPlan:
+        """Update a specific milestone and cascade changes to subsequent milestones"""
+        
+        # Plans may be shared through the plan cache, so changes are made to a copy
+        plan = plan.model_copy(deep=True)
+        subsequent_milestones = self._apply_target_update(plan, milestone_timeframe, updates)
         
         if subsequent_milestones:
             # Generate updated plan for subsequent milestones
             updated_plan = self.regenerate_subsequent_milestones(
                 plan, milestone_timeframe, subsequent_milestones
             )
-            
-            # Update the plan with new milestone fields
-            for timeframe in subsequent_milestones:
-                if timeframe == "1_month":
-                    plan.milestone_1 = updated_plan.milestone_1
-                elif timeframe == "3_months":
-                    plan.milestone_2 = updated_plan.milestone_2
-                elif timeframe == "1_year":
-                    plan.milestone_3 = updated_plan.milestone_3
-                elif timeframe == "5_years":
-                    plan.milestone_4 = updated_plan.milestone_4
-                
-            plan.last_updated = get_current_timestamp()
-            
+            self._merge_cascaded_milestones(plan, updated_plan, subsequent_milestones)
+        
+        if self._stores_update(milestone_timeframe):
             storeUserPlanInDB(plan)
         
         return plan
-    
-    def regenerate_subsequent_milestones(self, plan: CareerPlan, updated_milestone: str, subsequent_milestones: List[str]) -> CareerPlan:
-        """Regenerate subsequent milestones based on updated milestone"""
-        
-        # Create context for LLM about the changes
-        milestone_field_map = {
-            "1_month": plan.milestone_1,
-            "3_months": plan.milestone_2,
-            "1_year": plan.milestone_3,
-            "5_years": plan.milestone_4
+
+    async def update_milestone_with_cascade_async(self, plan: CareerPlan, milestone_timeframe: str, updates: MilestoneUpdate) -> CareerPlan:
+        """Update a specific milestone and cascade changes to subsequent milestones without blocking the event loop"""
+
+        key = ("update-cascade", plan.user_id, plan.version, milestone_timeframe, updates.model_dump_json())
+        return await self.flights.do(
+            key, lambda: self._update_milestone_with_cascade_async(plan, milestone_timeframe, updates)
+        )
+
+    async def _update_milestone_with_cascade_async(self, plan: CareerPlan, milestone_timeframe: str, updates: MilestoneUpdate) -> CareerPlan:
+        plan = plan.model_copy(deep=True)
+        subsequent_milestones = self._apply_target_update(plan, milestone_timeframe, updates)
+
+        if subsequent_milestones:
+            updated_plan = await self.regenerate_subsequent_milestones_async(
+                plan, milestone_timeframe, subsequent_milestones
+            )
+            self._merge_cascaded_milestones(plan, updated_plan, subsequent_milestones)
+
+        if self._stores_update(milestone_timeframe):
+            await storeUserPlanInDBAsync(plan)
+
+        return plan
+
+    def _combined_cascade_request(self, plan: CareerPlan, milestone_timeframe: str, user_thoughts: str, context: str = "") -> Dict[str, Any]:
+        current_milestone = get_milestone(plan, milestone_timeframe)
+        if current_milestone is None:
+            raise ValueError(f"Milestone {milestone_timeframe} not found in plan")
+
+        later = [t for t in self.milestone_order[self.milestone_order.index(milestone_timeframe) + 1:] if get_milestone(plan, t) is not None]
+        later_summary = {
+            timeframe: {
+                "title": get_milestone(plan, timeframe).title,
+                "objectives": get_milestone(plan, timeframe).details.key_objectives,
+                "timeline_weeks": get_milestone(plan, timeframe).details.timeline_weeks,
+                "dependencies": get_milestone(plan, timeframe).details.dependencies
+            }
+            for timeframe in later
         }
-        
-        updated_milestone_data = milestone_field_map[updated_milestone]
+        milestone_skeletons = {timeframe: milestone_schema(timeframe) for timeframe in later}
+
+        combined_prompt = f"""
+        A user wants to update their {milestone_timeframe} career milestone, and the later milestones must stay consistent with the change.
+
+        PLAN OVERVIEW:
+        {render_compact(plan.overview)}
+
+        CURRENT {milestone_timeframe.upper()} MILESTONE:
+        {render_compact({
+            "title": current_milestone.title,
+            "objectives": current_milestone.details.key_objectives,
+            "timeline_weeks": current_milestone.details.timeline_weeks,
+            "user_notes": current_milestone.details.user_notes,
+            "priority": current_milestone.details.priority_level
+        })}
+
+        LATER MILESTONES:
+        {render_compact(later_summary)}
+
+        USER'S THOUGHTS: "{user_thoughts}"
+
+        ADDITIONAL CONTEXT: "{context}"
+
+        First decide what changes the user wants to the {milestone_timeframe} milestone. Then rewrite only the later milestones that must change because of those updates; leave out any that are unaffected, and return an empty "milestones" object if nothing later changes.
+
+        Respond in JSON format, with "updates" before "milestones":
+        {json.dumps({
+            "reasoning": "Why these changes make sense based on user's thoughts",
+            "updates": {
+                "objectives": ["updated objective 1", "updated objective 2"],
+                "timeline_weeks": 12,
+                "focus_areas": ["area1", "area2"],
+                "user_notes": "Updated notes incorporating user thoughts",
+                "priority_level": "high/medium/low"
+            },
+            "milestones": milestone_skeletons
+        }, separators=(",", ":"))}
+        """
+
+        return self._completion_request(
+            "You are an expert career coach who turns user concerns into milestone updates and keeps the rest of the career plan consistent with them.",
+            combined_prompt,
+            max_tokens=1500 + MILESTONE_MAX_TOKENS * len(later),
+            operation="combined_cascade"
+        )
+
+    async def stream_update_with_cascade(self, plan: CareerPlan, milestone_timeframe: str, user_thoughts: str, context: str = "", use_cache: bool = True) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Turn the user's thoughts into milestone updates and regenerate the affected later
+        milestones in one streamed completion. Yields ("updates", MilestoneUpdate) and
+        ("milestone", Milestone) as each part is complete, then the updated ("plan", CareerPlan).
+        """
+        if milestone_timeframe not in self.milestone_order:
+            raise ValueError(f"Invalid milestone timeframe: {milestone_timeframe}")
+
+        plan = plan.model_copy(deep=True)
+        request = self._combined_cascade_request(plan, milestone_timeframe, user_thoughts, context)
+        later = self.milestone_order[self.milestone_order.index(milestone_timeframe) + 1:]
+        scanner = IncrementalJSONScanner(watch_paths=[("updates",)] + [("milestones", timeframe) for timeframe in later])
+
+        updates = None
+        affected: List[str] = []
+        regenerated: Dict[str, Milestone] = {}
+
+        try:
+            async for text in self._stream_complete_async(request, use_cache):
+                for path, value in scanner.feed(text):
+                    if path == ("updates",) and updates is None:
+                        updates = self._milestone_update_from_data(value, user_thoughts)
+                        affected = self.affected_milestones(plan, milestone_timeframe, updates)
+                        yield "updates", updates
+                        # Milestones that arrived before the updates are released once they're known to be affected
+                        for timeframe in affected:
+                            if timeframe in regenerated:
+                                yield "milestone", regenerated[timeframe]
+                    elif len(path) == 2 and path[0] == "milestones":
+                        milestone = self._validated_milestone(path[1], value)
+                        if milestone is None:
+                            continue
+                        regenerated[path[1]] = milestone
+                        if updates is not None and path[1] in affected:
+                            yield "milestone", milestone
+        except Exception as e:
+            print(f"Combined cascade update failed: {e}")
+
+        fallback = updates is None
+        if fallback:
+            updates = self._fallback_user_thoughts_update(user_thoughts, context)
+            yield "updates", updates
+
+        affected = self._apply_target_update(plan, milestone_timeframe, updates)
+        missing = [timeframe for timeframe in affected if timeframe not in regenerated]
+        if fallback or missing:
+            await self._discard_response_async(request, use_cache)
+        if missing:
+            # Only milestones the combined response left out or got wrong need a second round trip
+            print(f"Combined cascade response missing {missing}; regenerating them separately")
+            updated_plan = await self.regenerate_subsequent_milestones_async(plan, milestone_timeframe, missing, use_cache)
+            for timeframe in missing:
+                regenerated[timeframe] = get_milestone(updated_plan, timeframe)
+                yield "milestone", regenerated[timeframe]
+
+        for timeframe in affected:
+            set_milestone(plan, timeframe, regenerated[timeframe])
+
+        yield "plan", plan
+
+    async def update_milestone_naturally_async(self, plan: CareerPlan, milestone_timeframe: str, user_thoughts: str, context: str = "") -> Tuple[CareerPlan, MilestoneUpdate, List[str]]:
+        """Apply the user's thoughts with a combined cascade and return (plan, updates, affected timeframes)"""
+
+        key = ("update-naturally", plan.user_id, plan.version, milestone_timeframe, user_thoughts, context)
+        return await self.flights.do(
+            key, lambda: self._update_milestone_naturally_async(plan, milestone_timeframe, user_thoughts, context)
+        )
+
+    async def _update_milestone_naturally_async(self, plan: CareerPlan, milestone_timeframe: str, user_thoughts: str, context: str) -> Tuple[CareerPlan, MilestoneUpdate, List[str]]:
+        updates = None
+        affected = []
+        async for event, payload in self.stream_update_with_cascade(plan, milestone_timeframe, user_thoughts, context):
+            if event == "updates":
+                updates = payload
+            elif event == "milestone":
+                affected.append(payload.timeframe)
+            elif event == "plan":
+                plan = payload
+        await storeUserPlanInDBAsync(plan)
+        return plan, updates, [t for t in self.milestone_order if t in affected]
+
+    def _validated_milestone(self, timeframe: str, m_data: Any) -> Optional[Milestone]:
+        """Build a milestone from LLM JSON, or None if it doesn't fit the Milestone*Detail model"""
+        if not isinstance(m_data, dict):
+            print(f"Discarding {timeframe} milestone: not a JSON object")
+            return None
+        try:
+            return build_milestone(timeframe, m_data)
+        except Exception as e:
+            print(f"Discarding invalid {timeframe} milestone: {e}")
+            return None
+
+    def _cascade_request(self, plan: CareerPlan, updated_milestone: str, subsequent_milestones: List[str]) -> Dict[str, Any]:
+        # Create context for LLM about the changes
+        updated_milestone_data = get_milestone(plan, updated_milestone)
         
         cascade_prompt = f"""
         A user has updated their {updated_milestone} milestone in their career transition plan. 
         Please regenerate the subsequent milestones to align with these changes.
 
-        ORIGINAL PLAN CONTEXT:
-        User ID: {plan.user_id}
-        Plan Overview: {plan.overview}
+        PLAN OVERVIEW:
+        {render_compact(plan.overview)}
         
         UPDATED {updated_milestone.upper()} MILESTONE:
-        Title: {updated_milestone_data.title}
-        Objectives: {', '.join(updated_milestone_data.details.key_objectives)}
-        Timeline: {updated_milestone_data.details.timeline_weeks} weeks
-        User Notes: {updated_milestone_data.details.user_notes}
-        Priority: {updated_milestone_data.details.priority_level}
+        {render_compact({
+            "title": updated_milestone_data.title,
+            "objectives": updated_milestone_data.details.key_objectives,
+            "timeline_weeks": updated_milestone_data.details.timeline_weeks,
+            "user_notes": updated_milestone_data.details.user_notes,
+            "priority": updated_milestone_data.details.priority_level
+        })}
         
         MILESTONES TO UPDATE: {', '.join(subsequent_milestones)}
         
@@ -215,45 +651,75 @@ class CascadingPlanManager:
         3. Align with the user's stated goals and constraints
         4. Keep the same overall career transition objective
         
-        Return in JSON format with the same structure as before.
+        Return a JSON object keyed by timeframe, with only these milestones:
+        {json.dumps({timeframe: milestone_schema(timeframe) for timeframe in subsequent_milestones}, separators=(",", ":"))}
         """
         
+        return self._completion_request(
+            "You are an expert career strategist updating career plans based on milestone changes.",
+            cascade_prompt,
+            max_tokens=2500,
+            operation="cascade"
+        )
+
+    def _build_cascaded_plan(self, plan: CareerPlan, result: PlanParseResult, updated_milestone: str) -> CareerPlan:
+        updated_milestones = dict(result.milestones)
+        if result.missing:
+            # Milestones still invalid after repair keep their current content, marked as cascaded
+            print(f"Cascade kept existing milestones {result.missing} after repair (errors: {result.errors})")
+            updated_milestones.update(self._minimal_cascade_milestones(plan, updated_milestone, result.missing))
+        
+        # Create updated plan object with individual milestone fields
+        return CareerPlan(
+            plan_id=plan.plan_id,
+            user_id=plan.user_id,
+            overview=plan.overview,
+            **milestone_fields(updated_milestones, plan),
+            created_date=plan.created_date,
+            last_updated=get_current_timestamp(),
+            version=plan.version + 1
+        )
+    
+    def regenerate_subsequent_milestones(self, plan: CareerPlan, updated_milestone: str, subsequent_milestones: List[str], use_cache: bool = True) -> CareerPlan:
+        """Regenerate subsequent milestones based on updated milestone"""
+        
+        request = self._cascade_request(plan, updated_milestone, subsequent_milestones)
+        
         try:
-            response = openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert career strategist updating career plans based on milestone changes."},
-                    {"role": "user", "content": cascade_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=2500
-            )
-            
-            llm_response = response.choices[0].message.content
-            
-            # Parse the response and update only the subsequent milestones
-            updated_milestones = self.parse_milestone_updates(llm_response, subsequent_milestones)
-            
-            # Create updated plan object with individual milestone fields
-            updated_plan = CareerPlan(
-                plan_id=plan.plan_id,
-                user_id=plan.user_id,
-                overview=plan.overview,
-                milestone_1=updated_milestones.get("1_month", plan.milestone_1),
-                milestone_2=updated_milestones.get("3_months", plan.milestone_2),
-                milestone_3=updated_milestones.get("1_year", plan.milestone_3),
-                milestone_4=updated_milestones.get("5_years", plan.milestone_4),
-                created_date=plan.created_date,
-                last_updated=get_current_timestamp(),
-                version=plan.version + 1
-            )
-            
-            return updated_plan
+            llm_response = self._complete(request, use_cache)
+            result = self.parse_milestone_updates(llm_response, subsequent_milestones)
+            if result.missing:
+                self._discard_response(request, use_cache)
+            self._repair_milestones(result, lambda timeframe, error: self._cascade_repair_request(plan, updated_milestone, timeframe, error))
+            return self._build_cascaded_plan(plan, result, updated_milestone)
             
         except Exception as e:
             print(f"Cascade update failed: {e}")
             # Return minimal updates if LLM fails
             return self.create_minimal_cascade_updates(plan, updated_milestone, subsequent_milestones)
+
+    async def regenerate_subsequent_milestones_async(self, plan: CareerPlan, updated_milestone: str, subsequent_milestones: List[str], use_cache: bool = True) -> CareerPlan:
+        """Regenerate subsequent milestones based on updated milestone without blocking the event loop"""
+
+        request = self._cascade_request(plan, updated_milestone, subsequent_milestones)
+        key = ("regenerate", plan.user_id, plan.version, LLMResponseCache.make_key(request), use_cache)
+        return await self.flights.do(
+            key, lambda: self._regenerate_subsequent_milestones_async(plan, request, updated_milestone, subsequent_milestones, use_cache)
+        )
+
+    async def _regenerate_subsequent_milestones_async(self, plan: CareerPlan, request: Dict[str, Any], updated_milestone: str, subsequent_milestones: List[str], use_cache: bool) -> CareerPlan:
+        try:
+            llm_response = await self._complete_async(request, use_cache)
+            result = self.parse_milestone_updates(llm_response, subsequent_milestones)
+            if result.missing:
+                await self._discard_response_async(request, use_cache)
+            await self._repair_milestones_async(result, lambda timeframe, error: self._cascade_repair_request(plan, updated_milestone, timeframe, error))
+            return self._build_cascaded_plan(plan, result, updated_milestone)
+
+        except Exception as e:
+            print(f"Cascade update failed: {e}")
+            # Return minimal updates if LLM fails
+            return self.create_minimal_cascade_updates(plan, updated_milestone, subsequent_milestones)
     
     def apply_milestone_updates(self, milestone: Milestone, updates: MilestoneUpdate):
         """Apply user updates to a milestone"""
@@ -282,228 +748,156 @@ class CascadingPlanManager:
         milestone.details.last_updated = datetime.now().isoformat()
     
 
+    def _repair_note(self, timeframe: str, error: Optional[str]) -> str:
+        problem = f"was invalid ({error})" if error else "was missing"
+        return f"The {timeframe} milestone in the previous response {problem}. Return only that milestone as one JSON object."
+
+    def _plan_repair_request(self, user_profile: UserProfile, overview: Optional[Dict[str, Any]], timeframe: str, error: Optional[str]) -> Dict[str, Any]:
+        return self._completion_request(
+            PLAN_STRATEGIST_PROMPT,
+            f"{create_milestone_prompt(user_profile, overview or {}, timeframe)}\n{self._repair_note(timeframe, error)}",
+            max_tokens=MILESTONE_MAX_TOKENS,
+            operation="repair_milestone"
+        )
+
+    def _cascade_repair_request(self, plan: CareerPlan, updated_milestone: str, timeframe: str, error: Optional[str]) -> Dict[str, Any]:
+        updated = get_milestone(plan, updated_milestone)
+        repair_prompt = f"""
+        A user has updated their {updated_milestone} milestone. Regenerate the {timeframe} milestone so it builds on the change.
+
+        PLAN OVERVIEW:
+        {render_compact(plan.overview)}
+
+        UPDATED {updated_milestone.upper()} MILESTONE:
+        {render_compact({"title": updated.title, "objectives": updated.details.key_objectives, "timeline_weeks": updated.details.timeline_weeks, "user_notes": updated.details.user_notes})}
+
+        {self._repair_note(timeframe, error)}
+        {json.dumps(milestone_schema(timeframe), separators=(",", ":"))}
+        """
+        return self._completion_request(
+            "You are an expert career strategist updating career plans based on milestone changes.",
+            repair_prompt,
+            max_tokens=MILESTONE_MAX_TOKENS,
+            operation="repair_milestone"
+        )
+
+    def _repair_plan(self, result: PlanParseResult, user_profile: UserProfile) -> PlanParseResult:
+        # Without an overview there is nothing to build the milestones on, so the plan fails as a whole
+        if result.overview is None:
+            return result
+        return self._repair_milestones(result, lambda timeframe, error: self._plan_repair_request(user_profile, result.overview, timeframe, error))
+
+    async def _repair_plan_async(self, result: PlanParseResult, user_profile: UserProfile) -> PlanParseResult:
+        if result.overview is None:
+            return result
+        return await self._repair_milestones_async(result, lambda timeframe, error: self._plan_repair_request(user_profile, result.overview, timeframe, error))
+
+    def _repair_response(self, result: PlanParseResult, timeframe: str, response: Any):
+        if isinstance(response, Exception):
+            result.errors[timeframe] = str(response)
+            return
+        m_data = extract_json_object(response)
+        # Accept the milestone on its own or still keyed by its timeframe
+        if isinstance(m_data, dict) and isinstance(m_data.get(timeframe), dict):
+            m_data = m_data[timeframe]
+        result.add(timeframe, m_data)
+
+    def _repair_milestones(self, result: PlanParseResult, repair_request: Callable[[str, Optional[str]], Dict[str, Any]]) -> PlanParseResult:
+        """Re-request only the missing or invalid milestones, up to repair_attempts rounds"""
+        for attempt in range(self.repair_attempts):
+            missing = result.missing
+            if not missing:
+                break
+            print(f"Repairing milestones {missing} (attempt {attempt + 1} of {self.repair_attempts})")
+            for timeframe in missing:
+                try:
+                    response = self._complete(repair_request(timeframe, result.errors.get(timeframe)), use_cache=False)
+                except Exception as e:
+                    response = e
+                self._repair_response(result, timeframe, response)
+        return result
+
+    async def _repair_milestones_async(self, result: PlanParseResult, repair_request: Callable[[str, Optional[str]], Dict[str, Any]]) -> PlanParseResult:
+        """Re-request only the missing or invalid milestones concurrently, up to repair_attempts rounds"""
+        for attempt in range(self.repair_attempts):
+            missing = result.missing
+            if not missing:
+                break
+            print(f"Repairing milestones {missing} (attempt {attempt + 1} of {self.repair_attempts})")
+            # Repairs skip the cache so a retry can't be answered with the response that failed
+            responses = await asyncio.gather(
+                *(self._complete_async(repair_request(timeframe, result.errors.get(timeframe)), use_cache=False) for timeframe in missing),
+                return_exceptions=True
+            )
+            for timeframe, response in zip(missing, responses):
+                self._repair_response(result, timeframe, response)
+        return result
+
+    def plan_from_parse_result(self, result: PlanParseResult, user_profile: UserProfile) -> CareerPlan:
+        """Assemble a career plan from the overview and milestones recovered from the LLM response"""
+        
+        if result.overview is None and not result.milestones:
+            raise ValueError("No JSON found in response")
+        
+        if result.missing:
+            print(f"Plan response missing milestones {result.missing} (truncated: {result.truncated}, errors: {result.errors})")
+        
+        # Create career plan
+        # Generate plan ID with current timestamp
+        timestamp_str = get_current_timestamp().replace(':', '').replace('-', '').replace('T', '_').split('.')[0]
+        plan_id = f"plan_{user_profile.username}_{timestamp_str}"
+        
+        plan = CareerPlan(
+            plan_id=plan_id,
+            user_id=user_profile.username,
+            overview=result.overview or {},
+            **milestone_fields(result.milestones),
+            created_date=get_current_timestamp(),
+            last_updated=get_current_timestamp()
+        )
+        
+        # Plan will be stored in database by the calling function
+        
+        return plan
+
     def parse_comprehensive_plan(self, llm_response: str, user_profile: UserProfile) -> CareerPlan:
-        """Parse LLM response into comprehensive career plan"""
+        """Parse LLM response into comprehensive career plan, keeping complete milestones from a truncated response"""
         
         try:
-            # Extract JSON from response
-            start_idx = llm_response.find('{')
-            end_idx = llm_response.rfind('}') + 1
-            
-            if start_idx == -1 or end_idx == 0:
-                raise ValueError("No JSON found in response")
-            
-            json_str = llm_response[start_idx:end_idx]
-            parsed_data = json.loads(json_str)
-            
-            # Create individual milestone objects
-            milestone_1 = None
-            milestone_2 = None
-            milestone_3 = None
-            milestone_4 = None
-        
-            for timeframe in self.milestone_order:
-                if timeframe in parsed_data.get('milestones', {}):
-                    m_data = parsed_data['milestones'][timeframe]
-                    details_data = m_data.get('details', {})
-                    
-                    # Create the appropriate milestone detail type based on timeframe
-                    if timeframe == "1_month":
-                        milestone_detail = Milestone1Detail(
-                            title=m_data.get('title', f'{timeframe} milestone'),
-                            description=m_data.get('overview', ''),
-                            timeline_weeks=details_data.get('timeline_weeks', 4),
-                            key_objectives=details_data.get('key_objectives', []),
-                            success_metrics=details_data.get('success_metrics', []),
-                            recommended_actions=details_data.get('recommended_actions', []),
-                            resources=details_data.get('resources', []),
-                            potential_challenges=details_data.get('potential_challenges', []),
-                            dependencies=details_data.get('dependencies', []),
-                            budget_estimate=details_data.get('budget_estimate', 0.0),
-                            exa_research_topics=details_data.get('exa_research_topics', []),
-                            last_updated=get_current_timestamp(),
-                            # milestone 1 specific fields
-                            daily_tasks=details_data.get('daily_tasks', []),
-                            weekly_goals=details_data.get('weekly_goals', []),
-                            skill_focus=details_data.get('skill_focus', []),
-                            networking_targets=details_data.get('networking_targets', []),
-                            immediate_tools=details_data.get('immediate_tools', [])
-                        )
-                        milestone_1 = Milestone1(
-                            milestone_id=f"{timeframe}_{get_current_timestamp().split('T')[0].replace('-', '')}",
-                            title=m_data.get('title', f'{timeframe} milestone'),
-                            overview=m_data.get('overview', ''),
-                            details=milestone_detail
-                        )
-                    elif timeframe == "3_months":
-                        milestone_detail = Milestone2Detail(
-                            title=m_data.get('title', f'{timeframe} milestone'),
-                            description=m_data.get('overview', ''),
-                            timeline_weeks=details_data.get('timeline_weeks', 12),
-                            key_objectives=details_data.get('key_objectives', []),
-                            success_metrics=details_data.get('success_metrics', []),
-                            recommended_actions=details_data.get('recommended_actions', []),
-                            resources=details_data.get('resources', []),
-                            potential_challenges=details_data.get('potential_challenges', []),
-                            dependencies=details_data.get('dependencies', []),
-                            budget_estimate=details_data.get('budget_estimate', 0.0),
-                            exa_research_topics=details_data.get('exa_research_topics', []),
-                            last_updated=get_current_timestamp(),
-                            # milestone 2 specific fields
-                            projects_to_complete=details_data.get('projects_to_complete', []),
-                            certifications_target=details_data.get('certifications_target', []),
-                            portfolio_items=details_data.get('portfolio_items', []),
-                            industry_research=details_data.get('industry_research', []),
-                            mentor_connections=details_data.get('mentor_connections', [])
-                        )
-                        milestone_2 = Milestone2(
-                            milestone_id=f"{timeframe}_{get_current_timestamp().split('T')[0].replace('-', '')}",
-                            title=m_data.get('title', f'{timeframe} milestone'),
-                            overview=m_data.get('overview', ''),
-                            details=milestone_detail
-                        )
-                    elif timeframe == "1_year":
-                        milestone_detail = Milestone3Detail(
-                            title=m_data.get('title', f'{timeframe} milestone'),
-                            description=m_data.get('overview', ''),
-                            timeline_weeks=details_data.get('timeline_weeks', 52),
-                            key_objectives=details_data.get('key_objectives', []),
-                            success_metrics=details_data.get('success_metrics', []),
-                            recommended_actions=details_data.get('recommended_actions', []),
-                            resources=details_data.get('resources', []),
-                            potential_challenges=details_data.get('potential_challenges', []),
-                            dependencies=details_data.get('dependencies', []),
-                            budget_estimate=details_data.get('budget_estimate', 0.0),
-                            exa_research_topics=details_data.get('exa_research_topics', []),
-                            last_updated=get_current_timestamp(),
-                            # milestone 3 specific fields
-                            career_targets=details_data.get('career_targets', []),
-                            salary_expectations=details_data.get('salary_expectations', {}),
-                            professional_network=details_data.get('professional_network', []),
-                            leadership_opportunities=details_data.get('leadership_opportunities', []),
-                            market_positioning=details_data.get('market_positioning', [])
-                        )
-                        milestone_3 = Milestone3(
-                            milestone_id=f"{timeframe}_{get_current_timestamp().split('T')[0].replace('-', '')}",
-                            title=m_data.get('title', f'{timeframe} milestone'),
-                            overview=m_data.get('overview', ''),
-                            details=milestone_detail
-                        )
-                    elif timeframe == "5_years":
-                        milestone_detail = Milestone4Detail(
-                            title=m_data.get('title', f'{timeframe} milestone'),
-                            description=m_data.get('overview', ''),
-                            timeline_weeks=details_data.get('timeline_weeks', 260),
-                            key_objectives=details_data.get('key_objectives', []),
-                            success_metrics=details_data.get('success_metrics', []),
-                            recommended_actions=details_data.get('recommended_actions', []),
-                            resources=details_data.get('resources', []),
-                            potential_challenges=details_data.get('potential_challenges', []),
-                            dependencies=details_data.get('dependencies', []),
-                            budget_estimate=details_data.get('budget_estimate', 0.0),
-                            exa_research_topics=details_data.get('exa_research_topics', []),
-                            last_updated=get_current_timestamp(),
-                            # milestone 4 specific fields
-                            vision_statement=details_data.get('vision_statement', ''),
-                            financial_goals=details_data.get('financial_goals', {}),
-                            industry_impact=details_data.get('industry_impact', []),
-                            mentorship_goals=details_data.get('mentorship_goals', []),
-                            exit_strategies=details_data.get('exit_strategies', []),
-                            legacy_projects=details_data.get('legacy_projects', [])
-                        )
-                        milestone_4 = Milestone4(
-                            milestone_id=f"{timeframe}_{get_current_timestamp().split('T')[0].replace('-', '')}",
-                            title=m_data.get('title', f'{timeframe} milestone'),
-                            overview=m_data.get('overview', ''),
-                            details=milestone_detail
-                        )
-            
-            # Create career plan
-            # Generate plan ID with current timestamp
-            timestamp_str = get_current_timestamp().replace(':', '').replace('-', '').replace('T', '_').split('.')[0]
-            plan_id = f"plan_{user_profile.username}_{timestamp_str}"
-            
-            plan = CareerPlan(
-                plan_id=plan_id,
-                user_id=user_profile.username,
-                overview=parsed_data.get('overview', {}),
-                milestone_1=milestone_1,
-                milestone_2=milestone_2,
-                milestone_3=milestone_3,
-                milestone_4=milestone_4,
-                created_date=get_current_timestamp(),
-                last_updated=get_current_timestamp()
-            )
-            
-            # Plan will be stored in database by the calling function
-            
-            return plan
+            result = parse_plan_response(llm_response, self.milestone_order)
+            return self.plan_from_parse_result(result, user_profile)
             
         except Exception as e:
             raise Exception(f"Failed to parse comprehensive plan: {e}")
     
-    def parse_milestone_updates(self, llm_response: str, milestone_timeframes: List[str]) -> Dict[str, Milestone]:
-        """Parse LLM response for milestone updates"""
-        
-        # Simplified parsing for milestone updates
-        # In production, this would be more robust
-        updated_milestones = {}
-        
-        for timeframe in milestone_timeframes:
-            # Create basic updated milestone
-            milestone_detail = MilestoneDetail(
-                title=f"Updated {timeframe} milestone",
-                description=f"Updated milestone for {timeframe}",
-                timeline_weeks=4,
-                key_objectives=[f"Updated objective for {timeframe}"],
-                success_metrics=[f"Updated metric for {timeframe}"],
-                recommended_actions=[f"Updated action for {timeframe}"],
-                resources=[],
-                potential_challenges=[],
-                last_updated=datetime.now().isoformat()
-            )
-            
-            milestone = Milestone(
-                milestone_id=f"{timeframe}_{datetime.now().strftime('%Y%m%d')}",
-                timeframe=timeframe,
-                title=f"Updated {timeframe} milestone",
-                overview=f"Updated overview for {timeframe}",
-                details=milestone_detail
-            )
-            
-            updated_milestones[timeframe] = milestone
-        
-        return updated_milestones
+    def parse_milestone_updates(self, llm_response: str, milestone_timeframes: List[str]) -> PlanParseResult:
+        """Parse LLM response for milestone updates, validating each milestone on its own"""
+        return parse_milestones_response(llm_response, milestone_timeframes)
     
     def create_minimal_cascade_updates(self, plan: CareerPlan, updated_milestone: str, subsequent_milestones: List[str]) -> CareerPlan:
         """Create minimal updates for cascade if LLM fails"""
         
-        updated_milestones = {}
-        
-        milestone_field_map = {
-            "1_month": plan.milestone_1,
-            "3_months": plan.milestone_2,
-            "1_year": plan.milestone_3,
-            "5_years": plan.milestone_4
-        }
-        
-        for timeframe in subsequent_milestones:
-            if timeframe in milestone_field_map and milestone_field_map[timeframe]:
-                existing = milestone_field_map[timeframe]
-                # Mark as updated due to cascade
-                existing.details.last_updated = datetime.now().isoformat()
-                existing.details.dependencies.append(f"Updated due to {updated_milestone} changes")
-                updated_milestones[timeframe] = existing
+        updated_milestones = self._minimal_cascade_milestones(plan, updated_milestone, subsequent_milestones)
         
         return CareerPlan(
             plan_id=plan.plan_id,
             user_id=plan.user_id,
             overview=plan.overview,
-            milestone_1=updated_milestones.get("1_month", plan.milestone_1),
-            milestone_2=updated_milestones.get("3_months", plan.milestone_2),
-            milestone_3=updated_milestones.get("1_year", plan.milestone_3),
-            milestone_4=updated_milestones.get("5_years", plan.milestone_4),
+            **milestone_fields(updated_milestones, plan),
             created_date=plan.created_date,
             last_updated=datetime.now().isoformat(),
             version=plan.version + 1
         )
+
+    def _minimal_cascade_milestones(self, plan: CareerPlan, updated_milestone: str, subsequent_milestones: List[str]) -> Dict[str, Milestone]:
+        updated_milestones = {}
+        
+        for timeframe in subsequent_milestones:
+            if timeframe in self.milestone_order and get_milestone(plan, timeframe):
+                existing = get_milestone(plan, timeframe).model_copy(deep=True)
+                # Mark as updated due to cascade
+                existing.details.last_updated = datetime.now().isoformat()
+                existing.details.dependencies.append(f"Updated due to {updated_milestone} changes")
+                updated_milestones[timeframe] = existing
+        
+        return updated_milestones
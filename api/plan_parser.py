@@ -0,0 +1,109 @@
+from typing import Dict, List, Any, Optional, Tuple
+from models.milestone import *
+from utils.json_stream_utils import IncrementalJSONScanner
+from milestone_registry import MILESTONE_REGISTRY, MILESTONE_TIMEFRAMES
+
+
+def build_milestone(timeframe: str, m_data: Dict[str, Any]) -> Optional[Milestone]:
+    """Build the typed milestone for a timeframe from its LLM JSON"""
+    spec = MILESTONE_REGISTRY.get(timeframe)
+    return spec.build(m_data) if spec else None
+
+
+class PlanParseResult:
+    """Overview and typed milestones recovered from an LLM plan response"""
+
+    def __init__(self, timeframes: List[str]):
+        self.timeframes = timeframes
+        self.overview: Optional[Dict[str, Any]] = None
+        self.milestones: Dict[str, Milestone] = {}
+        self.errors: Dict[str, str] = {}
+        self.truncated = False
+
+    @property
+    def missing(self) -> List[str]:
+        """Timeframes with no valid milestone, in plan order"""
+        return [timeframe for timeframe in self.timeframes if timeframe not in self.milestones]
+
+    @property
+    def complete(self) -> bool:
+        return self.overview is not None and not self.missing
+
+    def add(self, timeframe: str, m_data: Any) -> Optional[Milestone]:
+        """Validate one milestone's JSON, keeping it if valid and recording the error if not"""
+        if not isinstance(m_data, dict):
+            self.errors[timeframe] = "milestone is not a JSON object"
+            return None
+        try:
+            milestone = build_milestone(timeframe, m_data)
+        except Exception as e:
+            self.errors[timeframe] = str(e)
+            return None
+        if milestone:
+            self.milestones[timeframe] = milestone
+            self.errors.pop(timeframe, None)
+        return milestone
+
+
+class StreamingPlanParser:
+    """
+    Incrementally parses a streamed plan response of the form
+    {"overview": {...}, "milestones": {"1_month": {...}, ...}}.
+
+    Each milestone is validated into its typed Milestone class as soon as its
+    JSON closes. Prose around the JSON is ignored, and if the stream is cut
+    short the milestones that did complete are kept.
+    """
+
+    def __init__(self, timeframes: Optional[List[str]] = None):
+        self.result = PlanParseResult(timeframes or MILESTONE_TIMEFRAMES)
+        self.scanner = IncrementalJSONScanner(
+            watch_paths=[("overview",)] + [("milestones", timeframe) for timeframe in self.result.timeframes]
+        )
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Add a chunk of the response.
+
+        Returns:
+            ("overview", dict) and ("milestone", Milestone) events completed by this chunk
+        """
+        events = []
+        for path, value in self.scanner.feed(chunk):
+            if path == ("overview",):
+                self.result.overview = value
+                events.append(("overview", value))
+            elif len(path) == 2:
+                milestone = self.result.add(path[1], value)
+                if milestone:
+                    events.append(("milestone", milestone))
+        return events
+
+    def finish(self) -> PlanParseResult:
+        """Return everything parsed so far, marking the result truncated if the JSON never closed"""
+        self.result.truncated = not self.scanner.done
+        return self.result
+
+
+def parse_plan_response(llm_response: str, timeframes: Optional[List[str]] = None) -> PlanParseResult:
+    """Parse a complete (or truncated) plan response in one go"""
+    parser = StreamingPlanParser(timeframes)
+    parser.feed(llm_response)
+    return parser.finish()
+
+
+def parse_milestones_response(llm_response: str, timeframes: List[str]) -> PlanParseResult:
+    """
+    Parse a response of milestones keyed by timeframe, at the top level or under "milestones".
+
+    Each milestone is validated on its own, so one malformed milestone doesn't discard the others.
+    """
+    result = PlanParseResult(timeframes)
+    scanner = IncrementalJSONScanner(
+        watch_paths=[(timeframe,) for timeframe in timeframes] + [("milestones", timeframe) for timeframe in timeframes]
+    )
+    for path, value in scanner.feed(llm_response):
+        if len(path) in (1, 2) and path[-1] in timeframes:
+            result.add(path[-1], value)
+    result.truncated = not scanner.done
+    return result
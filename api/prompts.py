@@ -1,103 +1,159 @@
-
+import json
+from typing import Any, Dict
 from models.user import UserProfile
 
+# Profile answers sent to the model, with the labels they are rendered under.
+# Username and timestamps carry no planning signal and are left out.
+PROFILE_PROMPT_FIELDS = {
+    "interests_values": "Interests and values",
+    "work_experience": "Work experience",
+    "circumstances": "Circumstances",
+    "skills": "Skills",
+    "goals": "Goals"
+}
+
+OVERVIEW_SCHEMA = {
+    "summary": "2-3 sentence summary based on user's specific goals",
+    "key_focus_areas": ["area1", "area2", "area3"],
+    "estimated_timeline": "Timeline based on user's goals",
+    "success_probability": "Assessment with reasoning",
+    "market_outlook": "Market analysis for user's target area",
+    "salary_projection": {"entry": "range", "mid": "range", "senior": "range"},
+    "critical_skills_gap": ["skill1", "skill2", "skill3"]
+}
+
+# Per-timeframe skeleton values filled into the milestone schema
+MILESTONE_PROMPT_SKELETONS = {
+    "1_month": {"title": "Foundation Phase", "overview": "What to accomplish in month 1", "timeline_weeks": 4, "resource_type": "course", "dependencies": [], "budget_estimate": 0.0},
+    "3_months": {"title": "Development Phase", "overview": "Goals for months 1-3", "timeline_weeks": 12, "resource_type": "certification", "dependencies": ["Complete 1_month foundation"], "budget_estimate": 200.0},
+    "1_year": {"title": "Implementation Phase", "overview": "Year one objectives", "timeline_weeks": 52, "resource_type": "experience", "dependencies": ["Complete 3_months development"], "budget_estimate": 500.0},
+    "5_years": {"title": "Mastery Phase", "overview": "Long-term goals", "timeline_weeks": 260, "resource_type": "leadership", "dependencies": ["Complete 1_year implementation"], "budget_estimate": 1000.0},
+}
+
+
+def strip_empty(value: Any) -> Any:
+    """Recursively drop None, empty strings and empty collections from dicts and lists"""
+    if isinstance(value, dict):
+        stripped = {key: strip_empty(item) for key, item in value.items()}
+        return {key: item for key, item in stripped.items() if item not in (None, "", [], {})}
+    if isinstance(value, list):
+        stripped = [strip_empty(item) for item in value]
+        return [item for item in stripped if item not in (None, "", [], {})]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def render_compact(data: Any) -> str:
+    """Render plan context as minified JSON with empty fields stripped"""
+    return json.dumps(strip_empty(data), separators=(",", ":"), ensure_ascii=False)
+
+
+def render_profile(user_profile: UserProfile) -> str:
+    """Render the profile answers one per line, skipping unanswered questions"""
+    lines = []
+    for field, label in PROFILE_PROMPT_FIELDS.items():
+        answer = " ".join((getattr(user_profile, field, "") or "").split())
+        if answer:
+            lines.append(f"{label}: {answer}")
+    return "\n".join(lines)
+
+
+def compact_prompt(text: str) -> str:
+    """Strip the source indentation and blank lines that f-string prompts carry"""
+    return "\n".join(line.strip() for line in text.strip().splitlines() if line.strip())
+
+
+def milestone_schema(timeframe: str) -> Dict[str, Any]:
+    """JSON skeleton of one milestone, filled with the timeframe's defaults"""
+    skeleton = MILESTONE_PROMPT_SKELETONS[timeframe]
+    return {
+        "title": skeleton["title"],
+        "overview": skeleton["overview"],
+        "details": {
+            "timeline_weeks": skeleton["timeline_weeks"],
+            "key_objectives": ["objective1", "objective2", "objective3"],
+            "success_metrics": ["metric1", "metric2"],
+            "recommended_actions": ["action1", "action2"],
+            "resources": [{"name": "resource", "url": "url", "type": skeleton["resource_type"]}],
+            "potential_challenges": ["challenge1", "challenge2"],
+            "dependencies": skeleton["dependencies"],
+            "budget_estimate": skeleton["budget_estimate"],
+            "exa_research_topics": ["topic1", "topic2"]
+        }
+    }
+
+
 def create_career_plan_prompt(user_profile: UserProfile) -> str:
     """
     Combines introspection and career plan generation into a single prompt.
     Takes a UserProfile and returns a string prompt for the LLM.
     """
+    milestone_defaults = "\n".join(
+        f"- {timeframe}: " + render_compact({key: skeleton[key] for key in ("title", "timeline_weeks", "resource_type", "dependencies", "budget_estimate")})
+        for timeframe, skeleton in MILESTONE_PROMPT_SKELETONS.items()
+    )
+    schema = json.dumps(
+        {"overview": OVERVIEW_SCHEMA, "milestones": {timeframe: "MILESTONE" for timeframe in MILESTONE_PROMPT_SKELETONS}},
+        separators=(",", ":")
+    )
     return f"""
-    Carefully analyze the following user's profile, which consists of a list of questions and their corresponding answers. For each question and answer pair, generate actionable insights that will help inform and improve the user's career trajectory and predictions. Focus on identifying strengths, potential challenges, and opportunities relevant to career planning based on the user's responses.
+    Analyze the user's profile below. For each answer, consider the strengths, challenges and opportunities it implies for their career direction, adaptability and success.
 
-    USER PROFILE (Questions and Answers):
-    {user_profile}
+    USER PROFILE:
+    {render_profile(user_profile)}
 
-    For each of the following categories, return a 2-3 sentence insight that will help guide career prediction and planning. Focus on how each aspect may impact the user's future career direction, adaptability, and success:
-    - interests_values
-    - work_experience
-    - circumstances
-    - skills
-    - goals
+    Based on that introspection, create a realistic career plan with specific, actionable milestones, based ONLY on what the user wants (their goals and interests).
 
-    Now, based on your introspection above, create a comprehensive career plan for this user with specific, actionable milestones.
+    RESPOND WITH THIS EXACT JSON STRUCTURE:
+    {schema}
+
+    Each MILESTONE is:
+    {json.dumps(milestone_schema("1_month"), separators=(",", ":"))}
 
-    Create a realistic career plan based ONLY on what the user wants (their goals and interests).
+    Milestone defaults (title, timeline_weeks, resource type, dependencies, budget_estimate):
+    {milestone_defaults}
+
+    Base everything on the user's stated goals and interests. Be specific and actionable.
+    """
+
+
+def create_plan_overview_prompt(user_profile: UserProfile) -> str:
+    """
+    First stage of fan-out plan generation: introspect on the profile and
+    produce only the plan overview that every milestone prompt builds on.
+    """
+    return f"""
+    Analyze the user's profile below. Identify strengths, potential challenges, and opportunities relevant to career planning.
+
+    USER PROFILE:
+    {render_profile(user_profile)}
+
+    Based on this analysis, write the overview of a realistic career plan based ONLY on what the user wants (their goals and interests).
 
     RESPOND WITH THIS EXACT JSON STRUCTURE:
+    {json.dumps(OVERVIEW_SCHEMA, separators=(",", ":"))}
+    """
 
-    {{
-        "overview": {{
-            "summary": "2-3 sentence summary based on user's specific goals",
-            "key_focus_areas": ["area1", "area2", "area3"],
-            "estimated_timeline": "Timeline based on user's goals",
-            "success_probability": "Assessment with reasoning",
-            "market_outlook": "Market analysis for user's target area",
-            "salary_projection": {{"entry": "range", "mid": "range", "senior": "range"}},
-            "critical_skills_gap": ["skill1", "skill2", "skill3"]
-        }},
-        "milestones": {{
-            "1_month": {{
-                "title": "Foundation Phase",
-                "overview": "What to accomplish in month 1",
-                "details": {{
-                    "timeline_weeks": 4,
-                    "key_objectives": ["objective1", "objective2", "objective3"],
-                    "success_metrics": ["metric1", "metric2"],
-                    "recommended_actions": ["action1", "action2"],
-                    "resources": [{{"name": "resource", "url": "url", "type": "course"}}],
-                    "potential_challenges": ["challenge1", "challenge2"],
-                    "dependencies": [],
-                    "budget_estimate": 0.0,
-                    "exa_research_topics": ["topic1", "topic2"]
-                }}
-            }},
-            "3_months": {{
-                "title": "Development Phase",
-                "overview": "Goals for months 1-3",
-                "details": {{
-                    "timeline_weeks": 12,
-                    "key_objectives": ["objective1", "objective2"],
-                    "success_metrics": ["metric1", "metric2"],
-                    "recommended_actions": ["action1", "action2"],
-                    "resources": [{{"name": "resource", "url": "url", "type": "certification"}}],
-                    "potential_challenges": ["challenge1", "challenge2"],
-                    "dependencies": ["Complete 1_month foundation"],
-                    "budget_estimate": 200.0,
-                    "exa_research_topics": ["topic1", "topic2"]
-                }}
-            }},
-            "1_year": {{
-                "title": "Implementation Phase",
-                "overview": "Year one objectives",
-                "details": {{
-                    "timeline_weeks": 52,
-                    "key_objectives": ["objective1", "objective2"],
-                    "success_metrics": ["metric1", "metric2"],
-                    "recommended_actions": ["action1", "action2"],
-                    "resources": [{{"name": "resource", "url": "url", "type": "experience"}}],
-                    "potential_challenges": ["challenge1", "challenge2"],
-                    "dependencies": ["Complete 3_months development"],
-                    "budget_estimate": 500.0,
-                    "exa_research_topics": ["topic1", "topic2"]
-                }}
-            }},
-            "5_years": {{
-                "title": "Mastery Phase",
-                "overview": "Long-term goals",
-                "details": {{
-                    "timeline_weeks": 260,
-                    "key_objectives": ["objective1", "objective2"],
-                    "success_metrics": ["metric1", "metric2"],
-                    "recommended_actions": ["action1", "action2"],
-                    "resources": [{{"name": "resource", "url": "url", "type": "leadership"}}],
-                    "potential_challenges": ["challenge1", "challenge2"],
-                    "dependencies": ["Complete 1_year implementation"],
-                    "budget_estimate": 1000.0,
-                    "exa_research_topics": ["topic1", "topic2"]
-                }}
-            }}
-        }}
-    }}
+
+def create_milestone_prompt(user_profile: UserProfile, overview: dict, timeframe: str) -> str:
+    """
+    Second stage of fan-out plan generation: produce a single milestone for
+    the given timeframe from the shared profile and plan overview.
+    """
+    return f"""
+    You are writing one milestone of a career plan. The other milestones are being written in parallel from the same overview, so keep this one consistent with the timeline it describes.
+
+    USER PROFILE:
+    {render_profile(user_profile)}
+
+    PLAN OVERVIEW:
+    {render_compact(overview)}
+
+    Create the {timeframe} milestone with specific, actionable steps that build on the earlier milestones implied by the overview.
+
+    RESPOND WITH THIS EXACT JSON STRUCTURE:
+    {json.dumps(milestone_schema(timeframe), separators=(",", ":"))}
 
     Base everything on the user's stated goals and interests. Be specific and actionable.
     """
@@ -0,0 +1,25 @@
+import httpx
+from db_pool import SupabasePool
+from fakes import create_fake_app, FakeLLMConfig, InMemoryTables
+from milestone_registry import milestone_fields
+from plan_parser import build_milestone
+from models import CareerPlan
+
+
+def make_plan(username="user0", version=1, last_updated="2024-01-01T00:00:00+00:00", milestones=None):
+    """A plan for username; milestones maps timeframes to the LLM JSON each is built from"""
+    return CareerPlan(
+        plan_id=f"plan_{username}",
+        user_id=username,
+        overview={"summary": "Plan"},
+        created_date="2024-01-01T00:00:00+00:00",
+        last_updated=last_updated,
+        version=version,
+        **milestone_fields({timeframe: build_milestone(timeframe, data) for timeframe, data in (milestones or {}).items()})
+    )
+
+
+def make_pool(tables=None, **kwargs):
+    """A connection pool talking to the fake Supabase in process"""
+    app = create_fake_app(FakeLLMConfig(), tables or InMemoryTables())
+    return SupabasePool("http://testserver", "key", transport=httpx.ASGITransport(app=app), **kwargs)
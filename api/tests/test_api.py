@@ -173,12 +173,14 @@ class TestAPIEndpoints:
         assert "{username}" in endpoints["1_year"]
         assert "{username}" in endpoints["5_years"]
     
-    @patch('api.getUserInformationFromDB')
-    @patch('api.manager.generate_initial_plan')
-    @patch('api.storeUserPlanInDB')
-    def test_generate_plan_success(self, mock_store, mock_generate, mock_get_user):
+    @patch('api.getPlanFreshnessFromDBAsync')
+    @patch('api.getUserInformationFromDBAsync')
+    @patch('api.manager.generate_initial_plan_async')
+    @patch('api.storeUserPlanInDBAsync')
+    def test_generate_plan_success(self, mock_store, mock_generate, mock_get_user, mock_freshness):
         """Test successful plan generation"""
         # Setup mocks
+        mock_freshness.return_value = (None, "2024-01-01T00:00:00")
         mock_get_user.return_value = self.test_user_profile
         mock_generate.return_value = self.mock_plan
         mock_store.return_value = None
@@ -198,9 +200,12 @@ class TestAPIEndpoints:
         mock_generate.assert_called_once_with(self.test_user_profile)
         mock_store.assert_called_once()
     
-    @patch('api.getUserPlanFromDB')
-    def test_generate_plan_existing_plan(self, mock_get_plan):
+    @patch('api.getPlanFreshnessFromDBAsync')
+    @patch('api.getUserInformationFromDBAsync')
+    @patch('api.getUserPlanFromDBAsync')
+    def test_generate_plan_existing_plan(self, mock_get_plan, mock_get_user, mock_freshness):
         """Test plan generation when plan already exists"""
+        mock_freshness.return_value = ("2024-02-01T00:00:00", "2024-01-01T00:00:00")
         mock_get_plan.return_value = self.mock_plan
         
         response = client.post(f"/api/v3/generate-plan/{self.test_username}")
@@ -209,17 +214,37 @@ class TestAPIEndpoints:
         data = response.json()
         assert data["user_id"] == self.test_username
         mock_get_plan.assert_called_once_with(self.test_username)
+        # The profile is only needed to regenerate
+        mock_get_user.assert_not_called()
     
-    @patch('api.getUserInformationFromDB')
-    def test_generate_plan_user_not_found(self, mock_get_user):
+    @patch('api.getPlanFreshnessFromDBAsync')
+    @patch('api.getUserInformationFromDBAsync')
+    @patch('api.manager.generate_initial_plan_async')
+    @patch('api.storeUserPlanInDBAsync')
+    @patch('api.getUserPlanFromDBAsync')
+    def test_generate_plan_stale_plan_is_not_loaded(self, mock_get_plan, mock_store, mock_generate, mock_get_user, mock_freshness):
+        """Test that a plan older than the profile is regenerated without being loaded"""
+        mock_freshness.return_value = ("2024-01-01T00:00:00", "2024-02-01T00:00:00")
+        mock_get_user.return_value = self.test_user_profile
+        mock_generate.return_value = self.mock_plan
+        
+        response = client.post(f"/api/v3/generate-plan/{self.test_username}")
+        assert response.status_code == 200
+        mock_get_plan.assert_not_called()
+        mock_generate.assert_called_once_with(self.test_user_profile)
+    
+    @patch('api.getPlanFreshnessFromDBAsync')
+    @patch('api.getUserInformationFromDBAsync')
+    def test_generate_plan_user_not_found(self, mock_get_user, mock_freshness):
         """Test plan generation when user doesn't exist"""
+        mock_freshness.return_value = (None, None)
         mock_get_user.return_value = None
         
         response = client.post(f"/api/v3/generate-plan/{self.test_username}")
         assert response.status_code == 404
         assert "not found" in response.json()["detail"].lower()
     
-    @patch('api.getUserPlanFromDB')
+    @patch('api.getUserPlanFromDBAsync')
     def test_get_plan_success(self, mock_get_plan):
         """Test successful plan retrieval"""
         mock_get_plan.return_value = self.mock_plan
@@ -232,7 +257,7 @@ class TestAPIEndpoints:
         assert "milestone_1" in data
         mock_get_plan.assert_called_once_with(self.test_username)
     
-    @patch('api.getUserPlanFromDB')
+    @patch('api.getUserPlanFromDBAsync')
     def test_get_plan_not_found(self, mock_get_plan):
         """Test plan retrieval when plan doesn't exist"""
         mock_get_plan.return_value = None
@@ -241,10 +266,10 @@ class TestAPIEndpoints:
         assert response.status_code == 404
         assert "not found" in response.json()["detail"].lower()
     
-    @patch('api.getUserPlanFromDB')
-    def test_get_milestone_1_success(self, mock_get_plan):
+    @patch('api.getUserMilestoneFromDBAsync')
+    def test_get_milestone_1_success(self, mock_get_milestone):
         """Test successful milestone 1 retrieval"""
-        mock_get_plan.return_value = self.mock_plan
+        mock_get_milestone.return_value = (True, self.mock_plan.milestone_1, self.mock_plan.last_updated)
         
         response = client.get(f"/api/v3/milestone/1_month/{self.test_username}")
         assert response.status_code == 200
@@ -254,12 +279,12 @@ class TestAPIEndpoints:
         assert data["title"] == "Foundation Phase"
         assert "details" in data
         assert "daily_tasks" in data["details"]
-        mock_get_plan.assert_called_once_with(self.test_username)
+        mock_get_milestone.assert_called_once_with(self.test_username, "1_month")
     
-    @patch('api.getUserPlanFromDB')
-    def test_get_milestone_2_success(self, mock_get_plan):
+    @patch('api.getUserMilestoneFromDBAsync')
+    def test_get_milestone_2_success(self, mock_get_milestone):
         """Test successful milestone 2 retrieval"""
-        mock_get_plan.return_value = self.mock_plan
+        mock_get_milestone.return_value = (True, self.mock_plan.milestone_2, self.mock_plan.last_updated)
         
         response = client.get(f"/api/v3/milestone/3_months/{self.test_username}")
         assert response.status_code == 200
@@ -269,12 +294,12 @@ class TestAPIEndpoints:
         assert data["title"] == "Development Phase"
         assert "details" in data
         assert "projects_to_complete" in data["details"]
-        mock_get_plan.assert_called_once_with(self.test_username)
+        mock_get_milestone.assert_called_once_with(self.test_username, "3_months")
     
-    @patch('api.getUserPlanFromDB')
-    def test_get_milestone_3_success(self, mock_get_plan):
+    @patch('api.getUserMilestoneFromDBAsync')
+    def test_get_milestone_3_success(self, mock_get_milestone):
         """Test successful milestone 3 retrieval"""
-        mock_get_plan.return_value = self.mock_plan
+        mock_get_milestone.return_value = (True, self.mock_plan.milestone_3, self.mock_plan.last_updated)
         
         response = client.get(f"/api/v3/milestone/1_year/{self.test_username}")
         assert response.status_code == 200
@@ -284,12 +309,12 @@ class TestAPIEndpoints:
         assert data["title"] == "Career Transition"
         assert "details" in data
         assert "career_targets" in data["details"]
-        mock_get_plan.assert_called_once_with(self.test_username)
+        mock_get_milestone.assert_called_once_with(self.test_username, "1_year")
     
-    @patch('api.getUserPlanFromDB')
-    def test_get_milestone_4_success(self, mock_get_plan):
+    @patch('api.getUserMilestoneFromDBAsync')
+    def test_get_milestone_4_success(self, mock_get_milestone):
         """Test successful milestone 4 retrieval"""
-        mock_get_plan.return_value = self.mock_plan
+        mock_get_milestone.return_value = (True, self.mock_plan.milestone_4, self.mock_plan.last_updated)
         
         response = client.get(f"/api/v3/milestone/5_years/{self.test_username}")
         assert response.status_code == 200
@@ -299,48 +324,109 @@ class TestAPIEndpoints:
         assert data["title"] == "Long-term Vision"
         assert "details" in data
         assert "vision_statement" in data["details"]
-        mock_get_plan.assert_called_once_with(self.test_username)
+        mock_get_milestone.assert_called_once_with(self.test_username, "5_years")
     
-    @patch('api.getUserPlanFromDB')
-    def test_get_milestone_plan_not_found(self, mock_get_plan):
+    @patch('api.getUserMilestoneFromDBAsync')
+    def test_get_milestone_plan_not_found(self, mock_get_milestone):
         """Test milestone retrieval when plan doesn't exist"""
-        mock_get_plan.return_value = None
+        mock_get_milestone.return_value = (False, None, None)
         
         response = client.get(f"/api/v3/milestone/1_month/{self.test_username}")
         assert response.status_code == 404
         assert "plan not found" in response.json()["detail"].lower()
     
-    @patch('api.getUserPlanFromDB')
-    def test_get_milestone_milestone_not_found(self, mock_get_plan):
+    @patch('api.getUserMilestoneFromDBAsync')
+    def test_get_milestone_milestone_not_found(self, mock_get_milestone):
         """Test milestone retrieval when specific milestone doesn't exist"""
-        plan_without_milestone = self.mock_plan.model_copy()
-        plan_without_milestone.milestone_1 = None
-        mock_get_plan.return_value = plan_without_milestone
+        mock_get_milestone.return_value = (True, None, self.mock_plan.last_updated)
         
         response = client.get(f"/api/v3/milestone/1_month/{self.test_username}")
         assert response.status_code == 404
         assert "milestone 1 not found" in response.json()["detail"].lower()
     
-    @patch('api.getUserPlanFromDB')
-    def test_get_milestone_generic_endpoint(self, mock_get_plan):
+    @patch('api.getUserMilestoneFromDBAsync')
+    def test_get_milestone_generic_endpoint(self, mock_get_milestone):
         """Test generic milestone endpoint"""
-        mock_get_plan.return_value = self.mock_plan
+        mock_get_milestone.return_value = (True, self.mock_plan.milestone_1, self.mock_plan.last_updated)
         
         response = client.get(f"/api/v3/milestone/1_month/{self.test_username}")
         assert response.status_code == 200
         
         data = response.json()
         assert data["timeframe"] == "1_month"
-        mock_get_plan.assert_called_once_with(self.test_username)
+        mock_get_milestone.assert_called_once_with(self.test_username, "1_month")
     
-    @patch('api.getUserPlanFromDB')
-    def test_get_milestone_invalid_timeframe(self, mock_get_plan):
+    @patch('api.getUserMilestoneFromDBAsync')
+    def test_get_milestone_invalid_timeframe(self, mock_get_milestone):
         """Test generic milestone endpoint with invalid timeframe"""
-        mock_get_plan.return_value = self.mock_plan
-        
+                
         response = client.get(f"/api/v3/milestone/invalid_time/{self.test_username}")
         assert response.status_code == 404
         assert "milestone not found" in response.json()["detail"].lower()
+        mock_get_milestone.assert_not_called()
+    
+    @patch('api.getUserPlanFromDBAsync')
+    def test_get_plan_conditional(self, mock_get_plan):
+        """Test that a matching If-None-Match gets 304 with no body"""
+        mock_get_plan.return_value = self.mock_plan
+        
+        first = client.get(f"/api/v3/plan/{self.test_username}")
+        etag = first.headers["etag"]
+        assert first.headers["cache-control"] == "private, no-cache"
+        
+        response = client.get(f"/api/v3/plan/{self.test_username}", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        
+        # A changed plan gets a new tag and a full response
+        mock_get_plan.return_value = self.mock_plan.model_copy(update={"last_updated": "2030-01-01T00:00:00+00:00"})
+        response = client.get(f"/api/v3/plan/{self.test_username}", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+    
+    @patch('api.getUserMilestoneFromDBAsync')
+    def test_get_milestone_conditional(self, mock_get_milestone):
+        """Test per-milestone ETags"""
+        mock_get_milestone.return_value = (True, self.mock_plan.milestone_1, self.mock_plan.last_updated)
+        
+        first = client.get(f"/api/v3/milestone/1_month/{self.test_username}")
+        etag = first.headers["etag"]
+        
+        response = client.get(f"/api/v3/milestone/1_month/{self.test_username}", headers={"If-None-Match": f'"other", W/{etag}'})
+        assert response.status_code == 304
+        
+        mock_get_milestone.return_value = (True, self.mock_plan.milestone_2, self.mock_plan.last_updated)
+        response = client.get(f"/api/v3/milestone/3_months/{self.test_username}", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        
+        # Storing the plan again gives its milestones new tags
+        changed = self.mock_plan.milestone_1.model_copy(update={"title": "Changed"})
+        mock_get_milestone.return_value = (True, changed, "2030-01-01T00:00:00+00:00")
+        response = client.get(f"/api/v3/milestone/1_month/{self.test_username}", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+    
+    @patch('api.getPlanFreshnessFromDBAsync')
+    @patch('api.getUserPlanFromDBAsync')
+    def test_generate_plan_conditional(self, mock_get_plan, mock_freshness):
+        """Test that a current plan matching If-None-Match is not sent again"""
+        mock_freshness.return_value = (self.mock_plan.last_updated, "2000-01-01T00:00:00")
+        mock_get_plan.return_value = self.mock_plan
+        
+        etag = client.post(f"/api/v3/generate-plan/{self.test_username}").headers["etag"]
+        mock_get_plan.reset_mock()
+        response = client.post(f"/api/v3/generate-plan/{self.test_username}", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        # Answered from the timestamps alone
+        mock_get_plan.assert_not_called()
+        
+        # A plan stored since is sent in full
+        mock_freshness.return_value = ("2030-01-01T00:00:00+00:00", "2000-01-01T00:00:00")
+        mock_get_plan.return_value = self.mock_plan.model_copy(update={"last_updated": "2030-01-01T00:00:00+00:00"})
+        response = client.post(f"/api/v3/generate-plan/{self.test_username}", headers={"If-None-Match": etag})
+        assert response.status_code == 200
     
     def test_list_plans_placeholder(self):
         """Test list plans endpoint (currently returns placeholder)"""
@@ -363,9 +449,9 @@ class TestAPIEndpoints:
         # Should not fail due to CORS configuration
         assert response.status_code in [200, 405]  # 405 is acceptable for OPTIONS on GET endpoint
     
-    @patch('api.getUserPlanFromDB')
-    @patch('api.manager.process_user_thoughts_to_updates')
-    @patch('api.manager.update_milestone_with_cascade')
+    @patch('api.getUserPlanFromDBAsync')
+    @patch('api.manager.process_user_thoughts_to_updates_async')
+    @patch('api.manager.update_milestone_with_cascade_async')
     def test_update_milestone_with_cascade(self, mock_cascade, mock_process, mock_get_plan):
         """Test cascade update endpoint with natural language"""
         from models import MilestoneUpdate
@@ -409,8 +495,8 @@ class TestAPIEndpoints:
         )
         mock_cascade.assert_called_once_with(self.mock_plan, "1_month", mock_update)
     
-    @patch('api.getUserPlanFromDB')
-    @patch('api.manager.update_milestone_with_cascade')
+    @patch('api.getUserPlanFromDBAsync')
+    @patch('api.manager.update_milestone_with_cascade_async')
     def test_direct_milestone_update(self, mock_cascade, mock_get_plan):
         """Test direct milestone update endpoint"""
         from models import MilestoneUpdate
@@ -450,9 +536,9 @@ class TestAPIEndpoints:
         assert call_args[1] == "3_months"
         assert isinstance(call_args[2], MilestoneUpdate)
     
-    @patch('api.getUserPlanFromDB')
-    @patch('api.manager.regenerate_subsequent_milestones')
-    @patch('api.storeUserPlanInDB')
+    @patch('api.getUserPlanFromDBAsync')
+    @patch('api.manager.regenerate_subsequent_milestones_async')
+    @patch('api.storeUserPlanInDBAsync')
     def test_regenerate_subsequent_milestones(self, mock_store, mock_regenerate, mock_get_plan):
         """Test regenerate subsequent milestones endpoint"""
         # Setup mocks
@@ -488,8 +574,8 @@ class TestAPIEndpoints:
         )
         mock_store.assert_called_once_with(updated_plan)
     
-    @patch('api.getUserPlanFromDB')
-    @patch('api.manager.process_user_thoughts_to_updates')
+    @patch('api.getUserPlanFromDBAsync')
+    @patch('api.manager.process_user_thoughts_to_updates_async')
     def test_process_thoughts_endpoint(self, mock_process, mock_get_plan):
         """Test process user thoughts endpoint (preview only)"""
         from models import MilestoneUpdate
@@ -545,7 +631,7 @@ class TestAPIEndpoints:
         assert response.status_code == 400
         assert "Invalid timeframe" in response.json()["detail"]
     
-    @patch('api.getUserPlanFromDB')
+    @patch('api.getUserPlanFromDBAsync')
     def test_cascade_endpoints_no_plan(self, mock_get_plan):
         """Test cascade endpoints when no plan exists"""
         mock_get_plan.return_value = None
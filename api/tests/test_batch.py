@@ -0,0 +1,96 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import patch
+from batch import BatchPlanRunner
+from llm_client import ResilientLLMClient
+from models import CareerPlan
+from utils.concurrency_utils import TokenBucket
+
+
+class FakeManager:
+    def __init__(self, fail_for=()):
+        self.generated = []
+        self.fail_for = set(fail_for)
+        self.llm = ResilientLLMClient(None)
+
+    def plan_generation_budget(self, user_profile):
+        return 1, 1000
+
+    async def generate_initial_plan_async(self, user_profile):
+        if user_profile.username in self.fail_for:
+            raise Exception("LLM generation failed")
+        self.generated.append(user_profile.username)
+        return CareerPlan(
+            plan_id=f"plan_{user_profile.username}",
+            user_id=user_profile.username,
+            overview={},
+            created_date="2024-01-01T00:00:00+00:00",
+            last_updated="2024-01-01T00:00:00+00:00"
+        )
+
+
+def fake_profiles(usernames):
+    from models import UserProfile
+    return {
+        username: UserProfile(username=username, interests_values="", work_experience="", circumstances="", skills="", goals="")
+        for username in usernames if username != "missing"
+    }
+
+
+class TestBatchPlanRunner:
+    """Tests for bulk plan generation"""
+
+    @patch('batch.storeUserPlansInDBAsync')
+    @patch('batch.getUserInformationForUsersFromDBAsync')
+    def test_batches_store_calls_and_reports(self, mock_profiles, mock_store):
+        mock_profiles.side_effect = fake_profiles
+        mock_store.side_effect = lambda plans: len(plans)
+        manager = FakeManager(fail_for=["user3"])
+
+        runner = BatchPlanRunner(manager, requests_per_minute=6000, tokens_per_minute=6000000, batch_size=2)
+        report = asyncio.run(runner.run(["user1", "user2", "user3", "missing", "user1"]))
+
+        assert report.total == 4
+        assert report.succeeded == 2
+        assert report.failed == 2
+        assert "not found" in report.failures["missing"]
+        assert mock_store.call_count == 1
+        assert mock_profiles.call_count == 2
+
+    @patch('batch.storeUserPlansInDBAsync')
+    @patch('batch.getUserInformationForUsersFromDBAsync')
+    def test_resumes_from_checkpoint(self, mock_profiles, mock_store, tmp_path):
+        mock_profiles.side_effect = fake_profiles
+        checkpoint = str(tmp_path / "checkpoint.json")
+
+        first = FakeManager(fail_for=["user2"])
+        asyncio.run(BatchPlanRunner(first, checkpoint_path=checkpoint).run(["user1", "user2"]))
+
+        second = FakeManager()
+        report = asyncio.run(BatchPlanRunner(second, checkpoint_path=checkpoint).run(["user1", "user2"]))
+
+        assert second.generated == ["user2"]
+        assert report.skipped == 1
+        assert report.succeeded == 1
+        assert report.failed == 0
+
+
+class TestTokenBucket:
+    """Tests for the rate budget used to schedule LLM calls"""
+
+    def test_waits_for_refill_once_burst_is_spent(self):
+        bucket = TokenBucket(rate=100, capacity=5)
+
+        async def run():
+            started = time.monotonic()
+            for _ in range(10):
+                await bucket.acquire()
+            return time.monotonic() - started
+
+        elapsed = asyncio.run(run())
+        assert 0.04 <= elapsed < 0.5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,43 @@
+import pytest
+from benchmarks.load import percentile, compare_to_baseline, scenario_request, SCENARIOS
+
+
+class TestBenchmarkHarness:
+    """Tests for the benchmark statistics and baseline comparison"""
+
+    def test_percentiles(self):
+        values = [float(i) for i in range(1, 101)]
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 99) == 99.0
+        assert percentile([], 95) == 0.0
+
+    def test_regressions_beyond_tolerance_are_reported(self):
+        baseline = {"generate-plan": {"throughput_rps": 10.0, "p95_seconds": 1.0, "error_rate": 0.0}}
+        steady = {"generate-plan": {"throughput_rps": 9.0, "p95_seconds": 1.1, "error_rate": 0.0}}
+        slower = {"generate-plan": {"throughput_rps": 5.0, "p95_seconds": 2.0, "error_rate": 0.2}}
+
+        assert compare_to_baseline(steady, baseline, tolerance=0.25) == []
+        regressions = compare_to_baseline(slower, baseline, tolerance=0.25)
+        assert len(regressions) == 3
+        assert any("p95_seconds" in regression for regression in regressions)
+
+    def test_every_scenario_builds_a_request(self):
+        for name in SCENARIOS:
+            method, path, _ = scenario_request(name, 3, 2)
+            assert method in ("POST", "PUT")
+            assert "user1" in path
+
+
+class TestRehydrationBenchmark:
+    """Tests for the plan rehydration microbenchmark"""
+
+    def test_reports_each_path(self):
+        from benchmarks.rehydration import run_benchmark
+
+        results = run_benchmark(iterations=20)
+        assert {"validated_us", "cache_hit_us", "cache_speedup"} <= set(results)
+        assert results["row_bytes"] > 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,109 @@
+import asyncio
+import httpx
+import pytest
+from unittest.mock import patch
+import db
+from db_pool import SupabasePool, create_supabase_pool_from_env
+from fakes import InMemoryTables, seed_users
+from conftest import make_plan, make_pool
+
+
+class TestSupabasePool:
+    """Tests for the pooled async data-access layer"""
+
+    def test_async_queries_keep_their_semantics(self):
+        tables = InMemoryTables()
+        seed_users(tables, 3)
+        pool = make_pool(tables)
+
+        async def run():
+            profile = await db.getUserInformationFromDBAsync("user1")
+            missing_plan = await db.getUserPlanFromDBAsync("user1")
+            await db.storeUserPlanInDBAsync(make_plan("user1"))
+            await db.storeUserPlanInDBAsync(make_plan("user1"))
+            plan = await db.getUserPlanFromDBAsync("user1")
+            stored = await db.storeUserPlansInDBAsync([make_plan("user1"), make_plan("user2")])
+            usernames = await db.listUsernamesFromDBAsync(limit=2)
+            profiles = await db.getUserInformationForUsersFromDBAsync(["user0", "user2"])
+            await pool.aclose()
+            return profile, missing_plan, plan, stored, usernames, profiles
+
+        with patch('db.pool', pool), patch('db.plan_cache', None):
+            profile, missing_plan, plan, stored, usernames, profiles = asyncio.run(run())
+
+        assert profile.username == "user1"
+        assert missing_plan == {}
+        assert plan.plan_id == "plan_user1"
+        assert len(tables.rows("Career Plans")) == 2
+        assert stored == 2
+        assert usernames == ["user0", "user1"]
+        assert set(profiles) == {"user0", "user2"}
+
+        stats = pool.stats()
+        assert stats["queries"]["get_user"]["count"] == 1
+        assert stats["queries"]["upsert_plan"]["count"] == 2
+        assert stats["queries"]["upsert_plans"]["count"] == 1
+        assert stats["rows_written"] == 4
+        assert stats["errors"] == 0
+
+    def test_concurrent_first_saves_write_one_row(self):
+        tables = InMemoryTables()
+        pool = make_pool(tables)
+
+        async def run():
+            written = await asyncio.gather(*(db.storeUserPlanInDBAsync(make_plan("user0")) for _ in range(5)))
+            stored = await db.storeUserPlansInDBAsync([make_plan("user1"), make_plan("user2"), make_plan("user1")])
+            await pool.aclose()
+            return written, stored
+
+        with patch('db.pool', pool), patch('db.plan_cache', None):
+            written, stored = asyncio.run(run())
+
+        assert written == [1] * 5
+        assert stored == 2
+        assert sorted(row["username"] for row in tables.rows("Career Plans")) == ["user0", "user1", "user2"]
+        # One round trip per save, first-time or not
+        assert pool.stats()["queries"]["upsert_plan"]["count"] == 5
+        assert "get_plan" not in pool.stats()["queries"]
+
+    def test_connection_pool_is_shared_within_a_loop(self):
+        pool = make_pool()
+
+        async def clients():
+            first, second = pool.client(), pool.client()
+            return first, second
+
+        first, second = asyncio.run(clients())
+        assert first is second
+        assert first.session._transport is pool.transport
+
+        # A new event loop can't reuse the previous loop's connections
+        third, _ = asyncio.run(clients())
+        assert third is not first
+
+    def test_failed_queries_are_counted(self):
+        pool = SupabasePool("http://127.0.0.1:9", "key", connect_timeout=0.5)
+
+        async def run():
+            with pytest.raises(httpx.ConnectError):
+                await pool.execute("get_plan", pool.table("Career Plans").select("*"))
+
+        asyncio.run(run())
+        assert pool.stats()["queries"]["get_plan"]["errors"] == 1
+        assert pool.stats()["queries"]["get_plan"]["count"] == 0
+
+    def test_pool_is_configured_from_env(self, monkeypatch):
+        monkeypatch.setenv("SUPABASE_POOL_MAX_CONNECTIONS", "5")
+        monkeypatch.setenv("SUPABASE_POOL_MAX_KEEPALIVE", "3")
+        monkeypatch.setenv("SUPABASE_TIMEOUT_SECONDS", "2.5")
+
+        pool = create_supabase_pool_from_env("https://example.supabase.co/", "key")
+
+        assert pool.base_url == "https://example.supabase.co/rest/v1"
+        assert pool.limits.max_connections == 5
+        assert pool.limits.max_keepalive_connections == 3
+        assert pool.timeout.read == 2.5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
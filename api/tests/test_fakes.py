@@ -0,0 +1,165 @@
+import asyncio
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from openai import OpenAI, AsyncOpenAI, RateLimitError
+from postgrest import SyncPostgrestClient
+from postgrest.exceptions import APIError
+from fakes import create_fake_app, FakeLLMConfig, InMemoryTables, seed_users
+from fakes.openai_stub import fake_completion_content
+from plan_parser import parse_plan_response, parse_milestones_response, build_milestone, MILESTONE_TIMEFRAMES
+from plan_manager import CascadingPlanManager
+from llm_cache import LLMResponseCache
+from llm_client import ResilientLLMClient
+from models import UserProfile, CareerPlan
+
+
+class AppTransport(httpx.BaseTransport):
+    """Sends requests to an ASGI app; TestClient itself drops the base URL path postgrest relies on"""
+
+    def __init__(self, app):
+        self.client = TestClient(app)
+
+    def handle_request(self, request):
+        return self.client.send(request)
+
+
+def make_rest_client(app):
+    client = SyncPostgrestClient("http://testserver/rest/v1")
+    client.session = httpx.Client(base_url="http://testserver/rest/v1", transport=AppTransport(app))
+    return client
+
+
+class TestFakeSupabase:
+    """Tests for the in-memory PostgREST stand-in, driven through the real client"""
+
+    def test_insert_select_update_and_upsert(self):
+        app = create_fake_app(FakeLLMConfig())
+        rest = make_rest_client(app)
+
+        rest.table("Career Plans").insert({"username": "a@example.com", "plan_id": "p1", "overview": "first"}).execute()
+        rest.table("Career Plans").insert({"username": "b@example.com", "plan_id": "p2", "overview": "first"}).execute()
+
+        rows = rest.table("Career Plans").select("plan_id").eq("username", "a@example.com").execute().data
+        assert rows == [{"plan_id": "p1"}]
+
+        rows = rest.table("Career Plans").select("username").in_("username", ["a@example.com", "b@example.com"]).order("username", desc=True).execute().data
+        assert [row["username"] for row in rows] == ["b@example.com", "a@example.com"]
+
+        rest.table("Career Plans").update({"overview": "second"}).eq("username", "a@example.com").execute()
+        rest.table("Career Plans").upsert({"username": "b@example.com", "plan_id": "p3", "overview": "third"}, on_conflict="username").execute()
+
+        rows = rest.table("Career Plans").select("username,plan_id,overview").order("username").execute().data
+        assert rows == [
+            {"username": "a@example.com", "plan_id": "p1", "overview": "second"},
+            {"username": "b@example.com", "plan_id": "p3", "overview": "third"}
+        ]
+
+    def test_columns_missing_from_the_schema_are_rejected(self):
+        rest = make_rest_client(create_fake_app(FakeLLMConfig()))
+
+        for query in (
+            rest.table("Career Plans").insert({"username": "a@example.com", "version": 1}),
+            rest.table("Career Plans").update({"version": 2}).eq("username", "a@example.com"),
+            rest.table("Career Plans").select("last_updated,version"),
+            rest.table("Career Plans").select("*").eq("version", "1"),
+        ):
+            with pytest.raises(APIError) as error:
+                query.execute()
+            assert "'version' column of 'Career Plans'" in error.value.message
+
+    def test_seeded_users_and_json_path_projection(self):
+        tables = InMemoryTables()
+        seed_users(tables, 3)
+        tables.insert("Career Plans", [{"username": "user0", "milestone_1": {"title": "Start", "details": {}}}])
+        rest = make_rest_client(create_fake_app(FakeLLMConfig(), tables))
+
+        assert len(rest.table("User Information").select("*").execute().data) == 3
+        rows = rest.table("Career Plans").select("title:milestone_1->title").execute().data
+        assert rows == [{"title": "Start"}]
+
+
+class TestFakeOpenAI:
+    """Tests for the chat completions stand-in, driven through the real client"""
+
+    def test_full_plan_response_is_schema_valid(self):
+        app = create_fake_app(FakeLLMConfig())
+        client = OpenAI(api_key="fake", base_url="http://testserver/v1", http_client=TestClient(app), max_retries=0)
+
+        response = client.chat.completions.create(
+            model="gpt-4", messages=[{"role": "user", "content": 'RESPOND WITH {"overview":{},"milestones":{}}'}]
+        )
+        result = parse_plan_response(response.choices[0].message.content, MILESTONE_TIMEFRAMES)
+
+        assert result.complete
+        assert response.usage.completion_tokens > 0
+
+    def test_streaming_and_injected_rate_limits(self):
+        app = create_fake_app(FakeLLMConfig(rate_limit_probability=1.0, retry_after_seconds=2))
+        client = OpenAI(api_key="fake", base_url="http://testserver/v1", http_client=TestClient(app), max_retries=0)
+
+        with pytest.raises(RateLimitError) as error:
+            client.chat.completions.create(model="gpt-4", messages=[{"role": "user", "content": "hi"}])
+        assert error.value.response.headers["retry-after"] == "2"
+
+        app.state.llm_config.rate_limit_probability = 0
+        stream = client.chat.completions.create(
+            model="gpt-4", messages=[{"role": "user", "content": "Write the overview"}], stream=True
+        )
+        content = "".join(chunk.choices[0].delta.content or "" for chunk in stream)
+        assert '"summary"' in content
+
+    def test_cascade_response_has_every_requested_milestone(self):
+        manager = CascadingPlanManager(cache=LLMResponseCache())
+        plan = CareerPlan(
+            plan_id="plan_user0", user_id="user0", overview={"summary": "Plan"},
+            created_date="2024-01-01T00:00:00+00:00", last_updated="2024-01-01T00:00:00+00:00",
+            **{f"milestone_{i}": build_milestone(timeframe, {}) for i, timeframe in enumerate(MILESTONE_TIMEFRAMES, 1)}
+        )
+        later = MILESTONE_TIMEFRAMES[1:]
+        request = manager._cascade_request(plan, "1_month", later)
+        prompt = "\n".join(message["content"] for message in request["messages"])
+
+        result = parse_milestones_response(fake_completion_content(prompt), later)
+
+        assert result.missing == []
+        assert set(result.milestones) == set(later)
+
+    def test_manager_generates_plan_against_stand_in(self):
+        app = create_fake_app(FakeLLMConfig())
+        async_client = AsyncOpenAI(
+            api_key="fake", base_url="http://testserver/v1", max_retries=0,
+            http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver/v1")
+        )
+        manager = CascadingPlanManager(generation_mode="parallel", cache=LLMResponseCache(), llm=ResilientLLMClient(async_client))
+        profile = UserProfile(username="user0", interests_values="Tech", work_experience="Engineer", circumstances="", skills="Python", goals="Lead a team")
+
+        plan = asyncio.run(manager.generate_initial_plan_async(profile))
+
+        assert all(getattr(plan, f"milestone_{i}") is not None for i in range(1, 5))
+        assert app.state.llm_config.requests == 5
+
+
+    def test_manager_cascades_without_repair_against_stand_in(self):
+        app = create_fake_app(FakeLLMConfig())
+        async_client = AsyncOpenAI(
+            api_key="fake", base_url="http://testserver/v1", max_retries=0,
+            http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver/v1")
+        )
+        manager = CascadingPlanManager(cache=LLMResponseCache(), llm=ResilientLLMClient(async_client))
+        plan = CareerPlan(
+            plan_id="plan_user0", user_id="user0", overview={"summary": "Plan"},
+            created_date="2024-01-01T00:00:00+00:00", last_updated="2024-01-01T00:00:00+00:00",
+            **{f"milestone_{i}": build_milestone(timeframe, {}) for i, timeframe in enumerate(MILESTONE_TIMEFRAMES, 1)}
+        )
+
+        updated = asyncio.run(manager.regenerate_subsequent_milestones_async(plan, "1_month", MILESTONE_TIMEFRAMES[1:]))
+
+        # One cascade completion and no repair round
+        assert app.state.llm_config.requests == 1
+        assert set(manager.token_usage.stats()["operations"]) == {"cascade"}
+        assert updated.version == plan.version + 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
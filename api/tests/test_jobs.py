@@ -0,0 +1,221 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+from api import app
+from jobs import JobQueue, InMemoryJobStore, SQLiteJobStore
+
+
+def run_until_finished(queue, job_id, timeout=2.0):
+    async def wait():
+        while not queue.get(job_id).finished:
+            await asyncio.sleep(0.005)
+        return queue.get(job_id)
+    return asyncio.wait_for(wait(), timeout)
+
+
+class TestJobQueue:
+    """Tests for the background job queue"""
+
+    def test_job_reports_partial_results_and_result(self):
+        queue = JobQueue(InMemoryJobStore(), workers=2)
+
+        async def handler(job, report_partial):
+            await report_partial("overview", {"summary": job.params["goal"]})
+            return {"plan": job.username}
+
+        queue.register("generate_plan", handler)
+
+        async def run():
+            job = await queue.enqueue("generate_plan", "user@example.com", {"goal": "Senior engineer"})
+            assert job.status == "queued"
+            snapshots = [snapshot.status async for snapshot in queue.watch(job.job_id)]
+            await queue.stop()
+            return queue.get(job.job_id), snapshots
+
+        job, snapshots = asyncio.run(run())
+        assert job.status == "succeeded"
+        assert job.partial_results == {"overview": {"summary": "Senior engineer"}}
+        assert job.result == {"plan": "user@example.com"}
+        assert snapshots[-1] == "succeeded"
+
+    def test_worker_concurrency_is_bounded(self):
+        queue = JobQueue(InMemoryJobStore(), workers=2)
+        in_flight = {"now": 0, "max": 0}
+
+        async def handler(job, report_partial):
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            await asyncio.sleep(0.01)
+            in_flight["now"] -= 1
+
+        queue.register("generate_plan", handler)
+
+        async def run():
+            jobs = [await queue.enqueue("generate_plan", f"user{i}") for i in range(6)]
+            for job in jobs:
+                await run_until_finished(queue, job.job_id)
+            await queue.stop()
+
+        asyncio.run(run())
+        assert in_flight["max"] == 2
+
+    def test_failed_job_records_error(self):
+        queue = JobQueue(InMemoryJobStore(), workers=1)
+
+        async def handler(job, report_partial):
+            raise ValueError("LLM generation failed")
+
+        queue.register("generate_plan", handler)
+
+        async def run():
+            job = await queue.enqueue("generate_plan", "user@example.com")
+            job = await run_until_finished(queue, job.job_id)
+            await queue.stop()
+            return job
+
+        job = asyncio.run(run())
+        assert job.status == "failed"
+        assert "LLM generation failed" in job.error
+
+    def test_sqlite_jobs_resume_after_restart(self, tmp_path):
+        db_path = str(tmp_path / "jobs.sqlite3")
+        blocked = JobQueue(SQLiteJobStore(db_path), workers=1)
+
+        async def never_finishes(job, report_partial):
+            await asyncio.sleep(3600)
+
+        blocked.register("generate_plan", never_finishes)
+
+        async def enqueue_then_crash():
+            job = await blocked.enqueue("generate_plan", "user@example.com")
+            await asyncio.sleep(0.01)
+            await blocked.stop()
+            return job
+
+        job = asyncio.run(enqueue_then_crash())
+        assert SQLiteJobStore(db_path).get(job.job_id).status == "running"
+
+        restarted = JobQueue(SQLiteJobStore(db_path), workers=1)
+
+        async def handler(job, report_partial):
+            return "done"
+
+        restarted.register("generate_plan", handler)
+
+        async def resume():
+            await restarted.start()
+            resumed = await run_until_finished(restarted, job.job_id)
+            await restarted.stop()
+            return resumed
+
+        assert asyncio.run(resume()).result == "done"
+
+
+class TestJobRetention:
+    """Tests for dropping finished jobs"""
+
+    def finished_job(self, job_id, updated_at):
+        from models.job import Job
+        return Job(job_id=job_id, job_type="generate_plan", username="user", status="succeeded",
+                   created_at=updated_at, updated_at=updated_at)
+
+    def test_memory_store_caps_finished_jobs_oldest_first(self):
+        from utils.timestamp_utils import get_current_timestamp
+        store = InMemoryJobStore(max_finished=2)
+        for job_id in ("a", "b", "c"):
+            store.save(self.finished_job(job_id, get_current_timestamp()))
+
+        assert store.get("a") is None
+        assert store.get("b") is not None and store.get("c") is not None
+
+    def test_expired_jobs_are_dropped_but_unfinished_kept(self, tmp_path):
+        from models.job import Job
+        from utils.timestamp_utils import get_current_timestamp
+        for store in (InMemoryJobStore(finished_ttl_seconds=60), SQLiteJobStore(str(tmp_path / "jobs.sqlite3"), finished_ttl_seconds=60)):
+            now = get_current_timestamp()
+            store.save(Job(job_id="queued", job_type="generate_plan", username="user", created_at="2020-01-01T00:00:00+00:00", updated_at="2020-01-01T00:00:00+00:00"))
+            store.save(self.finished_job("old", "2020-01-01T00:00:00+00:00"))
+            store.save(self.finished_job("new", now))
+
+            assert store.get("old") is None
+            assert store.get("new") is not None
+            assert [job.job_id for job in store.list_unfinished()] == ["queued"]
+
+    def test_sqlite_store_caps_finished_jobs(self, tmp_path):
+        from utils.timestamp_utils import get_current_timestamp
+        store = SQLiteJobStore(str(tmp_path / "jobs.sqlite3"), max_finished=1)
+        store.save(self.finished_job("a", get_current_timestamp()))
+        store.save(self.finished_job("b", get_current_timestamp()))
+
+        assert store.get("a") is None
+        assert store.get("b") is not None
+
+
+class TestJobEndpoints:
+    """Tests for enqueueing and polling jobs over HTTP"""
+
+    @patch('api.getUserPlanFromDBAsync')
+    @patch('api.manager.process_user_thoughts_to_updates_async')
+    @patch('api.manager.update_milestone_with_cascade_async')
+    def test_update_cascade_job(self, mock_cascade, mock_process, mock_get_plan):
+        from models import MilestoneUpdate
+        from test_plan_manager import plan_dict
+        from models import CareerPlan
+
+        plan = CareerPlan(**plan_dict())
+        mock_get_plan.return_value = plan
+        mock_process.return_value = MilestoneUpdate(user_notes="Slow down")
+        mock_cascade.return_value = plan
+
+        with TestClient(app) as client:
+            response = client.post(
+                "/api/v3/jobs/milestone/1_year/test@example.com/update-cascade",
+                json={"user_thoughts": "Slow down", "context": ""}
+            )
+            assert response.status_code == 202
+            job_id = response.json()["job_id"]
+
+            events = client.get(f"/api/v3/jobs/{job_id}/events").text
+            assert "event: succeeded" in events
+
+            job = client.get(f"/api/v3/jobs/{job_id}").json()
+
+        assert job["status"] == "succeeded"
+        assert job["partial_results"]["processed_updates"]["user_notes"] == "Slow down"
+        # Notes alone do not cascade
+        assert job["result"]["cascade_affected"] == []
+
+    @patch('api.storeUserPlanInDBAsync')
+    @patch('api.getUserPlanFromDBAsync')
+    def test_combined_cascade_job_without_updates_fails_clearly(self, mock_get_plan, mock_store):
+        from test_plan_manager import plan_dict
+        from models import CareerPlan
+
+        plan = CareerPlan(**plan_dict())
+        mock_get_plan.return_value = plan
+
+        async def no_updates(*args):
+            yield "plan", plan
+
+        with patch('api.manager.cascade_update_mode', "combined"), \
+             patch('api.manager.stream_update_with_cascade', no_updates), \
+             TestClient(app) as client:
+            job_id = client.post(
+                "/api/v3/jobs/milestone/1_year/test@example.com/update-cascade",
+                json={"user_thoughts": "Slow down", "context": ""}
+            ).json()["job_id"]
+            client.get(f"/api/v3/jobs/{job_id}/events")
+            job = client.get(f"/api/v3/jobs/{job_id}").json()
+
+        assert job["status"] == "failed"
+        assert "produced no milestone updates" in job["error"]
+        mock_store.assert_not_called()
+
+    def test_unknown_job(self):
+        with TestClient(app) as client:
+            assert client.get("/api/v3/jobs/missing").status_code == 404
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
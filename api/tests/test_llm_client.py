@@ -0,0 +1,266 @@
+import asyncio
+import httpx
+import pytest
+from openai import RateLimitError, BadRequestError
+from llm_client import ResilientLLMClient, LLMDeadlineExceeded, LatencyTracker, RequestDeadlineMiddleware
+from utils.concurrency_utils import AdaptiveConcurrencyLimiter
+
+
+def make_error(error_class, status_code, headers=None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(status_code, headers=headers or {}, request=request)
+    return error_class("error", response=response, body=None)
+
+
+class FakeCompletions:
+    def __init__(self, outcomes, delay=0.0):
+        self.outcomes = list(outcomes)
+        self.delay = delay
+        self.calls = 0
+
+    async def create(self, **request):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def make_client(outcomes, delay=0.0, **kwargs):
+    completions = FakeCompletions(outcomes, delay)
+    async_client = type("Client", (), {"chat": type("Chat", (), {"completions": completions})()})()
+    kwargs.setdefault("base_delay", 0.001)
+    return ResilientLLMClient(async_client, requests_per_minute=60000, tokens_per_minute=10000000, **kwargs), completions
+
+
+REQUEST = {"model": "gpt-4", "messages": [{"role": "user", "content": "hi"}], "max_tokens": 10}
+
+
+class TestResilientLLMClient:
+    """Tests for rate-limited, retried LLM calls"""
+
+    def test_rate_limit_is_retried_after_hint_and_shrinks_concurrency(self):
+        client, completions = make_client([make_error(RateLimitError, 429, {"retry-after-ms": "20"})], initial_concurrency=8)
+
+        assert asyncio.run(client.create(REQUEST)) == "ok"
+        assert completions.calls == 2
+        stats = client.stats()
+        assert stats["rate_limited"] == 1
+        assert stats["retries"] == 1
+        assert stats["successes"] == 1
+        assert stats["concurrency"]["limit"] < 8
+
+    def test_non_retryable_errors_fail_immediately(self):
+        client, completions = make_client([make_error(BadRequestError, 400)])
+
+        with pytest.raises(BadRequestError):
+            asyncio.run(client.create(REQUEST))
+        assert completions.calls == 1
+        assert client.stats()["failures"] == 1
+
+    def test_retries_are_bounded(self):
+        client, completions = make_client([make_error(RateLimitError, 429)] * 5, max_retries=2)
+
+        with pytest.raises(RateLimitError):
+            asyncio.run(client.create(REQUEST))
+        assert completions.calls == 3
+
+    def test_call_is_cut_off_at_its_deadline(self):
+        client, completions = make_client([], delay=1.0)
+
+        with pytest.raises(LLMDeadlineExceeded):
+            asyncio.run(client.create(REQUEST, deadline=0.05))
+        assert client.stats()["deadline_exceeded"] == 1
+
+    def test_stream_holds_its_slot_until_exhausted(self):
+        client, completions = make_client([])
+
+        async def chunks():
+            for word in ("a", "b"):
+                await asyncio.sleep(0.01)
+                yield word
+
+        async def create(**request):
+            return chunks()
+
+        completions.create = create
+
+        async def run():
+            stream = await client.create(REQUEST, stream=True)
+            assert client.limiter.in_flight == 1
+            received = [chunk async for chunk in stream]
+            return received, client.limiter.in_flight
+
+        assert asyncio.run(run()) == (["a", "b"], 0)
+
+    def test_stream_is_cut_off_at_its_deadline_and_released(self):
+        client, completions = make_client([])
+
+        async def chunks():
+            yield "a"
+            await asyncio.sleep(1.0)
+            yield "b"
+
+        async def create(**request):
+            return chunks()
+
+        completions.create = create
+
+        async def run():
+            stream = await client.create(REQUEST, deadline=0.05, stream=True)
+            assert await stream.__anext__() == "a"
+            with pytest.raises(LLMDeadlineExceeded):
+                await stream.__anext__()
+            return client.limiter.in_flight
+
+        assert asyncio.run(run()) == 0
+        assert client.stats()["deadline_exceeded"] == 1
+
+    def test_waiting_for_a_slot_is_bounded_by_the_deadline(self):
+        client, completions = make_client([], delay=1.0, initial_concurrency=1, max_concurrency=1)
+
+        async def run():
+            holder = asyncio.ensure_future(client.create(REQUEST))
+            await asyncio.sleep(0.01)
+            with client.deadline_scope(0.05):
+                with pytest.raises(LLMDeadlineExceeded):
+                    await client.create(REQUEST)
+            in_flight = client.limiter.in_flight
+            holder.cancel()
+            return in_flight
+
+        # The waiter gave up without taking a slot, and never reached the provider
+        assert asyncio.run(run()) == 1
+        assert completions.calls == 1
+        assert client.stats()["deadline_exceeded"] == 1
+
+    def test_closing_a_stream_early_releases_its_slot(self):
+        client, completions = make_client([])
+
+        async def chunks():
+            while True:
+                yield "a"
+
+        async def create(**request):
+            return chunks()
+
+        completions.create = create
+
+        async def run():
+            stream = await client.create(REQUEST, stream=True)
+            await stream.__anext__()
+            await stream.aclose()
+            return client.limiter.in_flight
+
+        assert asyncio.run(run()) == 0
+
+
+class TestHedging:
+    """Tests for hedged requests and request-derived deadlines"""
+
+    def test_slow_call_is_hedged_and_fast_duplicate_wins(self):
+        client, completions = make_client([], hedge_percentile=50, hedge_min_samples=3)
+        client._latencies[REQUEST["max_tokens"]] = LatencyTracker()
+        for _ in range(3):
+            client._latencies[REQUEST["max_tokens"]].record(0.01)
+
+        delays = [0.5, 0.0]
+
+        async def create(**request):
+            completions.calls += 1
+            await asyncio.sleep(delays.pop(0))
+            return f"response {completions.calls}"
+
+        completions.create = create
+        assert asyncio.run(client.create_hedged(REQUEST)) == "response 2"
+        stats = client.stats()["hedging"]
+        assert stats["hedges"] == 1
+        assert stats["hedge_wins"] == 1
+
+    def test_no_hedge_without_enough_samples(self):
+        client, completions = make_client([], hedge_percentile=50, hedge_min_samples=3)
+
+        assert asyncio.run(client.create_hedged(REQUEST)) == "ok"
+        assert completions.calls == 1
+        assert client.stats()["hedging"]["hedged_calls"] == 0
+
+    def test_deadline_scales_with_completion_budget(self):
+        client, _ = make_client([], deadline_seconds=120, deadline_base_seconds=10, min_tokens_per_second=20)
+
+        assert client.deadline_for({"max_tokens": 1000}) == 60
+        assert client.deadline_for({"max_tokens": 3500}) == 120
+
+    def test_calls_share_the_request_deadline(self):
+        client, _ = make_client([], deadline_seconds=120, deadline_base_seconds=10, min_tokens_per_second=20)
+
+        with client.deadline_scope(30):
+            assert 29 < client.deadline_for({"max_tokens": 1000}) <= 30
+            with client.deadline_scope(90):
+                # A nested scope cannot extend the outer budget
+                assert client.deadline_for({"max_tokens": 1000}) <= 30
+        assert client.deadline_for({"max_tokens": 1000}) == 60
+
+    def test_call_is_cut_off_when_the_request_budget_runs_out(self):
+        client, completions = make_client([], delay=0.05)
+
+        async def run():
+            with client.deadline_scope(0.08):
+                assert await client.create(REQUEST, deadline=10) == "ok"
+                # The second call only gets what the first left over
+                await client.create(REQUEST, deadline=10)
+
+        with pytest.raises(LLMDeadlineExceeded):
+            asyncio.run(run())
+        assert completions.calls == 2
+        assert client.stats()["deadline_exceeded"] == 1
+
+    def test_middleware_scopes_each_http_request(self):
+        client, _ = make_client([], request_deadline_seconds=5)
+        seen = []
+
+        async def app(scope, receive, send):
+            seen.append(client.remaining_request_time())
+
+        middleware = RequestDeadlineMiddleware(app, llm=client)
+        asyncio.run(middleware({"type": "http"}, None, None))
+
+        assert 4 < seen[0] <= 5
+        assert client.remaining_request_time() == float("inf")
+
+
+class TestAdaptiveConcurrencyLimiter:
+    """Tests for AIMD concurrency control"""
+
+    def test_additive_increase_multiplicative_decrease(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=4, minimum=1, maximum=5)
+        for _ in range(4):
+            limiter.on_success()
+        assert 4.9 < limiter.limit <= 5
+
+        limiter.on_overload()
+        assert limiter.limit == pytest.approx(limiter.maximum * 0.5, rel=0.1)
+        for _ in range(10):
+            limiter.on_overload()
+        assert limiter.limit == 1
+
+    def test_in_flight_calls_never_exceed_limit(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=2, maximum=2)
+        in_flight = {"now": 0, "max": 0}
+
+        async def call():
+            async with limiter:
+                in_flight["now"] += 1
+                in_flight["max"] = max(in_flight["max"], in_flight["now"])
+                await asyncio.sleep(0.01)
+                in_flight["now"] -= 1
+
+        async def run():
+            await asyncio.gather(*(call() for _ in range(6)))
+
+        asyncio.run(run())
+        assert in_flight["max"] == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
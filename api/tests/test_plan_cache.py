@@ -0,0 +1,218 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+import db
+from plan_cache import PlanCache
+from fakes import InMemoryTables, seed_users
+from conftest import make_plan, make_pool
+
+
+class TestPlanCache:
+    """Tests for the username-keyed plan cache"""
+
+    def test_hits_misses_and_size_bounded_lru(self):
+        cache = PlanCache(max_bytes=250)
+        cache.set("a", make_plan("a"), 100)
+        cache.set("b", make_plan("b"), 100)
+
+        assert cache.get("a")[0].user_id == "a"
+        cache.set("c", make_plan("c"), 100)
+
+        # "b" was least recently used, so it went to make room
+        assert cache.get("b") == (None, False)
+        assert cache.get("c")[0].user_id == "c"
+
+        stats = cache.stats()
+        assert stats["hits"] == 2 and stats["misses"] == 1
+        assert stats["evictions"] == 1
+        assert stats["bytes"] == 200
+
+    def test_reads_do_not_overwrite_newer_plans(self):
+        cache = PlanCache()
+        cache.set("a", make_plan("a", last_updated="2024-06-01T00:00:00+00:00"), 10)
+        cache.set("a", make_plan("a", version=2), 10)
+        assert cache.get("a")[0].version == 1
+
+        # A newly generated plan starts again at version 1 but is newer than a cascaded one
+        cache.set("a", make_plan("a", version=1, last_updated="2025-01-01T00:00:00+00:00"), 10)
+        assert cache.get("a")[0].last_updated == "2025-01-01T00:00:00+00:00"
+
+    def test_writes_always_replace(self):
+        cache = PlanCache()
+        cache.set("a", make_plan("a", version=2, last_updated="2025-01-01T00:00:00+00:00"), 10, written=True)
+        cache.set("a", make_plan("a", version=1, last_updated="2024-01-01T00:00:00+00:00"), 10, written=True)
+        assert cache.get("a")[0].version == 1
+
+    def test_expired_entries_are_revalidated(self):
+        cache = PlanCache(ttl_seconds=0)
+        plan = make_plan("a")
+        cache.set("a", plan, 10)
+
+        cached, expired = cache.get("a")
+        assert cached is plan and expired
+        assert cache.revalidate("a", plan.last_updated) is plan
+        assert cache.revalidate("a", "2025-01-01T00:00:00+00:00") is None
+        assert cache.get("a") == (None, False)
+
+        stats = cache.stats()
+        assert stats["revalidations"] == 1 and stats["stale"] == 1
+
+
+class TestPlanCacheDB:
+    """Tests for read-through and write-through caching in the database layer"""
+
+    def test_reads_are_served_from_cache_after_the_first(self):
+        tables = InMemoryTables()
+        pool = make_pool(tables)
+        cache = PlanCache()
+
+        async def run():
+            await db.storeUserPlanInDBAsync(make_plan("user0"))
+            cache.clear()
+            first = await db.getUserPlanFromDBAsync("user0")
+            second = await db.getUserPlanFromDBAsync("user0")
+            return first, second
+
+        with patch('db.pool', pool), patch('db.plan_cache', cache):
+            first, second = asyncio.run(run())
+
+        assert first is second
+        assert pool.stats()["queries"]["get_plan"]["count"] == 1
+        assert cache.stats()["hits"] == 1
+
+    def test_writes_go_through_and_expired_entries_revalidate(self):
+        tables = InMemoryTables()
+        pool = make_pool(tables)
+        cache = PlanCache(ttl_seconds=0)
+
+        async def run():
+            await db.storeUserPlanInDBAsync(make_plan("user0"))
+            revalidated = await db.getUserPlanFromDBAsync("user0")
+            # Another process writes the row
+            tables.update("Career Plans", [("username", "eq.user0")], {"last_updated": "2030-01-01T00:00:00+00:00"})
+            reloaded = await db.getUserPlanFromDBAsync("user0")
+            return revalidated, reloaded
+
+        with patch('db.pool', pool), patch('db.plan_cache', cache):
+            revalidated, reloaded = asyncio.run(run())
+
+        queries = pool.stats()["queries"]
+        assert queries["revalidate_plan"]["count"] == 2
+        assert queries["get_plan"]["count"] == 1
+        assert reloaded.last_updated == "2030-01-01T00:00:00+00:00"
+
+    def test_milestone_reads_fetch_only_their_column(self):
+        from plan_parser import build_milestone
+        tables = InMemoryTables()
+        pool = make_pool(tables)
+        plan = make_plan()
+        plan.milestone_2 = build_milestone("3_months", {"title": "Quarter", "details": {"projects_to_complete": ["SQL dashboard"]}})
+
+        async def run():
+            await db.storeUserPlanInDBAsync(plan)
+            milestone = await db.getUserMilestoneFromDBAsync("user0", "3_months")
+            missing = await db.getUserMilestoneFromDBAsync("user0", "1_month")
+            no_plan = await db.getUserMilestoneFromDBAsync("user1", "1_month")
+            return milestone, missing, no_plan
+
+        with patch('db.pool', pool), patch('db.plan_cache', None):
+            (exists, milestone, _), missing, no_plan = asyncio.run(run())
+
+        assert exists and milestone.title == "Quarter"
+        assert milestone.details.projects_to_complete == ["SQL dashboard"]
+        assert missing[:2] == (True, None)
+        assert no_plan == (False, None, None)
+        assert pool.stats()["queries"]["get_milestone"]["count"] == 3
+        assert "get_plan" not in pool.stats()["queries"]
+
+    def test_milestone_reads_use_cached_plans(self):
+        tables = InMemoryTables()
+        pool = make_pool(tables)
+        cache = PlanCache()
+
+        async def run():
+            await db.storeUserPlanInDBAsync(make_plan())
+            return await db.getUserMilestoneFromDBAsync("user0", "1_month")
+
+        with patch('db.pool', pool), patch('db.plan_cache', cache):
+            assert asyncio.run(run())[:2] == (True, None)
+
+        assert "get_milestone" not in pool.stats()["queries"]
+
+    def test_freshness_reads_only_timestamps(self):
+        tables = InMemoryTables()
+        seed_users(tables, 1)
+        pool = make_pool(tables)
+        cache = PlanCache(ttl_seconds=0)
+
+        async def run():
+            before = await db.getPlanFreshnessFromDBAsync("user0")
+            await db.storeUserPlanInDBAsync(make_plan("user0", version=3))
+            # Read from the row while the cached entry has expired
+            stored = await db.getPlanFreshnessFromDBAsync("user0")
+            # Once revalidated it stays fresh
+            cache.ttl_seconds = 60
+            after = await db.getPlanFreshnessFromDBAsync("user0")
+            plan = await db.getUserPlanFromDBAsync("user0")
+            return before, stored, after, plan
+
+        with patch('db.pool', pool), patch('db.plan_cache', cache):
+            before, stored, after, plan = asyncio.run(run())
+
+        assert before == (None, tables.rows("User Information")[0]["last_updated"])
+        assert stored[0] == after[0] == tables.rows("Career Plans")[0]["last_updated"]
+        queries = pool.stats()["queries"]
+        assert queries["plan_timestamp"]["count"] == 3
+        assert queries["user_timestamp"]["count"] == 3
+        # The expired cached plan was revalidated by the freshness check, so loading it needed no query
+        assert plan.last_updated == after[0]
+        assert "get_plan" not in queries and "revalidate_plan" not in queries
+
+    def test_fresh_plan_replaces_cascaded_plan(self):
+        tables = InMemoryTables()
+        pool = make_pool(tables)
+        cache = PlanCache()
+
+        async def run():
+            await db.storeUserPlanInDBAsync(make_plan("user0", version=2))
+            await db.storeUserPlanInDBAsync(make_plan("user0", version=1))
+            cached = cache.get("user0")[0]
+            cache.clear()
+            return cached, await db.getUserPlanFromDBAsync("user0")
+
+        with patch('db.pool', pool), patch('db.plan_cache', cache):
+            cached, reloaded = asyncio.run(run())
+
+        assert cached.version == 1
+        assert cached.last_updated == tables.rows("Career Plans")[0]["last_updated"]
+        assert reloaded.last_updated == cached.last_updated
+
+    def test_failed_store_invalidates(self):
+        cache = PlanCache()
+        cache.set("user0", make_plan("user0"), 10)
+
+        with patch('db.plan_cache', cache), patch('db.supabase') as mock_supabase:
+            mock_supabase.table.side_effect = RuntimeError("connection reset")
+            db.storeUserPlanInDB(make_plan("user0", version=2))
+
+        assert cache.get("user0") == (None, False)
+
+    def test_updates_do_not_modify_the_cached_plan(self):
+        from plan_manager import CascadingPlanManager
+        from plan_parser import build_milestone
+        from llm_cache import LLMResponseCache
+        from models import MilestoneUpdate
+
+        manager = CascadingPlanManager(cache=LLMResponseCache())
+        plan = make_plan()
+        plan.milestone_1 = build_milestone("1_month", {"title": "Month", "details": {"key_objectives": ["Learn"]}})
+
+        with patch('plan_manager.storeUserPlanInDBAsync'):
+            updated = asyncio.run(manager.update_milestone_with_cascade_async(plan, "1_month", MilestoneUpdate(user_notes="Prefer mornings")))
+
+        assert updated.milestone_1.details.user_notes == "Prefer mornings"
+        assert plan.milestone_1.details.user_notes != "Prefer mornings"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import pytest
+from unittest.mock import patch
+import db
+from plan_events import PlanEventHub
+from plan_parser import build_milestone
+from fakes import InMemoryTables
+from conftest import make_plan, make_pool
+
+
+# Milestones whose changes the event tests look for
+MILESTONES = {"1_month": {"title": "Month"}, "3_months": {"title": "Quarter"}}
+
+
+async def next_event(subscription):
+    return await asyncio.wait_for(subscription.__anext__(), 1)
+
+
+async def subscribed(hub, count=1):
+    # Subscriptions register when first iterated
+    while hub.stats()["subscribers"] < count:
+        await asyncio.sleep(0)
+
+
+class TestPlanEventHub:
+    """Tests for pushing plan changes to subscribers"""
+
+    def test_fan_out_sends_only_changed_fields(self):
+        hub = PlanEventHub()
+
+        async def run():
+            first, second = hub.subscribe("user0"), hub.subscribe("user0")
+            other = hub.subscribe("user1")
+            pending = [asyncio.ensure_future(next_event(s)) for s in (first, second, other)]
+            await subscribed(hub, 3)
+
+            plan = make_plan(milestones=MILESTONES)
+            hub.publish(plan)
+            initial = [await pending[0], await pending[1]]
+            hub.publish(plan.model_copy(update={
+                "last_updated": "2024-02-01T00:00:00+00:00",
+                "milestone_1": build_milestone("1_month", {"title": "New month"})
+            }))
+            update = await next_event(first)
+            pending[2].cancel()
+            return initial, update
+
+        initial, (event, delta) = asyncio.run(run())
+
+        assert initial[0] == initial[1]
+        assert set(initial[0][1]["changes"]) == {"overview", "milestone_1", "milestone_2", "milestone_3", "milestone_4"}
+        assert event == "plan"
+        assert set(delta["changes"]) == {"milestone_1"}
+        assert delta["changes"]["milestone_1"]["title"] == "New month"
+        assert delta["previous_etag"] == initial[0][1]["etag"]
+        assert hub.stats()["delivered"] == 4
+
+    def test_slow_subscribers_are_told_to_resync(self):
+        hub = PlanEventHub(queue_size=2)
+
+        async def run():
+            subscription = hub.subscribe("user0")
+            pending = asyncio.ensure_future(next_event(subscription))
+            await subscribed(hub)
+            hub.publish(make_plan(milestones=MILESTONES))
+            first = await pending
+            # Nothing is read while these arrive
+            for i in range(4):
+                hub.publish(make_plan(last_updated=f"2024-01-0{i + 2}T00:00:00+00:00", milestones=MILESTONES))
+            return [first, await next_event(subscription), await next_event(subscription)]
+
+        events = asyncio.run(run())
+
+        # The queue filled up, so its backlog collapsed into one resync; later events follow it
+        assert [event for event, _ in events] == ["plan", "resync", "plan"]
+        assert events[2][1]["last_updated"] == "2024-01-05T00:00:00+00:00"
+        stats = hub.stats()
+        assert stats["resyncs"] == 1
+        assert stats["dropped"] == 2
+
+    def test_idle_subscriptions_get_heartbeats(self):
+        hub = PlanEventHub(heartbeat_seconds=0.01)
+
+        async def run():
+            subscription = hub.subscribe("user0")
+            event = await next_event(subscription)
+            await subscription.aclose()
+            return event
+
+        assert asyncio.run(run()) == ("heartbeat", None)
+        assert hub.stats()["subscribers"] == 0
+
+    def test_publishing_from_another_thread(self):
+        hub = PlanEventHub()
+
+        async def run():
+            subscription = hub.subscribe("user0")
+            pending = asyncio.ensure_future(next_event(subscription))
+            await subscribed(hub)
+            thread = threading.Thread(target=hub.publish, args=(make_plan(milestones=MILESTONES),))
+            thread.start()
+            thread.join()
+            return await pending
+
+        event, delta = asyncio.run(run())
+        assert event == "plan" and delta["username"] == "user0"
+
+    def test_stores_are_published(self):
+        tables = InMemoryTables()
+        pool = make_pool(tables)
+        hub = PlanEventHub()
+
+        async def run():
+            import api
+            response = await api.watch_plan("user0")
+            body = response.body_iterator
+            pending = asyncio.ensure_future(next_event(body))
+            await subscribed(hub)
+            await db.storeUserPlanInDBAsync(make_plan(milestones=MILESTONES))
+            chunk = await pending
+            await body.aclose()
+            return chunk
+
+        with patch('db.pool', pool), patch('db.plan_cache', None), patch('db.plan_events', hub), \
+                patch('api.plan_events', hub):
+            chunk = asyncio.run(run())
+
+        assert chunk.startswith("event: plan\n")
+        assert tables.rows("Career Plans")[0]["last_updated"] in chunk
+        assert hub.stats()["subscribers"] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
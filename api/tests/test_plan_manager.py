@@ -0,0 +1,677 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+from plan_manager import CascadingPlanManager
+from llm_cache import LLMResponseCache
+from models import UserProfile, Milestone1, Milestone4
+
+
+def make_profile():
+    return UserProfile(
+        username="test@example.com",
+        interests_values="Technology and innovation",
+        work_experience="Software engineer with 5 years experience",
+        circumstances="Single, flexible schedule",
+        skills="Python, JavaScript, React",
+        goals="Become a senior engineer"
+    )
+
+
+def milestone_json(timeframe):
+    return json.dumps({
+        "title": f"{timeframe} title",
+        "overview": f"{timeframe} overview",
+        "details": {"timeline_weeks": 4, "key_objectives": [f"{timeframe} objective"]}
+    })
+
+
+class TestParallelGeneration:
+    """Tests for fan-out generation of the plan milestones"""
+
+    def test_overview_first_then_milestones_concurrently(self):
+        manager = CascadingPlanManager(generation_mode="parallel", milestone_concurrency=2)
+        calls = []
+        in_flight = {"now": 0, "max": 0}
+
+        async def fake_complete(request, use_cache=True):
+            prompt = request["messages"][1]["content"]
+            if "PLAN OVERVIEW" not in prompt:
+                calls.append("overview")
+                return 'Overview: {"summary": "Grow into a senior role"}'
+
+            timeframe = next(t for t in manager.milestone_order if f"Create the {t} milestone" in prompt)
+            calls.append(timeframe)
+            assert "Grow into a senior role" in prompt
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            await asyncio.sleep(0.01)
+            in_flight["now"] -= 1
+            return milestone_json(timeframe)
+
+        with patch.object(manager, '_complete_async', side_effect=fake_complete):
+            plan = asyncio.run(manager.generate_initial_plan_async(make_profile()))
+
+        assert calls[0] == "overview"
+        assert sorted(calls[1:]) == sorted(manager.milestone_order)
+        assert in_flight["max"] == 2
+        assert plan.overview == {"summary": "Grow into a senior role"}
+        assert isinstance(plan.milestone_1, Milestone1)
+        assert isinstance(plan.milestone_4, Milestone4)
+        assert plan.milestone_4.title == "5_years title"
+
+    def test_failed_milestone_is_left_out(self):
+        manager = CascadingPlanManager(generation_mode="parallel")
+
+        async def fake_complete(request, use_cache=True):
+            prompt = request["messages"][1]["content"]
+            if "PLAN OVERVIEW" not in prompt:
+                return '{"summary": "Plan"}'
+            if "Create the 1_year milestone" in prompt:
+                return "Sorry, I can't help with that."
+            timeframe = next(t for t in manager.milestone_order if f"Create the {t} milestone" in prompt)
+            return milestone_json(timeframe)
+
+        with patch.object(manager, '_complete_async', side_effect=fake_complete):
+            plan = asyncio.run(manager.generate_initial_plan_parallel(make_profile()))
+
+        assert plan.milestone_3 is None
+        assert plan.milestone_2 is not None
+
+
+class TestLLMResponseCache:
+    """Tests for the content-addressed LLM response cache"""
+
+    def _request(self, prompt="Plan my career", max_tokens=100):
+        return CascadingPlanManager(cache=LLMResponseCache())._completion_request("system", prompt, max_tokens)
+
+    def test_identical_request_is_served_from_cache(self):
+        cache = LLMResponseCache()
+        manager = CascadingPlanManager(cache=cache)
+        calls = []
+
+        async def fake_create(**request):
+            calls.append(request)
+            return type("Response", (), {"choices": [type("Choice", (), {"message": type("Message", (), {"content": "plan"})()})()]})()
+
+        with patch('clients.async_openai_client.chat.completions.create', side_effect=fake_create):
+            request = self._request()
+            assert asyncio.run(manager._complete_async(request)) == "plan"
+            assert asyncio.run(manager._complete_async(dict(request))) == "plan"
+            assert asyncio.run(manager._complete_async(request, use_cache=False)) == "plan"
+
+        assert len(calls) == 2
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_unparsable_responses_are_not_replayed(self):
+        from fakes.openai_stub import fake_completion_content
+
+        cache = LLMResponseCache()
+        manager = CascadingPlanManager(cache=cache, generation_mode="single")
+        profile = UserProfile(username="user0", interests_values="Tech", work_experience="Engineer", circumstances="", skills="Python", goals="Lead a team")
+        contents = ["Sorry, I can't help with that.", fake_completion_content('"milestones"')]
+        calls = []
+
+        async def fake_create(**request):
+            calls.append(request)
+            content = contents[min(len(calls), len(contents)) - 1]
+            return type("Response", (), {"choices": [type("Choice", (), {"message": type("Message", (), {"content": content})()})()]})()
+
+        with patch('clients.async_openai_client.chat.completions.create', side_effect=fake_create):
+            with pytest.raises(Exception, match="No JSON found"):
+                asyncio.run(manager.generate_initial_plan_async(profile))
+            first = asyncio.run(manager.generate_initial_plan_async(profile))
+            second = asyncio.run(manager.generate_initial_plan_async(profile))
+
+        # The failed response was dropped, so the retry reached the provider; the good one is cached
+        assert len(calls) == 2
+        assert first.milestone_4 is not None and second.milestone_4 is not None
+        assert cache.stats()["hits"] == 1
+
+    def test_key_depends_on_request_parameters(self):
+        assert LLMResponseCache.make_key(self._request()) == LLMResponseCache.make_key(self._request())
+        assert LLMResponseCache.make_key(self._request()) != LLMResponseCache.make_key(self._request(max_tokens=200))
+        assert LLMResponseCache.make_key(self._request()) != LLMResponseCache.make_key(self._request(prompt="Other"))
+
+    def test_lru_and_ttl_eviction(self):
+        cache = LLMResponseCache(max_entries=2)
+        first, second, third = self._request("a"), self._request("b"), self._request("c")
+        cache.set(first, "1")
+        cache.set(second, "2")
+        cache.get(first)
+        cache.set(third, "3")
+
+        assert cache.get(second) is None
+        assert cache.get(first) == "1"
+        assert cache.stats()["evictions"] == 1
+
+        expired = LLMResponseCache(ttl_seconds=0)
+        expired.set(first, "1")
+        assert expired.get(first) is None
+
+    def test_disk_tier_survives_restart(self, tmp_path):
+        db_path = str(tmp_path / "cache.sqlite3")
+        request = self._request()
+        LLMResponseCache(db_path=db_path).set(request, "persisted")
+
+        restarted = LLMResponseCache(db_path=db_path)
+        assert restarted.get(request) == "persisted"
+        assert restarted.stats()["disk_hits"] == 1
+
+        small = LLMResponseCache(db_path=db_path, max_db_entries=1)
+        small.set(self._request("other"), "newer")
+        assert small.stats()["disk_entries"] == 1
+
+    def test_async_methods_keep_disk_io_off_the_loop(self, tmp_path):
+        import threading
+        cache = LLMResponseCache(db_path=str(tmp_path / "cache.sqlite3"))
+        request = self._request()
+        loop_thread = threading.get_ident()
+        disk_threads = []
+
+        def recording(method):
+            def run(*args):
+                disk_threads.append(threading.get_ident())
+                return method(*args)
+            return run
+
+        async def run():
+            await cache.set_async(request, "content")
+            cache._memory.clear()
+            from_disk = await cache.get_async(request)
+            from_memory = await cache.get_async(request)
+            await cache.delete_async(request)
+            return from_disk, from_memory, await cache.get_async(request)
+
+        with patch.object(cache, '_set_disk', recording(cache._set_disk)), \
+                patch.object(cache, '_get_disk', recording(cache._get_disk)), \
+                patch.object(cache, '_delete_disk', recording(cache._delete_disk)):
+            assert asyncio.run(run()) == ("content", "content", None)
+
+        # set, the disk lookup, delete and the final miss; the memory hit needed no thread
+        assert len(disk_threads) == 4
+        assert loop_thread not in disk_threads
+        stats = cache.stats()
+        assert (stats["hits"], stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (2, 1, 1, 1)
+
+
+class TestSingleFlight:
+    """Tests for coalescing concurrent identical requests"""
+
+    def test_concurrent_callers_share_one_execution(self):
+        from utils.concurrency_utils import SingleFlight
+
+        flights = SingleFlight()
+        executions = []
+
+        async def work():
+            executions.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        async def run():
+            same = await asyncio.gather(*(flights.do("user", work) for _ in range(5)))
+            other = await flights.do("other", work)
+            return same, other
+
+        same, other = asyncio.run(run())
+        assert same == ["result"] * 5
+        assert other == "result"
+        assert len(executions) == 2
+        assert flights.stats() == {"in_flight": 0, "executions": 2, "coalesced": 4}
+
+    def test_waiters_receive_the_same_exception(self):
+        from utils.concurrency_utils import SingleFlight
+
+        flights = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("generation failed")
+
+        async def run():
+            return await asyncio.gather(flights.do("user", work), flights.do("user", work), return_exceptions=True)
+
+        results = asyncio.run(run())
+        assert all(isinstance(result, ValueError) for result in results)
+
+    def test_cancelled_caller_does_not_fail_the_others(self):
+        from utils.concurrency_utils import SingleFlight
+
+        flights = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "result"
+
+        async def run():
+            leader = asyncio.ensure_future(flights.do("user", work))
+            follower = asyncio.ensure_future(flights.do("user", work))
+            await asyncio.sleep(0.005)
+            leader.cancel()
+            return await follower, leader.cancelled()
+
+        assert asyncio.run(run()) == ("result", True)
+
+    def test_streams_are_replayed_to_every_caller(self):
+        from utils.concurrency_utils import SingleFlight
+
+        flights = SingleFlight()
+        started = []
+
+        async def produce():
+            started.append(1)
+            for i in range(3):
+                await asyncio.sleep(0.005)
+                yield i
+
+        async def collect(limit=None):
+            items = []
+            async for item in flights.stream("user", produce):
+                items.append(item)
+                if len(items) == limit:
+                    break
+            return items
+
+        async def run():
+            first = asyncio.ensure_future(collect())
+            early_exit = asyncio.ensure_future(collect(limit=1))
+            await asyncio.sleep(0.008)
+            # Joins after the first item and still receives it
+            late = asyncio.ensure_future(collect())
+            return await first, await early_exit, await late
+
+        assert asyncio.run(run()) == ([0, 1, 2], [0], [0, 1, 2])
+        assert len(started) == 1
+        assert flights.stats() == {"in_flight": 0, "executions": 1, "coalesced": 2}
+
+    def test_identical_cascades_regenerate_once(self):
+        from models import MilestoneUpdate
+        from models import CareerPlan
+
+        manager = CascadingPlanManager(cache=LLMResponseCache())
+        llm_calls = []
+
+        async def fake_complete(request, use_cache=True):
+            llm_calls.append(request)
+            await asyncio.sleep(0.01)
+            return json.dumps({"5_years": json.loads(milestone_json("5_years"))})
+
+        async def run(update):
+            plans = [CareerPlan(**plan_dict()) for _ in range(3)]
+            return await asyncio.gather(*(manager.update_milestone_with_cascade_async(plan, "1_year", update) for plan in plans))
+
+        with patch.object(manager, '_complete_async', side_effect=fake_complete), \
+                patch('plan_manager.storeUserPlanInDBAsync') as mock_store:
+            # Notes alone do not cascade, but the identical updates are still applied and stored once
+            results = asyncio.run(run(MilestoneUpdate(user_notes="More time for projects")))
+            assert llm_calls == []
+            mock_store.assert_called_once()
+            assert results[0] is results[1] is results[2]
+
+            mock_store.reset_mock()
+            results = asyncio.run(run(MilestoneUpdate(objectives=["Ship a portfolio project"], user_notes="More time for projects")))
+
+        assert len(llm_calls) == 1
+        mock_store.assert_called_once()
+        assert results[0] is results[1] is results[2]
+
+
+class TestMilestoneRepair:
+    """Tests for re-requesting only the milestones that came back missing or invalid"""
+
+    def plan_response(self, milestones):
+        return json.dumps({"overview": {"summary": "Plan"}, "milestones": milestones})
+
+    def test_only_broken_milestones_are_re_requested(self):
+        manager = CascadingPlanManager(cache=LLMResponseCache())
+        manager.repair_attempts = 2
+        requests = []
+        milestones = {timeframe: json.loads(milestone_json(timeframe)) for timeframe in ("1_month", "5_years")}
+        milestones["3_months"] = {"title": "Quarter", "details": {"timeline_weeks": "soon"}}
+
+        async def fake_complete(request, use_cache=True):
+            requests.append(request)
+            if request["operation"] == "generate_plan":
+                return self.plan_response(milestones)
+            assert use_cache is False
+            timeframe = next(t for t in ("3_months", "1_year") if f"The {t} milestone in the previous response" in request["messages"][1]["content"])
+            return milestone_json(timeframe)
+
+        with patch.object(manager, '_complete_async', side_effect=fake_complete):
+            plan = asyncio.run(manager.generate_initial_plan_async(make_profile()))
+
+        repairs = [request for request in requests if request["operation"] == "repair_milestone"]
+        assert len(requests) == 3 and len(repairs) == 2
+        assert any("was invalid" in request["messages"][1]["content"] for request in repairs)
+        assert any("was missing" in request["messages"][1]["content"] for request in repairs)
+        assert plan.milestone_1.title == "1_month title"
+        assert plan.milestone_2.title == "3_months title"
+        assert plan.milestone_3.title == "1_year title"
+
+    def test_repair_budget_is_bounded(self):
+        manager = CascadingPlanManager(cache=LLMResponseCache())
+        manager.repair_attempts = 2
+        calls = []
+
+        async def fake_complete(request, use_cache=True):
+            calls.append(request["operation"])
+            if request["operation"] == "generate_plan":
+                return self.plan_response({"1_month": json.loads(milestone_json("1_month"))})
+            return "not json"
+
+        with patch.object(manager, '_complete_async', side_effect=fake_complete):
+            plan = asyncio.run(manager.generate_initial_plan_async(make_profile()))
+
+        assert calls.count("repair_milestone") == 6
+        assert plan.milestone_1 is not None
+        assert plan.milestone_2 is None
+
+    def test_cascade_keeps_valid_milestones_from_the_response(self):
+        manager = CascadingPlanManager(cache=LLMResponseCache())
+        manager.repair_attempts = 1
+        plan = TestSelectiveCascade().full_plan()
+
+        async def fake_complete(request, use_cache=True):
+            if request["operation"] == "cascade":
+                return json.dumps({"5_years": json.loads(milestone_json("5_years"))})
+            raise RuntimeError("provider unavailable")
+
+        with patch.object(manager, '_complete_async', side_effect=fake_complete):
+            updated = asyncio.run(manager.regenerate_subsequent_milestones_async(plan, "3_months", ["1_year", "5_years"]))
+
+        assert updated.milestone_4.title == "5_years title"
+        assert updated.milestone_3.title == "Year"
+        assert "Updated due to 3_months changes" in updated.milestone_3.details.dependencies
+        assert updated.version == plan.version + 1
+
+
+class TestPromptRendering:
+    """Tests for compact prompt rendering and token accounting"""
+
+    def test_profile_is_rendered_without_metadata_or_empty_answers(self):
+        from prompts import render_profile
+
+        profile = make_profile()
+        profile.circumstances = "  "
+        profile.created_at = "2024-01-01T00:00:00+00:00"
+        rendered = render_profile(profile)
+
+        assert "Goals: Become a senior engineer" in rendered
+        assert "test@example.com" not in rendered
+        assert "2024-01-01" not in rendered
+        assert "Circumstances" not in rendered
+
+    def test_context_is_minified_and_empty_fields_stripped(self):
+        from prompts import render_compact
+
+        rendered = render_compact({"summary": "Plan", "key_focus_areas": [], "market_outlook": None, "salary": {"entry": ""}})
+        assert rendered == '{"summary":"Plan"}'
+
+    def test_prompts_are_compact_and_still_parseable_requests(self):
+        manager = CascadingPlanManager(cache=LLMResponseCache())
+        request = manager._initial_plan_request(make_profile())
+        prompt = request["messages"][1]["content"]
+
+        assert "\n\n" not in prompt
+        assert not any(line.startswith(" ") for line in prompt.splitlines())
+        assert "username" not in prompt
+        assert all(timeframe in prompt for timeframe in manager.milestone_order)
+
+    def test_input_tokens_are_recorded_per_operation(self):
+        manager = CascadingPlanManager(cache=LLMResponseCache())
+        sent = []
+
+        async def fake_create(**request):
+            sent.append(request)
+            usage = type("Usage", (), {"prompt_tokens": 120, "completion_tokens": 30})()
+            return type("Response", (), {"usage": usage, "choices": [type("Choice", (), {"message": type("Message", (), {"content": "plan"})()})()]})()
+
+        with patch('clients.async_openai_client.chat.completions.create', side_effect=fake_create):
+            asyncio.run(manager._complete_async(manager._initial_plan_request(make_profile())))
+
+        assert "operation" not in sent[0]
+        stats = manager.token_usage.stats()
+        assert stats["operations"]["generate_plan"]["calls"] == 1
+        assert stats["operations"]["generate_plan"]["prompt_tokens"] > 0
+        assert stats["provider"] == {"calls": 1, "prompt_tokens": 120, "completion_tokens": 30}
+
+
+class TestSelectiveCascade:
+    """Tests for regenerating only the milestones an update affects"""
+
+    def full_plan(self, dependencies=None):
+        from models import CareerPlan
+
+        data = plan_dict()
+        details = data["milestone_3"]["details"]
+        data["milestone_1"] = {"milestone_id": "1_month_1", "title": "Month", "overview": "Month", "details": {**details, "timeline_weeks": 4}}
+        data["milestone_2"] = {"milestone_id": "3_months_1", "title": "Quarter", "overview": "Quarter", "details": {**details, "timeline_weeks": 12}}
+        for field, deps in (dependencies or {}).items():
+            data[field]["details"] = {**data[field]["details"], "dependencies": deps}
+        return CareerPlan(**data)
+
+    def test_affected_milestones_by_field(self):
+        from models import MilestoneUpdate
+
+        manager = CascadingPlanManager(cache=LLMResponseCache())
+        plan = self.full_plan()
+
+        assert manager.affected_milestones(plan, "1_month", MilestoneUpdate(user_notes="Prefer mornings")) == []
+        assert manager.affected_milestones(plan, "1_month", MilestoneUpdate(objectives=["Learn"])) == []
+        assert manager.affected_milestones(plan, "1_month", MilestoneUpdate(timeline_weeks=5)) == ["3_months"]
+        assert manager.affected_milestones(plan, "1_month", MilestoneUpdate(timeline_weeks=12)) == ["3_months", "1_year", "5_years"]
+        assert manager.affected_milestones(plan, "1_month", MilestoneUpdate(objectives=["Build a portfolio"])) == ["3_months", "1_year", "5_years"]
+        assert manager.affected_milestones(plan, "3_months", MilestoneUpdate(priority_level="high")) == ["1_year"]
+
+    def test_declared_dependencies_are_followed(self):
+        from models import MilestoneUpdate
+
+        manager = CascadingPlanManager(cache=LLMResponseCache())
+        plan = self.full_plan({"milestone_4": ["Complete 1_month foundation"]})
+
+        assert manager.affected_milestones(plan, "1_month", MilestoneUpdate(priority_level="high")) == ["3_months", "5_years"]
+
+    def test_cosmetic_edit_stores_without_llm_call(self):
+        from models import MilestoneUpdate
+
+        manager = CascadingPlanManager(cache=LLMResponseCache())
+        plan = self.full_plan()
+
+        async def fake_complete(request, use_cache=True):
+            raise AssertionError("cosmetic edits must not call the LLM")
+
+        with patch.object(manager, '_complete_async', side_effect=fake_complete), \
+                patch('plan_manager.storeUserPlanInDBAsync') as mock_store:
+            updated = asyncio.run(manager.update_milestone_with_cascade_async(plan, "1_month", MilestoneUpdate(user_notes="Prefer mornings")))
+
+        mock_store.assert_called_once()
+        assert updated.milestone_1.details.user_notes == "Prefer mornings"
+        assert updated.milestone_1.details.priority_level == "medium"
+
+    def test_only_affected_milestones_are_regenerated(self):
+        from models import MilestoneUpdate
+
+        manager = CascadingPlanManager(cache=LLMResponseCache())
+        plan = self.full_plan()
+        prompts = []
+
+        async def fake_complete(request, use_cache=True):
+            prompts.append(request["messages"][1]["content"])
+            return json.dumps({"3_months": json.loads(milestone_json("3_months"))})
+
+        with patch.object(manager, '_complete_async', side_effect=fake_complete), \
+                patch('plan_manager.storeUserPlanInDBAsync'):
+            asyncio.run(manager.update_milestone_with_cascade_async(plan, "1_month", MilestoneUpdate(timeline_weeks=5)))
+
+        assert len(prompts) == 1
+        assert "MILESTONES TO UPDATE: 3_months" in prompts[0]
+        assert "1_year" not in prompts[0].split("MILESTONES TO UPDATE:")[1].splitlines()[0]
+
+
+class TestCombinedCascade:
+    """Tests for turning thoughts into updates and later milestones in one completion"""
+
+    def test_updates_and_affected_milestones_from_one_stream(self):
+        manager = CascadingPlanManager(cache=LLMResponseCache(), cascade_update_mode="combined")
+        plan = TestSelectiveCascade().full_plan()
+        response = json.dumps({
+            "reasoning": "Slower pace",
+            "updates": {"timeline_weeks": 5, "user_notes": "Less time on weekdays"},
+            "milestones": {"3_months": json.loads(milestone_json("3_months"))}
+        })
+        requests = []
+
+        async def fake_stream(request, use_cache=True):
+            requests.append(request)
+            for i in range(0, len(response), 16):
+                yield response[i:i + 16]
+
+        async def fake_complete(request, use_cache=True):
+            raise AssertionError("a complete combined response needs no second completion")
+
+        with patch.object(manager, '_stream_complete_async', side_effect=fake_stream), \
+                patch.object(manager, '_complete_async', side_effect=fake_complete), \
+                patch('plan_manager.storeUserPlanInDBAsync') as mock_store:
+            updated, updates, affected = asyncio.run(manager.update_milestone_naturally_async(plan, "1_month", "I have less time"))
+
+        assert len(requests) == 1
+        assert requests[0]["operation"] == "combined_cascade"
+        assert updates.timeline_weeks == 5
+        assert affected == ["3_months"]
+        assert updated.milestone_1.details.timeline_weeks == 5
+        assert updated.milestone_2.title == "3_months title"
+        assert updated.milestone_3.title == "Year"
+        mock_store.assert_called_once()
+
+    def test_missing_milestones_are_regenerated_separately(self):
+        manager = CascadingPlanManager(cache=LLMResponseCache(), cascade_update_mode="combined")
+        plan = TestSelectiveCascade().full_plan()
+        response = json.dumps({
+            "updates": {"objectives": ["Build a portfolio"]},
+            "milestones": {"3_months": json.loads(milestone_json("3_months")), "1_year": {"details": "not an object"}}
+        })
+        prompts = []
+
+        async def fake_stream(request, use_cache=True):
+            yield response
+
+        async def fake_complete(request, use_cache=True):
+            prompts.append(request["messages"][1]["content"])
+            return json.dumps({timeframe: json.loads(milestone_json(timeframe)) for timeframe in ("1_year", "5_years")})
+
+        with patch.object(manager, '_stream_complete_async', side_effect=fake_stream), \
+                patch.object(manager, '_complete_async', side_effect=fake_complete), \
+                patch('plan_manager.storeUserPlanInDBAsync'):
+            events = asyncio.run(self.collect(manager.stream_update_with_cascade(plan, "1_month", "Focus on a portfolio")))
+
+        assert [event for event, _ in events] == ["updates", "milestone", "milestone", "milestone", "plan"]
+        assert [payload.timeframe for event, payload in events if event == "milestone"] == ["3_months", "1_year", "5_years"]
+        assert len(prompts) == 1
+        assert "MILESTONES TO UPDATE: 1_year, 5_years" in prompts[0]
+
+    def test_unparseable_response_falls_back_to_notes(self):
+        manager = CascadingPlanManager(cache=LLMResponseCache(), cascade_update_mode="combined")
+        plan = TestSelectiveCascade().full_plan()
+
+        async def fake_stream(request, use_cache=True):
+            yield "I'm sorry, I can't help with that."
+
+        with patch.object(manager, '_stream_complete_async', side_effect=fake_stream), \
+                patch('plan_manager.storeUserPlanInDBAsync'):
+            updated, updates, affected = asyncio.run(manager.update_milestone_naturally_async(plan, "1_month", "Too busy"))
+
+        assert "Too busy" in updates.user_notes
+        assert affected == []
+        assert "Too busy" in updated.milestone_1.details.user_notes
+
+    async def collect(self, stream):
+        return [event async for event in stream]
+
+
+def plan_dict():
+    details = {
+        "title": "Phase", "description": "Phase", "timeline_weeks": 4, "key_objectives": ["Learn"],
+        "success_metrics": [], "recommended_actions": [], "resources": [], "potential_challenges": [],
+        "last_updated": "2024-01-01T00:00:00+00:00"
+    }
+    return {
+        "plan_id": "plan_1",
+        "user_id": "test@example.com",
+        "overview": {"summary": "Plan"},
+        "milestone_3": {"milestone_id": "1_year_1", "title": "Year", "overview": "Year", "details": details},
+        "milestone_4": {"milestone_id": "5_years_1", "title": "Vision", "overview": "Vision", "details": details},
+        "created_date": "2024-01-01T00:00:00+00:00",
+        "last_updated": "2024-01-01T00:00:00+00:00"
+    }
+
+
+
+class TestMilestoneRegistry:
+    """Tests for the table-driven milestone construction"""
+
+    def test_builds_typed_milestones_with_defaults(self):
+        from milestone_registry import MILESTONE_REGISTRY
+
+        for timeframe, spec in MILESTONE_REGISTRY.items():
+            milestone = spec.build({"title": "T", "details": {"key_objectives": ["Learn"], "unknown": 1}})
+            assert type(milestone) is spec.milestone_class
+            assert milestone.timeframe == timeframe
+            assert milestone.details.timeline_weeks == spec.default_weeks
+            assert milestone.details.key_objectives == ["Learn"]
+
+        first = MILESTONE_REGISTRY["1_month"].build({})
+        second = MILESTONE_REGISTRY["1_month"].build({})
+        assert first.details.daily_tasks is not second.details.daily_tasks
+
+    def test_plans_round_trip_through_db_rows(self):
+        from db import planToDBRow, careerPlanFromDBRow
+        from milestone_registry import MILESTONE_REGISTRY, milestone_fields
+        from models import CareerPlan
+
+        milestones = {timeframe: spec.build({"title": timeframe}) for timeframe, spec in MILESTONE_REGISTRY.items()}
+        plan = CareerPlan(
+            plan_id="plan_user0",
+            user_id="user0",
+            overview={"summary": "Plan"},
+            created_date="2024-01-01T00:00:00+00:00",
+            last_updated="2024-01-01T00:00:00+00:00",
+            **milestone_fields(milestones)
+        )
+
+        row = planToDBRow(plan)
+        restored = careerPlanFromDBRow(row)
+        for timeframe, spec in MILESTONE_REGISTRY.items():
+            assert getattr(restored, spec.field) == milestones[timeframe]
+        assert restored.milestone_4.details.vision_statement == ""
+
+
+    def test_edited_rows_are_validated(self):
+        from pydantic import ValidationError
+        from db import careerPlanFromDBRow
+        from benchmarks.rehydration import sample_row
+
+        # Edited outside this code into another shape
+        row = sample_row()
+        row["milestone_1"]["details"]["timeline_weeks"] = "6"
+        assert careerPlanFromDBRow(row).milestone_1.details.timeline_weeks == 6
+
+        for edit in (
+            lambda details: details.update(timeline_weeks="not a number"),
+            lambda details: details.pop("key_objectives"),
+            lambda details: details.update(budget_estimate=[]),
+        ):
+            row = sample_row()
+            edit(row["milestone_2"]["details"])
+            with pytest.raises(ValidationError):
+                careerPlanFromDBRow(row)
+
+        row = sample_row()
+        row["milestone_4"]["completion_status"] = 250.0
+        with pytest.raises(ValidationError):
+            careerPlanFromDBRow(row)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
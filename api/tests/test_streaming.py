@@ -0,0 +1,192 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+from api import app
+from utils.json_stream_utils import IncrementalJSONScanner
+from plan_parser import StreamingPlanParser, parse_plan_response
+
+# Create test client
+client = TestClient(app)
+
+PLAN_JSON = json.dumps({
+    "overview": {"summary": "Move into data engineering", "key_focus_areas": ["SQL", "Python"]},
+    "milestones": {
+        "1_month": {
+            "title": "Foundation Phase",
+            "overview": "Learn the basics",
+            "details": {"timeline_weeks": 4, "key_objectives": ["Learn SQL {joins}"], "resources": []}
+        },
+        "3_months": {
+            "title": "Development Phase",
+            "overview": "Build projects",
+            "details": {"timeline_weeks": 12, "key_objectives": ["Ship a \"real\" pipeline"]}
+        }
+    }
+})
+
+
+class TestIncrementalJSONScanner:
+    """Tests for emitting JSON subtrees as they complete"""
+
+    def _feed_in_chunks(self, scanner, text, size=7):
+        completed = []
+        for i in range(0, len(text), size):
+            completed.extend(scanner.feed(text[i:i + size]))
+        return completed
+
+    def test_emits_subtrees_in_close_order(self):
+        scanner = IncrementalJSONScanner(watch_paths=[("overview",), ("milestones", "1_month"), ("milestones", "3_months")])
+        completed = self._feed_in_chunks(scanner, "Here is your plan:\n" + PLAN_JSON + "\nGood luck!")
+
+        paths = [path for path, _ in completed]
+        assert paths == [("overview",), ("milestones", "1_month"), ("milestones", "3_months"), ()]
+        assert completed[1][1]["details"]["key_objectives"] == ["Learn SQL {joins}"]
+        assert completed[2][1]["details"]["key_objectives"] == ['Ship a "real" pipeline']
+        assert scanner.done
+
+    def test_truncated_stream_keeps_completed_subtrees(self):
+        scanner = IncrementalJSONScanner(watch_paths=[("milestones", "1_month"), ("milestones", "3_months")])
+        completed = self._feed_in_chunks(scanner, PLAN_JSON[:PLAN_JSON.index('"3_months"') + 40])
+
+        assert [path for path, _ in completed] == [("milestones", "1_month")]
+        assert not scanner.done
+
+
+class TestStreamingPlanParser:
+    """Tests for typed milestone parsing of plan responses"""
+
+    def test_emits_typed_milestones(self):
+        from models import Milestone1, Milestone2
+
+        parser = StreamingPlanParser()
+        events = []
+        for i in range(0, len(PLAN_JSON), 5):
+            events.extend(parser.feed(PLAN_JSON[i:i + 5]))
+
+        assert [event for event, _ in events] == ["overview", "milestone", "milestone"]
+        assert isinstance(events[1][1], Milestone1)
+        assert isinstance(events[2][1], Milestone2)
+
+        result = parser.finish()
+        assert result.missing == ["1_year", "5_years"]
+        assert not result.truncated
+        assert not result.complete
+
+    def test_truncated_response_keeps_complete_milestones(self):
+        truncated = "Sure! " + PLAN_JSON[:PLAN_JSON.index('"3_months"') + 40]
+        result = parse_plan_response(truncated)
+
+        assert result.truncated
+        assert result.overview["summary"] == "Move into data engineering"
+        assert list(result.milestones) == ["1_month"]
+        assert result.missing == ["3_months", "1_year", "5_years"]
+
+    def test_invalid_milestone_is_reported(self):
+        bad = json.dumps({"milestones": {"1_month": {"title": "x", "details": {"timeline_weeks": "soon"}}}})
+        result = parse_plan_response(bad)
+
+        assert "1_month" in result.errors
+        assert "1_month" in result.missing
+
+
+class TestStreamingEndpoint:
+    """Tests for the server-sent events plan endpoint"""
+
+    @patch('api.getPlanFreshnessFromDBAsync')
+    @patch('api.getUserInformationFromDBAsync')
+    @patch('api.storeUserPlanInDBAsync')
+    def test_stream_generates_and_stores_plan(self, mock_store, mock_get_user, mock_freshness):
+        from models import UserProfile
+        from plan_manager import CascadingPlanManager
+
+        profile = UserProfile(
+            username="test@example.com",
+            interests_values="Data",
+            work_experience="Analyst",
+            circumstances="Remote",
+            skills="SQL",
+            goals="Data engineer"
+        )
+        mock_freshness.return_value = (None, None)
+        mock_get_user.return_value = profile
+
+        async def fake_stream(request, use_cache=True):
+            for i in range(0, len(PLAN_JSON), 16):
+                yield PLAN_JSON[i:i + 16]
+
+        async def failed_repair(request, use_cache=True):
+            raise RuntimeError("provider unavailable")
+
+        with patch.object(CascadingPlanManager, '_stream_complete_async', side_effect=fake_stream), \
+                patch.object(CascadingPlanManager, '_complete_async', side_effect=failed_repair):
+            response = client.post("/api/v3/generate-plan/test@example.com/stream")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+
+        events = [line[len("event: "):] for line in response.text.splitlines() if line.startswith("event: ")]
+        assert events == ["overview", "milestone", "milestone", "plan"]
+        mock_store.assert_called_once()
+        assert mock_store.call_args[0][0].milestone_2.title == "Development Phase"
+
+    @patch('api.getPlanFreshnessFromDBAsync')
+    @patch('api.getUserInformationFromDBAsync')
+    @patch('api.storeUserPlanInDBAsync')
+    def test_stream_and_generate_plan_share_one_generation(self, mock_store, mock_get_user, mock_freshness):
+        import asyncio
+        import httpx
+        from models import UserProfile
+        from plan_manager import CascadingPlanManager
+        from fakes.openai_stub import fake_completion_content
+
+        mock_freshness.return_value = (None, None)
+        mock_get_user.return_value = UserProfile(
+            username="test@example.com", interests_values="Data", work_experience="Analyst",
+            circumstances="Remote", skills="SQL", goals="Data engineer"
+        )
+        content = fake_completion_content('"milestones"')
+        generations = []
+
+        async def slow_stream(request, use_cache=True):
+            generations.append(request)
+            for i in range(0, len(content), 200):
+                await asyncio.sleep(0.005)
+                yield content[i:i + 200]
+
+        async def slow_complete(request, use_cache=True):
+            generations.append(request)
+            await asyncio.sleep(0.05)
+            return content
+
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver") as http:
+                return await asyncio.gather(
+                    http.post("/api/v3/generate-plan/test@example.com/stream"),
+                    http.post("/api/v3/generate-plan/test@example.com/stream"),
+                    http.post("/api/v3/generate-plan/test@example.com")
+                )
+
+        with patch.object(CascadingPlanManager, '_stream_complete_async', side_effect=slow_stream), \
+                patch.object(CascadingPlanManager, '_complete_async', side_effect=slow_complete):
+            first, second, generated = asyncio.run(run())
+
+        # One generation and one store served all three requests
+        assert len(generations) == 1
+        mock_store.assert_called_once()
+        assert first.text == second.text
+        assert first.text.count("event: milestone") == 4
+        assert generated.json()["plan_id"] == mock_store.call_args[0][0].plan_id
+
+    @patch('api.getPlanFreshnessFromDBAsync')
+    @patch('api.getUserInformationFromDBAsync')
+    def test_stream_user_not_found(self, mock_get_user, mock_freshness):
+        mock_freshness.return_value = (None, None)
+        mock_get_user.return_value = None
+
+        response = client.post("/api/v3/generate-plan/test@example.com/stream")
+        assert response.status_code == 404
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -9,11 +9,14 @@ from .timestamp_utils import (
     compare_timestamps,
     is_timestamp_newer
 )
+from .json_stream_utils import IncrementalJSONScanner, extract_json_object
 
 __all__ = [
     'get_current_timestamp',
     'parse_timestamp', 
     'format_timestamp_for_db',
     'compare_timestamps',
-    'is_timestamp_newer'
+    'is_timestamp_newer',
+    'IncrementalJSONScanner',
+    'extract_json_object'
 ]
\ No newline at end of file
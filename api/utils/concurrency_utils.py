@@ -0,0 +1,240 @@
+"""
+Asyncio helpers for sharing and limiting work across concurrent requests.
+"""
+
+import time
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional
+
+
+class _Replay:
+    """Items produced by a shared stream, replayed to every follower from the first one on"""
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.task: Optional[asyncio.Task] = None
+        self._condition = asyncio.Condition()
+
+    async def append(self, item: Any):
+        async with self._condition:
+            self.items.append(item)
+            self._condition.notify_all()
+
+    async def finish(self, error: Optional[BaseException] = None):
+        async with self._condition:
+            self.done = True
+            self.error = error
+            self._condition.notify_all()
+
+    async def follow(self) -> AsyncIterator[Any]:
+        index = 0
+        while True:
+            while index < len(self.items):
+                yield self.items[index]
+                index += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            async with self._condition:
+                await self._condition.wait_for(lambda: index < len(self.items) or self.done)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one in-flight execution.
+
+    The first caller for a key starts the work; callers that arrive while it is
+    still running await the same result (or exception) instead of repeating it.
+    The work runs in its own task, so a caller that is cancelled (a client
+    disconnecting) stops waiting without failing the others.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._streams: Dict[Hashable, _Replay] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn for key, or join the execution already in flight for it.
+
+        Args:
+            key: Identifies calls that would produce the same result
+            fn: Zero-argument coroutine function doing the work
+
+        Returns:
+            The result of the shared execution
+        """
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            self.executions += 1
+            task.add_done_callback(lambda t: self._finished(self._in_flight, key, t))
+            # Mark the exception retrieved so a failure with no waiters isn't logged as unhandled
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        # Shield so a caller being cancelled doesn't cancel the shared work
+        return await asyncio.shield(task)
+
+    async def stream(self, key: Hashable, fn: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """
+        Iterate fn() for key, or join the iteration already in flight for it.
+
+        Every caller receives every item from the first one on, then the same
+        exception if the iteration fails. Callers that stop iterating early
+        don't stop it for the others.
+        """
+        replay = self._streams.get(key)
+        if replay is not None:
+            self.coalesced += 1
+        else:
+            replay = _Replay()
+            self._streams[key] = replay
+            self.executions += 1
+
+            async def produce():
+                try:
+                    async for item in fn():
+                        await replay.append(item)
+                except BaseException as e:
+                    await replay.finish(e)
+                else:
+                    await replay.finish()
+
+            # Held by the replay, so the task lives as long as anyone can follow it
+            replay.task = asyncio.ensure_future(produce())
+            replay.task.add_done_callback(lambda t: self._finished(self._streams, key, replay))
+
+        async for item in replay.follow():
+            yield item
+
+    def _finished(self, flights: Dict[Hashable, Any], key: Hashable, flight: Any):
+        # A newer flight may already be registered under the key
+        if flights.get(key) is flight:
+            del flights[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._in_flight) + len(self._streams),
+            "executions": self.executions,
+            "coalesced": self.coalesced
+        }
+
+
+class TokenBucket:
+    """
+    Async token bucket for rate budgets such as requests or tokens per minute.
+
+    Holds up to `capacity` tokens and refills continuously at `rate` tokens per
+    second. Callers wait in order until enough tokens are available.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop = None
+
+    @classmethod
+    def per_minute(cls, amount: float) -> "TokenBucket":
+        """Bucket allowing `amount` per minute, with up to a minute's budget as burst"""
+        return cls(rate=amount / 60.0, capacity=amount)
+
+    async def acquire(self, tokens: float = 1.0):
+        """Wait until `tokens` are available and take them"""
+        # A request larger than the bucket could never be satisfied; let it drain the bucket instead
+        tokens = min(tokens, self.capacity)
+        async with self._get_lock():
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    def available(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def _get_lock(self) -> asyncio.Lock:
+        # Shared buckets outlive any one event loop (e.g. one per test client), so bind lazily
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Caps concurrent calls with a limit tuned by AIMD (additive increase, multiplicative decrease).
+
+    Every success raises the limit by `increase / limit`, so it grows by about
+    `increase` per full window of successes. An overload signal such as a 429
+    multiplies it by `decrease`. Callers wait while `floor(limit)` calls are in flight.
+    """
+
+    def __init__(self, initial: float = 4, minimum: float = 1, maximum: float = 32, increase: float = 1.0, decrease: float = 0.5):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.in_flight = 0
+        self.overloads = 0
+        self._condition: Optional[asyncio.Condition] = None
+        self._loop = None
+
+    async def acquire(self):
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < max(1, int(self.limit)))
+            self.in_flight += 1
+
+    async def release(self):
+        condition = self._get_condition()
+        async with condition:
+            self.in_flight -= 1
+            condition.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.release()
+
+    def on_success(self):
+        # Waiters re-check the raised limit when the caller's slot is released
+        self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+
+    def on_overload(self):
+        self.overloads += 1
+        self.limit = max(self.minimum, self.limit * self.decrease)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "overloads": self.overloads
+        }
+
+    def _get_condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._condition = asyncio.Condition()
+        return self._condition
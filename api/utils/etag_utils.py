@@ -0,0 +1,45 @@
+"""
+Entity tags for conditional GETs of plans and milestones.
+"""
+
+import hashlib
+from typing import Optional
+
+
+def _strong_etag(*parts) -> str:
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def plan_etag(username: str, last_updated: Optional[str]) -> str:
+    """
+    Strong ETag for a stored plan.
+
+    Every store stamps a new last_updated, so the tag is stable across reads
+    of the same row and changes whenever the plan's content can have changed.
+    """
+    return _strong_etag("plan", username, last_updated)
+
+
+def milestone_etag(username: str, timeframe: str, plan_last_updated: Optional[str]) -> str:
+    """
+    Strong ETag for one milestone of a stored plan.
+
+    Taken from the plan's stored last_updated, which is read with the milestone,
+    so a 304 costs no serialisation of the milestone.
+    """
+    return _strong_etag("milestone", username, timeframe, plan_last_updated)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag.
+
+    Uses the weak comparison RFC 9110 specifies for If-None-Match, so a
+    W/-prefixed copy of the tag from an intermediary still matches.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
@@ -0,0 +1,137 @@
+"""
+Utility for scanning JSON incrementally as it arrives from a token stream.
+Lets callers act on a JSON subtree as soon as its closing bracket arrives,
+instead of waiting for the whole document.
+"""
+
+import json
+from typing import Any, Iterable, List, Optional, Tuple
+
+JSONPath = Tuple[Any, ...]
+
+
+class IncrementalJSONScanner:
+    """
+    Scans the first top-level JSON object in a stream of text chunks.
+
+    Text before the first '{' is skipped and anything after the root object
+    closes is ignored, so prose around the JSON is tolerated.
+    """
+
+    def __init__(self, watch_paths: Optional[Iterable[JSONPath]] = None, watch_depth: Optional[int] = None):
+        """
+        Args:
+            watch_paths: Paths of containers to emit when they close, e.g. ("overview",)
+                or ("milestones", "1_month"). The root object is always emitted as ().
+            watch_depth: Alternatively, emit every container at exactly this depth
+        """
+        self.watch_paths = set(watch_paths or [])
+        self.watch_depth = watch_depth
+        self.buffer = ""
+        self.done = False
+        self._pos = 0
+        self._started = False
+        self._stack: List[dict] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+
+    def feed(self, chunk: str) -> List[Tuple[JSONPath, Any]]:
+        """
+        Add a chunk of text and return the watched containers it completed.
+
+        Args:
+            chunk: Next piece of the streamed text
+
+        Returns:
+            List of (path, parsed value) tuples in the order they closed
+        """
+        completed = []
+        if self.done or not chunk:
+            return completed
+
+        self.buffer += chunk
+        buf = self.buffer
+
+        while self._pos < len(buf) and not self.done:
+            i = self._pos
+            c = buf[i]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    frame = self._stack[-1]
+                    if frame['kind'] == '{' and frame['expecting_key']:
+                        frame['key'] = json.loads(buf[self._string_start:i + 1])
+                continue
+
+            if not self._started:
+                if c == '{':
+                    self._started = True
+                    self._push('{', (), i)
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c in '{[':
+                self._push(c, self._child_path(), i)
+            elif c in '}]':
+                frame = self._stack.pop()
+                if self._is_watched(frame['path']):
+                    try:
+                        completed.append((frame['path'], json.loads(buf[frame['start']:i + 1])))
+                    except json.JSONDecodeError:
+                        pass
+                if not self._stack:
+                    self.done = True
+            elif c == ':':
+                self._stack[-1]['expecting_key'] = False
+            elif c == ',':
+                frame = self._stack[-1]
+                if frame['kind'] == '{':
+                    frame['expecting_key'] = True
+                else:
+                    frame['key'] += 1
+
+        return completed
+
+    def _push(self, kind: str, path: JSONPath, start: int):
+        self._stack.append({
+            'kind': kind,
+            'path': path,
+            'start': start,
+            'key': None if kind == '{' else 0,
+            'expecting_key': kind == '{'
+        })
+
+    def _child_path(self) -> JSONPath:
+        parent = self._stack[-1]
+        return parent['path'] + (parent['key'],)
+
+    def _is_watched(self, path: JSONPath) -> bool:
+        if path == () or path in self.watch_paths:
+            return True
+        return self.watch_depth is not None and len(path) == self.watch_depth
+
+
+def extract_json_object(text: str) -> Optional[Any]:
+    """
+    Extract the first complete top-level JSON object from text, ignoring surrounding prose.
+
+    Args:
+        text: Text containing a JSON object
+
+    Returns:
+        The parsed object, or None if no complete object was found
+    """
+    scanner = IncrementalJSONScanner()
+    for path, value in scanner.feed(text):
+        if path == ():
+            return value
+    return None
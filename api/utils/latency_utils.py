@@ -0,0 +1,31 @@
+from collections import deque
+from typing import Dict, Any, Optional
+
+
+class LatencyTracker:
+    """Keeps the latencies of recent successful calls and reports percentiles over them"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    @property
+    def count(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, int(round(percentile / 100.0 * len(ordered))) - 1))
+        return ordered[index]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99)
+        }
@@ -0,0 +1,99 @@
+"""
+Utility functions for estimating and accounting LLM token usage.
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+# Rough average for English text with GPT-4's tokenizer
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a piece of text.
+
+    Args:
+        text: Text to be sent to or received from the model
+
+    Returns:
+        int: Estimated token count
+    """
+    if not text:
+        return 0
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def estimate_prompt_tokens(request: Dict[str, Any]) -> int:
+    """
+    Estimate the input tokens of a chat completion request.
+
+    Args:
+        request: Chat completion arguments with messages
+
+    Returns:
+        int: Estimated prompt token count
+    """
+    return sum(
+        estimate_tokens(message.get("content", "")) + 4  # per-message overhead
+        for message in request.get("messages", [])
+    )
+
+
+def estimate_request_tokens(request: Dict[str, Any]) -> int:
+    """
+    Estimate the tokens a chat completion request can consume, counting the
+    prompt plus the full max_tokens completion budget.
+
+    Args:
+        request: Chat completion arguments with messages and max_tokens
+
+    Returns:
+        int: Estimated total token count
+    """
+    return estimate_prompt_tokens(request) + request.get("max_tokens", 0)
+
+
+class TokenUsageMeter:
+    """
+    Records the input tokens of every rendered prompt by operation, and the
+    prompt/completion tokens reported by the provider for calls it served.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations: Dict[str, Dict[str, int]] = {}
+        self.provider_calls = 0
+        self.provider_prompt_tokens = 0
+        self.provider_completion_tokens = 0
+
+    def record_prompt(self, operation: str, prompt_tokens: int):
+        """Record the estimated input tokens of a prompt built for an operation"""
+        with self._lock:
+            totals = self._operations.setdefault(operation, {"calls": 0, "prompt_tokens": 0, "max_prompt_tokens": 0, "last_prompt_tokens": 0})
+            totals["calls"] += 1
+            totals["prompt_tokens"] += prompt_tokens
+            totals["max_prompt_tokens"] = max(totals["max_prompt_tokens"], prompt_tokens)
+            totals["last_prompt_tokens"] = prompt_tokens
+
+    def record_usage(self, prompt_tokens: int, completion_tokens: Optional[int] = None):
+        """Record the token usage of a completion served by the provider"""
+        with self._lock:
+            self.provider_calls += 1
+            self.provider_prompt_tokens += prompt_tokens
+            self.provider_completion_tokens += completion_tokens or 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            operations = {
+                operation: {**totals, "avg_prompt_tokens": round(totals["prompt_tokens"] / totals["calls"], 1)}
+                for operation, totals in self._operations.items()
+            }
+            return {
+                "operations": operations,
+                "provider": {
+                    "calls": self.provider_calls,
+                    "prompt_tokens": self.provider_prompt_tokens,
+                    "completion_tokens": self.provider_completion_tokens
+                }
+            }
@@ -154,6 +154,31 @@ const Paths = () => {
     return milestoneArray;
   };
 
+  // Parse a single server-sent event block into its event name and JSON payload
+  const parseServerSentEvent = (rawEvent) => {
+    let event = 'message';
+    const dataLines = [];
+    rawEvent.split('\n').forEach(line => {
+      if (line.startsWith('event:')) {
+        event = line.slice(6).trim();
+      } else if (line.startsWith('data:')) {
+        dataLines.push(line.slice(5).trim());
+      }
+    });
+    return { event, data: dataLines.length ? JSON.parse(dataLines.join('\n')) : null };
+  };
+
+  // The last plan received for a user and its ETag, so a repeat view only revalidates it
+  const planStorageKey = (email) => `careerPlan:${email}`;
+
+  const readStoredPlan = (email) => {
+    try {
+      return JSON.parse(localStorage.getItem(planStorageKey(email)));
+    } catch (e) {
+      return null;
+    }
+  };
+
   // Generate milestone plan, using userEmail from supabase
   const generateMilestonePlan = useCallback(async () => {
     if (!userEmail) {
@@ -164,29 +189,74 @@ const Paths = () => {
     setError(null);
 
     try {
-      await fetch(`http://localhost:8000/api/v3/generate-plan/${encodeURIComponent(userEmail)}`, {
+      // Load the stored plan with a conditional GET; an unchanged plan costs only a 304
+      const stored = readStoredPlan(userEmail);
+      const planResponse = await fetch(`http://localhost:8000/api/v3/plan/${encodeURIComponent(userEmail)}`, {
+        headers: stored ? { 'If-None-Match': stored.etag } : {}
+      });
+
+      if (planResponse.status === 304 && stored) {
+        setMilestones(transformApiResponseToMilestones(stored.plan));
+        setPlanOverview(stored.plan.overview);
+        return;
+      }
+      if (planResponse.ok) {
+        const plan = await planResponse.json();
+        const etag = planResponse.headers.get('ETag');
+        if (etag) {
+          localStorage.setItem(planStorageKey(userEmail), JSON.stringify({ etag, plan }));
+        }
+        setMilestones(transformApiResponseToMilestones(plan));
+        setPlanOverview(plan.overview);
+        return;
+      }
+      if (planResponse.status !== 404) {
+        throw new Error(`HTTP ${planResponse.status}: ${planResponse.statusText}`);
+      }
+      localStorage.removeItem(planStorageKey(userEmail));
+
+      // No plan yet: stream one so the overview and each milestone render as soon as they are generated
+      const response = await fetch(`http://localhost:8000/api/v3/generate-plan/${encodeURIComponent(userEmail)}/stream`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         }
-      })
-      .then(response => {
-        if (!response.ok) {
-          throw new Error(`HTTP ${response.status}: ${response.statusText}`);
-        }
-        return response.json();
-      })
-      .then(data => {
-        // Transform and set milestones from API response
-        const transformedMilestones = transformApiResponseToMilestones(data);
-        setMilestones(transformedMilestones);
-        setPlanOverview(data.overview);
-      })
-      .catch(error => {
-        setError(error.message);
       });
 
-      // API response will be handled above in the .then() block
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      const streamedMilestones = {};
+      let buffer = '';
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const rawEvents = buffer.split('\n\n');
+        buffer = rawEvents.pop();
+
+        for (const rawEvent of rawEvents) {
+          const { event, data } = parseServerSentEvent(rawEvent);
+
+          if (event === 'overview') {
+            setPlanOverview(data);
+          } else if (event === 'milestone') {
+            streamedMilestones[data.timeframe] = data;
+            setMilestones(transformApiResponseToMilestones({ milestones: { ...streamedMilestones } }));
+          } else if (event === 'plan') {
+            // Final plan as stored in the database
+            setMilestones(transformApiResponseToMilestones(data));
+            setPlanOverview(data.overview);
+          } else if (event === 'error') {
+            throw new Error(data.detail);
+          }
+        }
+      }
 
     } catch (error) {
       setError(error.message);